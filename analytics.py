@@ -0,0 +1,222 @@
+"""
+Vectorized payroll aggregates over a columnar copy of pay_statements.
+
+The statements are read once into NumPy arrays: dates become int32 day
+numbers, amounts stay int64 cents, and companies become small integer
+codes. The arrays are kept until the reporting snapshot's data version
+changes, so a dashboard query costs a few passes over memory instead of
+a table scan. numpy is optional; without it these functions raise a
+RuntimeError that names it.
+"""
+import sqlite3
+import datetime
+import threading
+from database_manager import get_data_version, get_snapshot
+
+LOAD_BATCH = 100000
+PERCENTILES = (10, 25, 50, 75, 90)
+GROUPINGS = ('year', 'month', 'company', 'individual')
+
+# Statements without an ISO date ("Unknown_Date") are left out
+COLUMNS_QUERY = """
+    WITH companies AS (
+        SELECT company, ROW_NUMBER() OVER (ORDER BY company) - 1 AS code
+        FROM (SELECT DISTINCT COALESCE(company, '') AS company FROM pay_statements)
+    )
+    SELECT ps.id, ps.individual_id,
+           CAST(julianday(substr(ps.date, 1, 10)) - 2440587.5 AS INTEGER),
+           COALESCE(ps.amount_cents, 0),
+           companies.code
+    FROM pay_statements ps
+    JOIN companies ON companies.company = COALESCE(ps.company, '')
+    WHERE ps.date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+    ORDER BY ps.id
+"""
+
+# db_path -> StatementColumns of its snapshot
+_columns = {}
+_columns_lock = threading.Lock()
+
+def load_numpy():
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("Analytics need numpy: pip install numpy")
+    return np
+
+class StatementColumns:
+    """Parallel arrays with one element per dated pay statement"""
+    def __init__(self, rows, companies, version):
+        np = load_numpy()
+        self.version = version
+        self.companies = companies
+        self.ids = rows[:, 0]
+        self.individual_ids = rows[:, 1]
+        self.days = rows[:, 2].astype(np.int32)
+        self.cents = rows[:, 3]
+        self.company_codes = rows[:, 4].astype(np.int32)
+        dates = self.days.astype('datetime64[D]')
+        self.years = dates.astype('datetime64[Y]').astype(np.int32) + 1970
+        # Months since January 1970
+        self.months = dates.astype('datetime64[M]').astype(np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def company_code(self, company):
+        """Code of a company name, or -1 if no statement has it"""
+        try:
+            return self.companies.index(company or '')
+        except ValueError:
+            return -1
+
+def read_columns(db_path, version):
+    np = load_numpy()
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("SELECT DISTINCT COALESCE(company, '') FROM pay_statements ORDER BY 1")
+    companies = [row[0] for row in c.fetchall()]
+
+    # Converted a batch at a time so millions of rows never sit in memory as tuples
+    c.execute(COLUMNS_QUERY)
+    batches = []
+    while True:
+        rows = c.fetchmany(LOAD_BATCH)
+        if not rows:
+            break
+        batches.append(np.array(rows, dtype=np.int64))
+    conn.close()
+
+    rows = np.concatenate(batches) if batches else np.empty((0, 5), dtype=np.int64)
+    return StatementColumns(rows, companies, version)
+
+def get_columns(db_path):
+    """Statement columns from db_path's reporting snapshot, reloaded only after the data changes"""
+    snapshot = get_snapshot(db_path)
+    version = get_data_version(snapshot)
+    # Held while loading, so concurrent requests after a write share one reload
+    with _columns_lock:
+        columns = _columns.get(db_path)
+        if columns is None or columns.version != version:
+            columns = read_columns(snapshot, version)
+            _columns[db_path] = columns
+    return columns
+
+def day_number(date):
+    """Days since 1970-01-01 of an ISO date string"""
+    return (datetime.date.fromisoformat(date) - datetime.date(1970, 1, 1)).days
+
+def day_date(day):
+    return (datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day))).isoformat()
+
+def statement_mask(columns, year=None, individual_id=None, company=None, start=None, end=None):
+    """Boolean array selecting the statements that pass every given filter"""
+    np = load_numpy()
+    mask = np.ones(len(columns), dtype=bool)
+    if year:
+        mask &= columns.years == int(year)
+    if individual_id:
+        mask &= columns.individual_ids == individual_id
+    if company is not None:
+        mask &= columns.company_codes == columns.company_code(company)
+    if start:
+        mask &= columns.days >= day_number(start)
+    if end:
+        mask &= columns.days <= day_number(end)
+    return mask
+
+def group_keys(columns, by):
+    if by not in GROUPINGS:
+        raise ValueError(f"by must be one of {', '.join(GROUPINGS)}")
+    return {'year': columns.years, 'month': columns.months, 'company': columns.company_codes,
+            'individual': columns.individual_ids}[by]
+
+def sum_cents(codes, cents, length):
+    """Exact int64 sums of cents per code.
+
+    bincount adds in float64, which is exact below 2**53; summing the high
+    and low 24 bits separately keeps every partial sum far below that.
+    """
+    np = load_numpy()
+    high = np.bincount(codes, weights=cents >> 24, minlength=length)
+    low = np.bincount(codes, weights=cents & 0xFFFFFF, minlength=length)
+    return (high.astype(np.int64) << 24) + low.astype(np.int64)
+
+def group_totals(columns, by='year', mask=None):
+    """Return (keys, statement counts, total cents) per group, keys ascending"""
+    np = load_numpy()
+    keys = group_keys(columns, by)
+    cents = columns.cents
+    if mask is not None:
+        keys, cents = keys[mask], cents[mask]
+    if not len(keys):
+        return keys, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Every grouping is a small dense integer range, so bincount beats sorting
+    first = keys.min()
+    offsets = keys - first
+    length = int(offsets.max()) + 1
+    counts = np.bincount(offsets, minlength=length)
+    totals = sum_cents(offsets, cents, length)
+    present = np.flatnonzero(counts)
+    return present + first, counts[present], totals[present]
+
+def group_percentiles(columns, by=None, mask=None, q=PERCENTILES):
+    """Return (keys, percentiles) of statement amounts in cents, one row of len(q) per group.
+
+    Interpolates linearly between ranks like numpy.percentile, for all groups
+    in one sort. Without by, there is a single group with key 0.
+    """
+    np = load_numpy()
+    cents = columns.cents
+    keys = group_keys(columns, by) if by else np.zeros(len(columns), dtype=np.int64)
+    if mask is not None:
+        keys, cents = keys[mask], cents[mask]
+    if not len(keys):
+        return keys, np.zeros((0, len(q)))
+
+    order = np.lexsort((cents, keys))
+    keys, cents = keys[order], cents[order]
+    groups, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    ranks = starts[:, None] + (counts[:, None] - 1) * (np.asarray(q, dtype=float) / 100)
+    below = np.floor(ranks).astype(np.int64)
+    above = np.ceil(ranks).astype(np.int64)
+    return groups, cents[below] + (cents[above] - cents[below]) * (ranks - below)
+
+def rolling_totals(columns, window=28, mask=None):
+    """Return (days, daily cents, trailing window-day sums) for every day from the first statement to the last"""
+    np = load_numpy()
+    days, cents = columns.days, columns.cents
+    if mask is not None:
+        days, cents = days[mask], cents[mask]
+    if not len(days):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    daily = sum_cents(days - first, cents, span)
+    running = np.cumsum(daily)
+    rolling = running.copy()
+    rolling[window:] -= running[:-window]
+    return np.arange(first, first + span), daily, rolling
+
+def pay_intervals(columns, mask=None):
+    """Return (individual ids, days) between each statement and the same individual's previous one"""
+    np = load_numpy()
+    individual_ids, days = columns.individual_ids, columns.days
+    if mask is not None:
+        individual_ids, days = individual_ids[mask], days[mask]
+
+    order = np.lexsort((days, individual_ids))
+    individual_ids, days = individual_ids[order], days[order]
+    same = individual_ids[1:] == individual_ids[:-1]
+    return individual_ids[1:][same], np.diff(days)[same]
+
+def value_distribution(values, q=PERCENTILES):
+    """Return (distinct values, their counts, percentiles) of an array"""
+    np = load_numpy()
+    if not len(values):
+        return values, np.zeros(0, dtype=np.int64), np.zeros(0)
+    distinct, counts = np.unique(values, return_counts=True)
+    return distinct, counts, np.percentile(values, q)
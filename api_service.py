@@ -0,0 +1,721 @@
+"""
+Framework-independent implementation of the /api endpoints, shared by the
+Flask backend (backend.py) and the ASGI backend (asgi_backend.py)
+"""
+import os
+import re
+import json
+import time
+import queue
+import base64
+import shutil
+import hashlib
+import sqlite3
+import datetime
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pdf_processor import split_pdf
+from pdf_export import EXPORT_FORMATS, stream_export
+from table_export import TABLE_FORMATS, export_table, query_batches, stream_csv
+from statement_merger import merge_individual, merge_all, year_range
+from analytics import (PERCENTILES, get_columns, statement_mask, group_totals, group_percentiles,
+                       rolling_totals, pay_intervals, value_distribution, day_date)
+from database_manager import (create_database, update_individual_info, update_individuals,
+                              get_pay_statements, get_pay_statement_lines, get_line_item_totals,
+                              get_ytd_summary, delete_pay_statements, find_pay_statements,
+                              get_data_version, bump_data_version, recover_ingest,
+                              get_ingest_checkpoints, get_snapshot, find_similar_individuals,
+                              find_duplicate_names, merge_individuals, duplicate_file_paths, emit_change,
+                              subscribe, get_changes)
+
+# Create output folder for PDFs and database
+OUTPUT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+if not os.path.exists(OUTPUT_FOLDER):
+    os.makedirs(OUTPUT_FOLDER)
+
+# Initialize database
+DB_PATH = create_database(OUTPUT_FOLDER)
+# Each worker process settles crashed ingests once; ingests still running in
+# other workers are left alone
+recover_ingest(OUTPUT_FOLDER)
+
+# Memory-mapped reads let every worker process share the OS page cache for
+# pdf_data.db instead of each holding its own copy of hot pages
+MMAP_SIZE = 256 * 1024 * 1024
+
+# PDFs of bulk deletes are removed off the request thread, in batches
+FILE_REMOVAL_WORKERS = 4
+FILE_REMOVAL_BATCH = 100
+_file_pool = ThreadPoolExecutor(max_workers=FILE_REMOVAL_WORKERS, thread_name_prefix='file-removal')
+
+_local = threading.local()
+
+def connect():
+    """Return this thread's read connection, opening it on first use.
+
+    Keeping the connection open keeps sqlite3's prepared statement cache warm
+    between requests.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        _local.conn = conn
+    return conn
+
+INDIVIDUALS_SELECT = """
+    SELECT i.id, i.name, i.address, i.phone_number, i.email,
+           COUNT(ps.id) as count, SUM(ps.amount_cents) as total
+    FROM individuals i
+    LEFT JOIN pay_statements ps ON ps.individual_id = i.id
+"""
+INDIVIDUALS_QUERY = INDIVIDUALS_SELECT + """
+    GROUP BY i.id
+    ORDER BY i.id
+"""
+
+PAY_STATEMENTS_SELECT = """
+    SELECT ps.id, i.name, ps.date, ps.filename, ps.amount_cents, ps.company
+    FROM pay_statements ps
+    JOIN individuals i ON ps.individual_id = i.id
+"""
+PAY_STATEMENTS_QUERY = PAY_STATEMENTS_SELECT + """
+    ORDER BY ps.date DESC
+"""
+
+# Most change log entries one /api/sync reply covers
+SYNC_PAGE_SIZE = 2000
+
+def warm_up():
+    """Check the schema and run the hot queries once on this thread's connection"""
+    create_database(OUTPUT_FOLDER)
+    c = connect().cursor()
+    for query in (INDIVIDUALS_QUERY, PAY_STATEMENTS_QUERY):
+        c.execute(query)
+        c.fetchall()
+
+def read_pdf_base64(filename):
+    try:
+        with open(os.path.join(OUTPUT_FOLDER, filename), 'rb') as pdf_file:
+            return base64.b64encode(pdf_file.read()).decode('utf-8')
+    except OSError:
+        return None
+
+def dollars(cents):
+    """JSON dollars from integer cents; the one division keeps exact sums from drifting"""
+    return cents / 100 if cents is not None else None
+
+def list_individuals():
+    c = connect().cursor()
+    # Paystub count and total earnings for every individual in one pass
+    c.execute(INDIVIDUALS_QUERY)
+    return [individual_json(row) for row in c.fetchall()]
+
+def individual_json(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'address': row[2],
+        'phone_number': row[3],
+        'email': row[4],
+        'paystubCount': row[5] or 0,
+        'totalEarnings': dollars(row[6] or 0)
+    }
+
+def update_individual(name, data):
+    update_individual_info(
+        DB_PATH,
+        name,
+        address=data.get('address'),
+        phone_number=data.get('phone_number'),
+        email=data.get('email')
+    )
+    return {'message': 'Individual updated successfully'}
+
+def update_individuals_bulk(updates):
+    """Update several individuals in one transaction; updates is a list of dicts keyed by name"""
+    if not isinstance(updates, list) or not all(isinstance(u, dict) and u.get('name') for u in updates):
+        raise ValueError("updates must be a list of objects with a name")
+    updated, missing = update_individuals(DB_PATH, updates)
+    return {'updated': len(updated), 'notFound': missing}
+
+def similar_individuals(name, limit=10):
+    if not name or not name.strip():
+        raise ValueError("name is required")
+    return [{
+        'id': individual_id,
+        'name': match_name,
+        'similarity': round(score, 3)
+    } for individual_id, match_name, score in find_similar_individuals(DB_PATH, name, limit)]
+
+def duplicate_individuals():
+    """Groups of individuals whose names only differ in case, spacing, punctuation or word order"""
+    return [{'ids': group} for group in find_duplicate_names(DB_PATH)]
+
+def merge_individuals_into(target_id, source_ids):
+    """Merge source individuals into target; duplicate statements' PDFs are removed in the background"""
+    if not isinstance(target_id, int) or not isinstance(source_ids, list) or \
+            not all(isinstance(source_id, int) for source_id in source_ids):
+        raise ValueError("target must be an id and sources a list of ids")
+    moved, duplicates = merge_individuals(DB_PATH, target_id, source_ids)
+    paths = duplicate_file_paths(OUTPUT_FOLDER, duplicates)
+    for start in range(0, len(paths), FILE_REMOVAL_BATCH):
+        _file_pool.submit(remove_files, paths[start:start + FILE_REMOVAL_BATCH])
+    return {
+        'moved': moved,
+        'duplicatesRemoved': [row[0] for row in duplicates],
+        'filesQueued': len(paths)
+    }
+
+def list_pay_statements(file_data=True):
+    c = connect().cursor()
+    c.execute(PAY_STATEMENTS_QUERY)
+    return [pay_statement_json(row, file_data) for row in c.fetchall()]
+
+def pay_statement_json(row, file_data=True):
+    statement = {
+        'id': row[0],
+        'name': row[1],
+        'date': row[2],
+        'filename': row[3],
+        'amount': dollars(row[4] or 0),
+        'company': row[5]
+    }
+    if file_data:
+        statement['fileData'] = read_pdf_base64(row[3])
+    return statement
+
+def list_individual_pay_statements(individual_id, file_data=True):
+    statements = [{
+        'id': ps[0],
+        'date': ps[2],
+        'filename': ps[3]
+    } for ps in get_pay_statements(DB_PATH, individual_id)]
+    if file_data:
+        for statement in statements:
+            statement['fileData'] = read_pdf_base64(statement['filename'])
+    return statements
+
+def pay_statement_lines(paystub_id):
+    return [{
+        'section': line[0],
+        'description': line[1],
+        'quantity': line[2],
+        'rate': dollars(line[3]),
+        'current': dollars(line[4]),
+        'ytd': dollars(line[5])
+    } for line in get_pay_statement_lines(DB_PATH, paystub_id)]
+
+def line_item_report(year=None, individual_id=None):
+    return [{
+        'section': row[0],
+        'description': row[1],
+        'statementCount': row[2],
+        'total': dollars(row[3] or 0)
+    } for row in get_line_item_totals(get_snapshot(DB_PATH), year=year, individual_id=individual_id)]
+
+def ytd_report(individual_id, year):
+    summary = get_ytd_summary(get_snapshot(DB_PATH), individual_id, year)
+    return {
+        'asOf': summary[0][0] if summary else None,
+        'lines': [{
+            'section': row[1],
+            'description': row[2],
+            'ytd': dollars(row[3])
+        } for row in summary]
+    }
+
+def group_label(columns, by, key):
+    if by == 'month':
+        return f"{1970 + key // 12}-{key % 12 + 1:02d}"
+    if by == 'company':
+        return columns.companies[key]
+    return int(key)
+
+def percentile_json(values):
+    return {f'p{q}': round(float(value) / 100, 2) for q, value in zip(PERCENTILES, values)}
+
+def summary_report(by='year', year=None, individual_id=None, company=None):
+    """Statement count, total and amount percentiles per year, month, company or individual"""
+    columns = get_columns(DB_PATH)
+    mask = statement_mask(columns, year, individual_id, company)
+    keys, counts, totals = group_totals(columns, by, mask)
+    # Both come back in ascending key order
+    _, percentiles = group_percentiles(columns, by, mask)
+    return [{
+        'group': group_label(columns, by, key),
+        'statementCount': int(count),
+        'total': int(total) / 100,
+        'percentiles': percentile_json(values)
+    } for key, count, total, values in zip(keys.tolist(), counts, totals, percentiles)]
+
+def rolling_report(window=28, year=None, individual_id=None, company=None):
+    """Daily totals and trailing window-day sums, as parallel arrays for charting"""
+    if window < 1:
+        raise ValueError("window must be at least 1 day")
+    columns = get_columns(DB_PATH)
+    days, daily, rolling = rolling_totals(columns, window, statement_mask(columns, year, individual_id, company))
+    return {
+        'window': window,
+        'start': day_date(days[0]) if len(days) else None,
+        'daily': (daily / 100).tolist(),
+        'rolling': (rolling / 100).tolist()
+    }
+
+def pay_interval_report(year=None, individual_id=None, company=None):
+    """How many days apart each individual's consecutive statements are"""
+    columns = get_columns(DB_PATH)
+    _, gaps = pay_intervals(columns, statement_mask(columns, year, individual_id, company))
+    intervals, counts, percentiles = value_distribution(gaps)
+    return {
+        'intervals': [{'days': days, 'count': count} for days, count in zip(intervals.tolist(), counts.tolist())],
+        'percentiles': {f'p{q}': value for q, value in zip(PERCENTILES, percentiles.tolist())}
+    }
+
+def pay_statement_path(paystub_id):
+    """Return the PDF path of a pay statement, or None if the row or file is missing"""
+    c = connect().cursor()
+    c.execute("SELECT filename FROM pay_statements WHERE id = ?", (paystub_id,))
+    result = c.fetchone()
+
+    if not result:
+        return None
+    pdf_path = os.path.join(OUTPUT_FOLDER, result[0])
+    return pdf_path if os.path.exists(pdf_path) else None
+
+def delete_pay_statement(paystub_id):
+    """Delete a pay statement, its lines and its PDF; returns False if it does not exist"""
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        c = conn.cursor()
+
+        # Get filename before deletion
+        c.execute("SELECT filename FROM pay_statements WHERE id = ?", (paystub_id,))
+        result = c.fetchone()
+        if not result:
+            return False
+        pdf_path = os.path.join(OUTPUT_FOLDER, result[0])
+
+        # Delete from database
+        c.execute("DELETE FROM pay_statement_lines WHERE pay_statement_id = ?", (paystub_id,))
+        c.execute("DELETE FROM pay_statements WHERE id = ?", (paystub_id,))
+        bump_data_version(c)
+        conn.commit()
+    finally:
+        conn.close()
+    emit_change(DB_PATH, 'pay_statements', deleted=[paystub_id])
+
+    # Delete PDF file
+    if os.path.exists(pdf_path):
+        os.remove(pdf_path)
+    return True
+
+def remove_files(paths):
+    removed = 0
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove {path}: {e}")
+    return removed
+
+def delete_pay_statements_bulk(ids=None, individual_id=None, year=None, company=None):
+    """Delete every pay statement matching the ids and filters in one transaction.
+
+    The PDFs are queued for removal on the background pool, so the response
+    only waits for the database.
+    """
+    deleted = delete_pay_statements(DB_PATH, ids=ids, individual_id=individual_id, year=year, company=company)
+    paths = [os.path.join(OUTPUT_FOLDER, filename) for _, filename in deleted]
+    for start in range(0, len(paths), FILE_REMOVAL_BATCH):
+        _file_pool.submit(remove_files, paths[start:start + FILE_REMOVAL_BATCH])
+
+    deleted_ids = [row[0] for row in deleted]
+    found = set(deleted_ids)
+    return {
+        'deleted': len(deleted_ids),
+        'ids': deleted_ids,
+        'notFound': [paystub_id for paystub_id in ids or [] if paystub_id not in found],
+        'filesQueued': len(paths)
+    }
+
+class ParameterError(ValueError):
+    """A malformed query parameter, reported to the client as a 400"""
+
+def int_param(value, name, default=None):
+    """Parse an optional integer query parameter"""
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ParameterError(f"{name} must be an integer, got {value!r}")
+
+def parse_ids(value):
+    """Parse a comma-separated id list from a query string"""
+    return [int_param(part, 'ids') for part in value.split(',') if part.strip()] if value else None
+
+def safe_filename(filename):
+    """Reduce a client-supplied filename to a plain ASCII basename, like werkzeug's secure_filename"""
+    filename = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+    filename = '_'.join(filename.replace('\\', '/').split('/')[-1].split())
+    return re.sub(r'[^A-Za-z0-9_.-]', '', filename).strip('._')
+
+def export_pay_statements(export_format='zip', ids=None, individual_id=None, year=None, company=None):
+    """Return (chunks, mimetype, download name) for an export of the matching statements"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    statements = find_pay_statements(DB_PATH, ids=ids, individual_id=individual_id, year=year, company=company)
+    paths = [path for path in (os.path.join(OUTPUT_FOLDER, row[1]) for row in statements) if os.path.exists(path)]
+    if not paths:
+        raise LookupError("No pay statements match the export")
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return stream_export(paths, export_format), mimetype, f"paystubs.{extension}"
+
+def export_table_stream(table, table_format='csv', individual_id=None, year=None, company=None):
+    """Return (chunks, mimetype, download name) for a table export.
+
+    Exports read from the reporting snapshot. CSV streams straight from the
+    cursor; Parquet and XLSX need a seekable target, so they are written to
+    a temporary file that is streamed back and removed.
+    """
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(TABLE_FORMATS)}")
+    filters = {'individual_id': individual_id, 'year': year, 'company': company}
+    if table_format == 'csv':
+        chunks = stream_csv(*query_batches(get_snapshot(DB_PATH), table, **filters))
+    else:
+        temp_file = tempfile.TemporaryFile()
+        try:
+            export_table(get_snapshot(DB_PATH), table, temp_file, table_format, **filters)
+        except Exception:
+            temp_file.close()
+            raise
+        temp_file.seek(0)
+        chunks = read_chunks(temp_file)
+    return chunks, TABLE_FORMATS[table_format], f"{table}.{table_format}"
+
+def read_chunks(f, chunk_size=64 * 1024):
+    with f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            yield chunk
+
+def date_range(year=None, start_date=None, end_date=None):
+    return year_range(year) if year else (start_date, end_date)
+
+def merged_statements_path(individual_id, year=None, start_date=None, end_date=None):
+    """Return the merged PDF of an individual's statements in the range, or None if there are none"""
+    start_date, end_date = date_range(year, start_date, end_date)
+    return merge_individual(DB_PATH, OUTPUT_FOLDER, individual_id, start_date, end_date)['path']
+
+def merge_all_statements(year=None, start_date=None, end_date=None, workers=None):
+    start_date, end_date = date_range(year, start_date, end_date)
+    return [{
+        'individualId': summary['individual_id'],
+        'name': summary['name'],
+        'statementCount': summary['statements'],
+        'filename': os.path.relpath(summary['path'], OUTPUT_FOLDER),
+        'cached': summary['cached']
+    } for summary in merge_all(DB_PATH, OUTPUT_FOLDER, start_date, end_date, workers)]
+
+def process_pdf_upload(stream, filename, extraction_mode="text"):
+    """Save an uploaded PDF stream to a temporary file and split it into OUTPUT_FOLDER.
+
+    The upload is hashed while it is saved; the hash is the job id that
+    /api/jobs reports progress under, and re-uploading a file that failed
+    part way resumes from its checkpoint.
+    """
+    temp_dir = tempfile.mkdtemp()
+    digest = hashlib.sha256()
+    try:
+        temp_path = os.path.join(temp_dir, safe_filename(filename) or 'upload.pdf')
+        with open(temp_path, 'wb') as temp_file:
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                digest.update(block)
+                temp_file.write(block)
+
+        # Process PDF using existing function
+        split_pdf(temp_path, OUTPUT_FOLDER, extraction_mode, progress_callback=job_progress(digest.hexdigest()),
+                  input_hash=digest.hexdigest())
+    finally:
+        # Clean up
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return {'message': 'PDF processed successfully', 'jobId': digest.hexdigest()}
+
+def job_summary(checkpoint):
+    total = checkpoint['total_pages'] or 0
+    return {
+        'id': checkpoint['file_hash'],
+        'source': os.path.basename(checkpoint['source'] or ''),
+        'status': checkpoint['status'],
+        'pagesDone': checkpoint['next_page'],
+        'totalPages': total,
+        'progress': checkpoint['next_page'] / total if total else 1.0,
+        'error': checkpoint['error'],
+        'started': checkpoint['started'],
+        'updated': checkpoint['updated']
+    }
+
+def list_jobs(unfinished=False):
+    """Ingest jobs from their checkpoints; pagesDone only advances when a batch commits"""
+    return [job_summary(checkpoint) for checkpoint in get_ingest_checkpoints(DB_PATH, unfinished=unfinished)]
+
+def get_job(job_id):
+    checkpoints = get_ingest_checkpoints(DB_PATH, file_hash=job_id)
+    return job_summary(checkpoints[0]) if checkpoints else None
+
+def rows_by_id(c, select, id_column, ids, group_by=''):
+    rows = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        c.execute(f"{select} WHERE {id_column} IN ({', '.join('?' * len(chunk))}) {group_by}", chunk)
+        rows.extend(c.fetchall())
+    return rows
+
+def sync_changes(since=None):
+    """Individuals and pay statements changed since the version of an earlier sync.
+
+    Rows come back shaped like the list endpoints, with the ids of deleted
+    rows alongside. Without since, or with a version from a rebuilt
+    database, reset is set and the replies walk the whole dataset; either
+    way, keep calling with the returned version while more is set.
+    """
+    generation, _, since_seq = (since or '').rpartition('-')
+    if since and not since_seq.isdigit():
+        raise ValueError("since must be a version returned by /api/sync")
+
+    conn = connect()
+    c = conn.cursor()
+    # One read transaction, so the log and the rows agree
+    c.execute("BEGIN")
+    try:
+        current_generation, last_seq, changes = get_changes(c, int(since_seq or 0), SYNC_PAGE_SIZE)
+        reset = generation != current_generation
+        if reset and since_seq not in ('', '0'):
+            current_generation, last_seq, changes = get_changes(c, 0, SYNC_PAGE_SIZE)
+
+        individual_ids = changes.get('individuals', [])
+        statement_ids = changes.get('pay_statements', [])
+        individuals = rows_by_id(c, INDIVIDUALS_SELECT, 'i.id', individual_ids, 'GROUP BY i.id')
+        statements = rows_by_id(c, PAY_STATEMENTS_SELECT, 'ps.id', statement_ids)
+    finally:
+        conn.commit()
+
+    def deleted(ids, rows):
+        # A client starting over never had the rows that are gone
+        return [] if reset else sorted(set(ids) - {row[0] for row in rows})
+
+    return {
+        'version': f"{current_generation}-{last_seq}",
+        'reset': reset,
+        'more': len(individual_ids) + len(statement_ids) == SYNC_PAGE_SIZE,
+        'individuals': {
+            'upserted': [individual_json(row) for row in individuals],
+            'deleted': deleted(individual_ids, individuals)
+        },
+        'payStatements': {
+            'upserted': [pay_statement_json(row) for row in statements],
+            'deleted': deleted(statement_ids, statements)
+        }
+    }
+
+# List endpoints whose rows are cached per data version, and whether their
+# rows carry fileData
+CACHED_ENDPOINTS = {
+    'individuals': (list_individuals, False),
+    'pay_statements': (list_pay_statements, True),
+    'individual_pay_statements': (list_individual_pay_statements, True),
+}
+
+def data_version():
+    return get_data_version(DB_PATH)
+
+def etag_matches(if_none_match, version):
+    """Check an If-None-Match header value against the current data version"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or f'"{version}"' in tags or f'W/"{version}"' in tags
+
+@lru_cache(maxsize=16)
+def cached_rows(version, endpoint, *args):
+    """Rows of a list endpoint for one data version, without fileData.
+
+    A new version means new keys, so stale entries simply age out of the LRU.
+    """
+    list_rows, file_data = CACHED_ENDPOINTS[endpoint]
+    return list_rows(*args, file_data=False) if file_data else list_rows(*args)
+
+def cached_response(version, endpoint, *args):
+    """Serialized JSON body of a list endpoint for one data version.
+
+    The PDFs are read for each response rather than cached, so the cache
+    holds metadata only.
+    """
+    rows = cached_rows(version, endpoint, *args)
+    if CACHED_ENDPOINTS[endpoint][1]:
+        rows = [dict(row, fileData=read_pdf_base64(row['filename'])) for row in rows]
+    return json.dumps(rows).encode('utf-8')
+
+# Live change feed behind /api/events. Writes made by this process are
+# published with their row ids as they commit; a watcher thread, running
+# only while someone listens, adds ingest progress from the checkpoints and
+# a version event for writes made by other processes.
+EVENT_POLL_INTERVAL = 1.0
+EVENT_KEEPALIVE = 15
+EVENT_BACKLOG = 1000
+PROGRESS_EVENT_INTERVAL = 0.25
+# Streams the Flask backend serves at once; each holds a worker thread, so
+# serve.run sets this below the thread count to keep threads for requests
+MAX_EVENT_STREAMS = 8
+
+_event_lock = threading.Lock()
+_event_listeners = []
+_event_watcher = None
+_last_rows_version = None
+_event_streams = 0
+
+def format_event(event):
+    """One server-sent event, named after the event's type"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def publish_event(event):
+    with _event_lock:
+        listeners = list(_event_listeners)
+    for deliver in listeners:
+        try:
+            deliver(event)
+        except Exception as e:
+            print(f"Event listener failed: {e}")
+
+def push_event(q, event):
+    """Queue an event for one client; a client EVENT_BACKLOG events behind gets a single resync instead"""
+    if q.full():
+        try:
+            while not q.empty():
+                q.get_nowait()
+        except queue.Empty:
+            pass
+        event = {'type': 'resync'}
+    q.put_nowait(event)
+
+def listen_events(deliver):
+    """Call deliver(event) with each live event until the returned close() is called.
+
+    Events are dicts whose 'type' is:
+      rows     ids inserted, updated and deleted in one table, with the new version
+      job      ingest progress, shaped like /api/jobs entries
+      version  the data changed in another process; re-fetch anything stale
+      resync   events were dropped because the client fell behind
+    deliver is called from writer and watcher threads and must not block.
+    """
+    global _event_watcher
+    with _event_lock:
+        _event_listeners.append(deliver)
+        if _event_watcher is None:
+            _event_watcher = threading.Thread(target=watch_changes, name='event-watcher', daemon=True)
+            _event_watcher.start()
+
+    def close():
+        with _event_lock:
+            if deliver in _event_listeners:
+                _event_listeners.remove(deliver)
+    return close
+
+def publish_rows(db_path, table, inserted, updated, deleted):
+    global _last_rows_version
+    if db_path != DB_PATH or not _event_listeners:
+        return
+    _last_rows_version = data_version()
+    publish_event({'type': 'rows', 'table': table, 'inserted': inserted, 'updated': updated,
+                   'deleted': deleted, 'version': _last_rows_version})
+
+subscribe(publish_rows)
+
+def job_progress(job_id):
+    """split_pdf progress callback publishing job events, at most one per PROGRESS_EVENT_INTERVAL"""
+    last = [0.0]
+
+    def report(done, total):
+        now = time.monotonic()
+        if done == total or now - last[0] >= PROGRESS_EVENT_INTERVAL:
+            last[0] = now
+            publish_event({'type': 'job', 'id': job_id, 'status': 'running', 'pagesDone': done,
+                           'totalPages': total, 'progress': done / total if total else 1.0})
+    return report
+
+def watch_changes():
+    """Publish checkpoint progress and other processes' writes until the last listener leaves"""
+    global _event_watcher
+    version = data_version()
+    since = datetime.datetime.now().isoformat(timespec='seconds')
+    jobs = {}
+    while True:
+        time.sleep(EVENT_POLL_INTERVAL)
+        with _event_lock:
+            if not _event_listeners:
+                _event_watcher = None
+                return
+        try:
+            # Timestamps have one-second resolution, so a row can come back
+            # on the next poll too; jobs filters out what was already sent
+            polled = datetime.datetime.now().isoformat(timespec='seconds')
+            checkpoints = get_ingest_checkpoints(DB_PATH, updated_since=since)
+            since = polled
+            seen = {}
+            for checkpoint in checkpoints:
+                state = (checkpoint['next_page'], checkpoint['status'], checkpoint['updated'])
+                seen[checkpoint['file_hash']] = state
+                if jobs.get(checkpoint['file_hash']) != state:
+                    publish_event({'type': 'job', **job_summary(checkpoint)})
+            jobs = seen
+
+            current = data_version()
+            if current != version:
+                version = current
+                if current != _last_rows_version:
+                    publish_event({'type': 'version', 'version': current})
+        except Exception as e:
+            print(f"Event watcher failed: {e}")
+
+def reserve_event_stream():
+    """Claim one of MAX_EVENT_STREAMS stream slots; returns its release(), or None when all are taken"""
+    global _event_streams
+    with _event_lock:
+        if _event_streams >= MAX_EVENT_STREAMS:
+            return None
+        _event_streams += 1
+    released = [False]
+
+    def release():
+        global _event_streams
+        with _event_lock:
+            if not released[0]:
+                released[0] = True
+                _event_streams -= 1
+    return release
+
+def event_stream():
+    """Server-sent event text for one client, blocking between events"""
+    q = queue.Queue(maxsize=EVENT_BACKLOG)
+    close = listen_events(lambda event: push_event(q, event))
+    try:
+        # Sent after listening starts, so no change falls between the two
+        yield 'retry: 3000\n' + format_event({'type': 'hello', 'version': data_version()})
+        while True:
+            try:
+                event = q.get(timeout=EVENT_KEEPALIVE)
+            except queue.Empty:
+                # Keeps proxies from closing the connection and notices clients that left
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        close()
@@ -0,0 +1,314 @@
+"""
+ASGI variant of backend.py serving the same /api contract.
+
+Database work and PDF processing run in Starlette's thread pool, and PDF
+downloads are streamed asynchronously, so slow clients never hold up the
+event loop. Run with:
+
+    uvicorn asgi_backend:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+from functools import wraps
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+import api_service
+
+def api_errors(handler):
+    """Report bad query parameters as 400s and unexpected errors the same way as the Flask backend"""
+    @wraps(handler)
+    async def wrapper(request):
+        try:
+            return await handler(request)
+        except api_service.ParameterError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        except Exception as e:
+            return JSONResponse({'error': str(e)}, status_code=500)
+    return wrapper
+
+async def conditional_json(request, endpoint, *args):
+    """Serve a cached list endpoint, answering 304 while the client's ETag is current"""
+    version = await run_in_threadpool(api_service.data_version)
+    headers = {'ETag': f'"{version}"'}
+    if api_service.etag_matches(request.headers.get('if-none-match'), version):
+        return Response(status_code=304, headers=headers)
+    body = await run_in_threadpool(api_service.cached_response, version, endpoint, *args)
+    return Response(body, media_type='application/json', headers=headers)
+
+@api_errors
+async def get_all_individuals(request):
+    return await conditional_json(request, 'individuals')
+
+@api_errors
+async def update_individual(request):
+    data = await request.json()
+    return JSONResponse(await run_in_threadpool(api_service.update_individual, request.path_params['name'], data))
+
+@api_errors
+async def get_all_paystubs(request):
+    return await conditional_json(request, 'pay_statements')
+
+@api_errors
+async def get_individual_paystubs(request):
+    return await conditional_json(request, 'individual_pay_statements', request.path_params['individual_id'])
+
+@api_errors
+async def get_paystub_lines(request):
+    return JSONResponse(await run_in_threadpool(api_service.pay_statement_lines, request.path_params['paystub_id']))
+
+@api_errors
+async def get_paystub_file(request):
+    pdf_path = await run_in_threadpool(api_service.pay_statement_path, request.path_params['paystub_id'])
+    if not pdf_path:
+        return JSONResponse({'error': 'Paystub not found'}, status_code=404)
+    # FileResponse reads the file in chunks through anyio's async file API
+    return FileResponse(pdf_path, media_type='application/pdf')
+
+@api_errors
+async def get_line_item_report(request):
+    return JSONResponse(await run_in_threadpool(
+        api_service.line_item_report,
+        request.query_params.get('year'),
+        api_service.int_param(request.query_params.get('individual_id'), 'individual_id')))
+
+def report_filters(params):
+    return (params.get('year'), api_service.int_param(params.get('individual_id'), 'individual_id'),
+            params.get('company'))
+
+@api_errors
+async def get_summary_report(request):
+    params = request.query_params
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.summary_report, params.get('by', 'year'), *report_filters(params)))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_rolling_report(request):
+    params = request.query_params
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.rolling_report, api_service.int_param(params.get('window'), 'window', 28),
+            *report_filters(params)))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_pay_interval_report(request):
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.pay_interval_report, *report_filters(request.query_params)))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_individual_ytd(request):
+    year = request.query_params.get('year')
+    if not year:
+        return JSONResponse({'error': 'year is required'}, status_code=400)
+    return JSONResponse(await run_in_threadpool(api_service.ytd_report, request.path_params['individual_id'], year))
+
+@api_errors
+async def delete_paystub(request):
+    if await run_in_threadpool(api_service.delete_pay_statement, request.path_params['paystub_id']):
+        return JSONResponse({'message': 'Paystub deleted successfully'})
+    return JSONResponse({'error': 'Paystub not found'}, status_code=404)
+
+@api_errors
+async def bulk_delete_paystubs(request):
+    data = await request.json() or {}
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.delete_pay_statements_bulk,
+            data.get('ids'), data.get('individual_id'), data.get('year'), data.get('company')))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def bulk_update_individuals(request):
+    data = await request.json() or {}
+    try:
+        return JSONResponse(await run_in_threadpool(api_service.update_individuals_bulk, data.get('updates')))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_similar_individuals(request):
+    params = request.query_params
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.similar_individuals, params.get('name'),
+            api_service.int_param(params.get('limit'), 'limit', 10)))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_duplicate_individuals(request):
+    return JSONResponse(await run_in_threadpool(api_service.duplicate_individuals))
+
+@api_errors
+async def merge_individuals(request):
+    data = await request.json() or {}
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.merge_individuals_into, data.get('target'), data.get('sources')))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except LookupError as e:
+        return JSONResponse({'error': str(e)}, status_code=404)
+
+@api_errors
+async def get_merged_statements(request):
+    params = request.query_params
+    pdf_path = await run_in_threadpool(
+        api_service.merged_statements_path, request.path_params['individual_id'],
+        params.get('year'), params.get('start'), params.get('end'))
+    if not pdf_path:
+        return JSONResponse({'error': 'No pay statements in range'}, status_code=404)
+    return FileResponse(pdf_path, media_type='application/pdf')
+
+@api_errors
+async def merge_statements(request):
+    data = await request.json() or {}
+    return JSONResponse(await run_in_threadpool(
+        api_service.merge_all_statements, data.get('year'), data.get('start'), data.get('end')))
+
+@api_errors
+async def export_paystubs(request):
+    params = request.query_params
+    try:
+        chunks, media_type, download_name = await run_in_threadpool(
+            api_service.export_pay_statements,
+            params.get('format', 'zip'),
+            api_service.parse_ids(params.get('ids')),
+            api_service.int_param(params.get('individual_id'), 'individual_id'),
+            params.get('year'),
+            params.get('company'))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    except LookupError as e:
+        return JSONResponse({'error': str(e)}, status_code=404)
+    # StreamingResponse iterates the synchronous generator in the thread pool
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
+@api_errors
+async def export_table(request):
+    params = request.query_params
+    try:
+        chunks, media_type, download_name = await run_in_threadpool(
+            api_service.export_table_stream,
+            params.get('table', 'pay_statements'),
+            params.get('format', 'csv'),
+            api_service.int_param(params.get('individual_id'), 'individual_id'),
+            params.get('year'),
+            params.get('company'))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
+@api_errors
+async def get_jobs(request):
+    unfinished = request.query_params.get('unfinished') == 'true'
+    return JSONResponse(await run_in_threadpool(api_service.list_jobs, unfinished))
+
+@api_errors
+async def get_job(request):
+    job = await run_in_threadpool(api_service.get_job, request.path_params['job_id'])
+    if not job:
+        return JSONResponse({'error': 'Job not found'}, status_code=404)
+    return JSONResponse(job)
+
+@api_errors
+async def sync(request):
+    try:
+        return JSONResponse(await run_in_threadpool(api_service.sync_changes, request.query_params.get('since')))
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+@api_errors
+async def get_events(request):
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue(maxsize=api_service.EVENT_BACKLOG)
+    # Events arrive on writer threads and are handed to the event loop
+    close = api_service.listen_events(
+        lambda event: loop.call_soon_threadsafe(api_service.push_event, events, event))
+
+    async def stream():
+        try:
+            version = await run_in_threadpool(api_service.data_version)
+            yield 'retry: 3000\n' + api_service.format_event({'type': 'hello', 'version': version})
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), api_service.EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield api_service.format_event(event)
+        finally:
+            close()
+
+    # Unlike the Flask backend, a waiting client holds no thread
+    return StreamingResponse(stream(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_errors
+async def process_pdf(request):
+    form = await request.form()
+    pdf_file = form.get('pdf')
+    if pdf_file is None or isinstance(pdf_file, str):
+        return JSONResponse({'error': 'No PDF file provided'}, status_code=400)
+    if pdf_file.filename == '':
+        return JSONResponse({'error': 'No file selected'}, status_code=400)
+
+    try:
+        return JSONResponse(await run_in_threadpool(
+            api_service.process_pdf_upload,
+            pdf_file.file,
+            pdf_file.filename,
+            form.get('extraction_mode', 'text')))
+    finally:
+        await pdf_file.close()
+
+routes = [
+    Route('/api/individuals', get_all_individuals, methods=['GET']),
+    Route('/api/individuals/bulk-update', bulk_update_individuals, methods=['POST']),
+    Route('/api/individuals/similar', get_similar_individuals, methods=['GET']),
+    Route('/api/individuals/duplicates', get_duplicate_individuals, methods=['GET']),
+    Route('/api/individuals/merge', merge_individuals, methods=['POST']),
+    Route('/api/individuals/{name}', update_individual, methods=['PUT']),
+    Route('/api/individuals/{individual_id:int}/ytd', get_individual_ytd, methods=['GET']),
+    Route('/api/individuals/{individual_id:int}/merged', get_merged_statements, methods=['GET']),
+    Route('/api/pay-statements', get_all_paystubs, methods=['GET']),
+    Route('/api/pay-statements/bulk-delete', bulk_delete_paystubs, methods=['POST']),
+    Route('/api/pay-statements/{individual_id:int}', get_individual_paystubs, methods=['GET']),
+    Route('/api/pay-statements/{paystub_id:int}', delete_paystub, methods=['DELETE']),
+    Route('/api/pay-statements/{paystub_id:int}/lines', get_paystub_lines, methods=['GET']),
+    Route('/api/pay-statements/{paystub_id:int}/file', get_paystub_file, methods=['GET']),
+    Route('/api/reports/line-items', get_line_item_report, methods=['GET']),
+    Route('/api/reports/summary', get_summary_report, methods=['GET']),
+    Route('/api/reports/rolling', get_rolling_report, methods=['GET']),
+    Route('/api/reports/pay-intervals', get_pay_interval_report, methods=['GET']),
+    Route('/api/export', export_paystubs, methods=['GET']),
+    Route('/api/export/table', export_table, methods=['GET']),
+    Route('/api/merge', merge_statements, methods=['POST']),
+    Route('/api/jobs', get_jobs, methods=['GET']),
+    Route('/api/jobs/{job_id}', get_job, methods=['GET']),
+    Route('/api/sync', sync, methods=['GET']),
+    Route('/api/events', get_events, methods=['GET']),
+    Route('/api/process-pdf', process_pdf, methods=['POST']),
+]
+
+app = Starlette(routes=routes, middleware=[
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+               expose_headers=['ETag']),
+])
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='127.0.0.1', port=5000)
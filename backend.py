@@ -1,189 +1,313 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
-import os
-import tempfile
-from pdf_processor import split_pdf
-from database_manager import create_database, get_individuals, get_pay_statements, update_individual_info
-import sqlite3
-import base64
+import api_service
+from api_service import OUTPUT_FOLDER, DB_PATH
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag'])
 
-# Create output folder for PDFs and database
-OUTPUT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
-if not os.path.exists(OUTPUT_FOLDER):
-    os.makedirs(OUTPUT_FOLDER)
-
-# Initialize database
-DB_PATH = create_database(OUTPUT_FOLDER)
+def conditional_json(endpoint, *args):
+    """Serve a cached list endpoint, answering 304 while the client's ETag is current"""
+    version = api_service.data_version()
+    if api_service.etag_matches(request.headers.get('If-None-Match'), version):
+        response = Response(status=304)
+    else:
+        response = Response(api_service.cached_response(version, endpoint, *args), mimetype='application/json')
+    response.set_etag(version)
+    return response
 
 @app.route('/api/individuals', methods=['GET'])
 def get_all_individuals():
     try:
-        individuals = get_individuals(DB_PATH)
-        result = []
-        
-        for ind in individuals:
-            # Get paystub count and total earnings for each individual
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute("""
-                SELECT COUNT(*) as count, SUM(amount) as total 
-                FROM pay_statements 
-                WHERE individual_id = ?
-            """, (ind[0],))
-            stats = c.fetchone()
-            conn.close()
-            
-            result.append({
-                'id': ind[0],
-                'name': ind[1],
-                'address': ind[2],
-                'phone_number': ind[3],
-                'email': ind[4],
-                'paystubCount': stats[0] or 0,
-                'totalEarnings': float(stats[1] or 0)
-            })
-        
-        return jsonify(result)
+        return conditional_json('individuals')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/individuals/<name>', methods=['PUT'])
 def update_individual(name):
     try:
-        data = request.json
-        update_individual_info(
-            DB_PATH,
-            name,
-            address=data.get('address'),
-            phone_number=data.get('phone_number'),
-            email=data.get('email')
-        )
-        return jsonify({'message': 'Individual updated successfully'})
+        return jsonify(api_service.update_individual(name, request.json))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/pay-statements', methods=['GET'])
 def get_all_paystubs():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        c.execute("""
-            SELECT ps.id, i.name, ps.date, ps.filename, ps.amount, ps.company
-            FROM pay_statements ps
-            JOIN individuals i ON ps.individual_id = i.id
-            ORDER BY ps.date DESC
-        """)
-        
-        paystubs = []
-        for row in c.fetchall():
-            # Read PDF file and convert to base64
-            try:
-                pdf_path = os.path.join(OUTPUT_FOLDER, row[3])
-                with open(pdf_path, 'rb') as pdf_file:
-                    pdf_data = base64.b64encode(pdf_file.read()).decode('utf-8')
-            except:
-                pdf_data = None
-            
-            paystubs.append({
-                'id': row[0],
-                'name': row[1],
-                'date': row[2],
-                'filename': row[3],
-                'amount': float(row[4]) if row[4] else 0.0,
-                'company': row[5],
-                'fileData': pdf_data
-            })
-        
-        conn.close()
-        return jsonify(paystubs)
+        return conditional_json('pay_statements')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/pay-statements/<int:individual_id>', methods=['GET'])
 def get_individual_paystubs(individual_id):
     try:
-        paystubs = get_pay_statements(DB_PATH, individual_id)
-        result = []
-        
-        for ps in paystubs:
-            # Read PDF file and convert to base64
-            try:
-                pdf_path = os.path.join(OUTPUT_FOLDER, ps[3])
-                with open(pdf_path, 'rb') as pdf_file:
-                    pdf_data = base64.b64encode(pdf_file.read()).decode('utf-8')
-            except:
-                pdf_data = None
-            
-            result.append({
-                'id': ps[0],
-                'date': ps[2],
-                'filename': ps[3],
-                'fileData': pdf_data
-            })
-        
-        return jsonify(result)
+        return conditional_json('individual_pay_statements', individual_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/pay-statements/<int:paystub_id>/lines', methods=['GET'])
+def get_paystub_lines(paystub_id):
+    try:
+        return jsonify(api_service.pay_statement_lines(paystub_id))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/pay-statements/<int:paystub_id>/file', methods=['GET'])
+def get_paystub_file(paystub_id):
+    try:
+        pdf_path = api_service.pay_statement_path(paystub_id)
+        if not pdf_path:
+            return jsonify({'error': 'Paystub not found'}), 404
+        return send_file(pdf_path, mimetype='application/pdf')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/line-items', methods=['GET'])
+def get_line_item_report():
+    try:
+        return jsonify(api_service.line_item_report(
+            year=request.args.get('year'),
+            individual_id=request.args.get('individual_id', type=int)
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/summary', methods=['GET'])
+def get_summary_report():
+    try:
+        return jsonify(api_service.summary_report(
+            by=request.args.get('by', 'year'),
+            year=request.args.get('year'),
+            individual_id=request.args.get('individual_id', type=int),
+            company=request.args.get('company')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/rolling', methods=['GET'])
+def get_rolling_report():
+    try:
+        return jsonify(api_service.rolling_report(
+            window=request.args.get('window', 28, type=int),
+            year=request.args.get('year'),
+            individual_id=request.args.get('individual_id', type=int),
+            company=request.args.get('company')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/pay-intervals', methods=['GET'])
+def get_pay_interval_report():
+    try:
+        return jsonify(api_service.pay_interval_report(
+            year=request.args.get('year'),
+            individual_id=request.args.get('individual_id', type=int),
+            company=request.args.get('company')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/<int:individual_id>/ytd', methods=['GET'])
+def get_individual_ytd(individual_id):
+    try:
+        year = request.args.get('year')
+        if not year:
+            return jsonify({'error': 'year is required'}), 400
+        return jsonify(api_service.ytd_report(individual_id, year))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/pay-statements/<int:paystub_id>', methods=['DELETE'])
 def delete_paystub(paystub_id):
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Get filename before deletion
-        c.execute("SELECT filename FROM pay_statements WHERE id = ?", (paystub_id,))
-        result = c.fetchone()
-        if result:
-            filename = result[0]
-            pdf_path = os.path.join(OUTPUT_FOLDER, filename)
-            
-            # Delete from database
-            c.execute("DELETE FROM pay_statements WHERE id = ?", (paystub_id,))
-            conn.commit()
-            
-            # Delete PDF file
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
-            
+        if api_service.delete_pay_statement(paystub_id):
             return jsonify({'message': 'Paystub deleted successfully'})
         else:
             return jsonify({'error': 'Paystub not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+@app.route('/api/pay-statements/bulk-delete', methods=['POST'])
+def bulk_delete_paystubs():
+    try:
+        data = request.json or {}
+        return jsonify(api_service.delete_pay_statements_bulk(
+            ids=data.get('ids'),
+            individual_id=data.get('individual_id'),
+            year=data.get('year'),
+            company=data.get('company')
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/bulk-update', methods=['POST'])
+def bulk_update_individuals():
+    try:
+        return jsonify(api_service.update_individuals_bulk((request.json or {}).get('updates')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/similar', methods=['GET'])
+def get_similar_individuals():
+    try:
+        return jsonify(api_service.similar_individuals(request.args.get('name'),
+                                                       request.args.get('limit', 10, type=int)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/duplicates', methods=['GET'])
+def get_duplicate_individuals():
+    try:
+        return jsonify(api_service.duplicate_individuals())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/merge', methods=['POST'])
+def merge_individuals():
+    try:
+        data = request.json or {}
+        return jsonify(api_service.merge_individuals_into(data.get('target'), data.get('sources')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/individuals/<int:individual_id>/merged', methods=['GET'])
+def get_merged_statements(individual_id):
+    try:
+        pdf_path = api_service.merged_statements_path(
+            individual_id,
+            year=request.args.get('year'),
+            start_date=request.args.get('start'),
+            end_date=request.args.get('end')
+        )
+        if not pdf_path:
+            return jsonify({'error': 'No pay statements in range'}), 404
+        return send_file(pdf_path, mimetype='application/pdf')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/merge', methods=['POST'])
+def merge_statements():
+    try:
+        data = request.json or {}
+        return jsonify(api_service.merge_all_statements(
+            year=data.get('year'),
+            start_date=data.get('start'),
+            end_date=data.get('end')
+        ))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export', methods=['GET'])
+def export_paystubs():
+    try:
+        chunks, mimetype, download_name = api_service.export_pay_statements(
+            export_format=request.args.get('format', 'zip'),
+            ids=api_service.parse_ids(request.args.get('ids')),
+            individual_id=request.args.get('individual_id', type=int),
+            year=request.args.get('year'),
+            company=request.args.get('company')
+        )
+        # No Content-Length, so the archive goes out with chunked transfer encoding
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/export/table', methods=['GET'])
+def export_table():
+    try:
+        chunks, mimetype, download_name = api_service.export_table_stream(
+            request.args.get('table', 'pay_statements'),
+            table_format=request.args.get('format', 'csv'),
+            individual_id=request.args.get('individual_id', type=int),
+            year=request.args.get('year'),
+            company=request.args.get('company')
+        )
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    try:
+        return jsonify(api_service.list_jobs(request.args.get('unfinished') == 'true'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        job = api_service.get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sync', methods=['GET'])
+def sync():
+    try:
+        return jsonify(api_service.sync_changes(request.args.get('since')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    try:
+        # Each listening client holds one worker thread for as long as it is connected,
+        # so streams are capped; asgi_backend serves any number without threads
+        release = api_service.reserve_event_stream()
+        if release is None:
+            return jsonify({'error': 'Too many event streams'}), 503, {'Retry-After': '30'}
+        response = Response(stream_with_context(api_service.event_stream()), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        # Runs when the server closes the response, even if the stream never started
+        response.call_on_close(release)
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/process-pdf', methods=['POST'])
 def process_pdf():
     try:
         if 'pdf' not in request.files:
             return jsonify({'error': 'No PDF file provided'}), 400
-        
+
         pdf_file = request.files['pdf']
         if pdf_file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
-        
-        # Save uploaded file to temporary location
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, secure_filename(pdf_file.filename))
-        pdf_file.save(temp_path)
-        
-        # Process PDF using existing function
-        split_pdf(temp_path, OUTPUT_FOLDER)
-        
-        # Clean up
-        os.remove(temp_path)
-        os.rmdir(temp_dir)
-        
-        return jsonify({'message': 'PDF processed successfully'})
+
+        return jsonify(api_service.process_pdf_upload(
+            pdf_file.stream,
+            pdf_file.filename,
+            request.form.get('extraction_mode', 'text')
+        ))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
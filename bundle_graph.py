@@ -0,0 +1,64 @@
+"""
+Compute the modules the app bundle actually needs, starting from main.py.
+
+setup.py passes the result to py2app as includes/excludes so the bundle
+only carries what the import graph reaches instead of everything py2app's
+own scan drags in through incidental imports.
+"""
+import os
+import sys
+import pkgutil
+import modulefinder
+
+# Reached only through debugging, documentation and test helpers
+# (traceback -> doctest -> pdb -> pydoc -> tkinter and friends), never at runtime
+PRUNED_MODULES = [
+    'test', 'unittest', 'doctest', 'pdb', 'bdb', 'pydoc', 'pydoc_data', 'tkinter', '_tkinter',
+    'turtle', 'idlelib', 'lib2to3', 'distutils', 'ensurepip', 'venv', 'setuptools', 'pkg_resources',
+    '_distutils_hack', 'pip', 'wheel', 'xmlrpc', 'ftplib', 'webbrowser', 'curses', 'readline',
+    '_testcapi', '_testinternalcapi', 'py_compile', 'tarfile',
+]
+
+# Optional dependencies of the table export and analytics; the app reports a clear error
+# when they are missing, so they stay out of the bundle
+OPTIONAL_MODULES = ['pyarrow', 'openpyxl', 'numpy', 'PIL', 'yaml', 'Crypto']
+
+# Needed by the interpreter bootstrap even though no app module imports them
+BOOTSTRAP_MODULES = ['site', 'encodings', 'codecs', 'zipimport', 'io', 'abc', 'stat', 'posixpath',
+                     'genericpath', 'os', '_collections_abc', '_sitebuiltins']
+
+def find_modules(script):
+    """Return the set of module names reachable from script, including function-level imports"""
+    finder = modulefinder.ModuleFinder(path=[os.path.dirname(os.path.abspath(script))] + sys.path,
+                                       excludes=PRUNED_MODULES + OPTIONAL_MODULES)
+    finder.run_script(script)
+    return {name for name in finder.modules if name != '__main__'}
+
+def available_top_level():
+    """Every top-level module or package importable in this environment"""
+    names = set(sys.stdlib_module_names)
+    names.update(module.name for module in pkgutil.iter_modules())
+    return names
+
+def bundle_modules(script='main.py'):
+    """Return (includes, excludes) for py2app"""
+    modules = find_modules(script)
+    top_level = {name.split('.')[0] for name in modules} | set(BOOTSTRAP_MODULES)
+
+    excludes = sorted((available_top_level() - top_level) | set(PRUNED_MODULES) | set(OPTIONAL_MODULES))
+
+    # PyQt5 ships dozens of bindings; keep only the ones the app imports
+    try:
+        import PyQt5
+        excludes += sorted(f"PyQt5.{module.name}" for module in pkgutil.iter_modules(PyQt5.__path__)
+                           if f"PyQt5.{module.name}" not in modules and module.name != 'sip')
+    except ImportError:
+        pass
+
+    return sorted(modules), excludes
+
+if __name__ == '__main__':
+    includes, excludes = bundle_modules()
+    print(f"{len(includes)} modules reachable from main.py:")
+    print(', '.join(sorted({name.split('.')[0] for name in includes})))
+    print(f"{len(excludes)} excluded")
@@ -0,0 +1,92 @@
+"""
+Measure an app bundle's size and launch time, optionally against a saved baseline.
+
+    python bundle_report.py dist/Paystub.app --save before.json
+    python setup.py py2app
+    python bundle_report.py dist/Paystub.app --compare before.json
+
+Launch time is the app's own time to first paint, reported by main.py
+when started with --startup-probe, plus the wall time until it exits.
+"""
+import os
+import re
+import sys
+import json
+import glob
+import time
+import argparse
+import statistics
+import subprocess
+
+FIRST_PAINT_LINE = re.compile(r'Time to first paint: ([\d.]+) ms')
+
+def directory_size(path):
+    total = files = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            full_path = os.path.join(root, name)
+            if not os.path.islink(full_path):
+                total += os.path.getsize(full_path)
+                files += 1
+    return total, files
+
+def measure_size(app_path):
+    total, files = directory_size(app_path)
+    zipped = glob.glob(os.path.join(app_path, 'Contents', 'Resources', 'lib', 'python*.zip'))
+    return {
+        'bundle_bytes': total,
+        'files': files,
+        'stdlib_zip_bytes': os.path.getsize(zipped[0]) if zipped else None,
+    }
+
+def measure_launch(app_path, runs=5):
+    """Median first-paint and wall time over several launches"""
+    executable = os.path.join(app_path, 'Contents', 'MacOS', os.path.splitext(os.path.basename(app_path))[0])
+    first_paint = []
+    wall = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([executable, '--startup-probe'], capture_output=True, text=True, timeout=120)
+        wall.append((time.perf_counter() - start) * 1000)
+        match = FIRST_PAINT_LINE.search(result.stdout)
+        if match:
+            first_paint.append(float(match.group(1)))
+    return {
+        'first_paint_ms': statistics.median(first_paint) if first_paint else None,
+        'launch_wall_ms': statistics.median(wall),
+    }
+
+def print_report(report, baseline=None):
+    for key, value in report.items():
+        if value is None:
+            print(f"{key:>18}: n/a")
+            continue
+        line = f"{key:>18}: {value:,.0f}"
+        previous = baseline.get(key) if baseline else None
+        if previous:
+            line += f"  (was {previous:,.0f}, {(value - previous) / previous * 100:+.1f}%)"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report bundle size and launch time")
+    parser.add_argument("app", help="Path to the built .app bundle")
+    parser.add_argument("--runs", type=int, default=5, help="Launches to take the median of")
+    parser.add_argument("--save", help="Write the measurements to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier --save")
+    args = parser.parse_args(argv)
+
+    report = measure_size(args.app)
+    report.update(measure_launch(args.app, args.runs))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
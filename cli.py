@@ -0,0 +1,156 @@
+import os
+import argparse
+
+DEFAULT_FOLDER = os.path.join(os.getcwd(), "Split")
+
+def reparse_command(args):
+    from pdf_processor import reparse_cache
+    reparsed, updated, identity_changed = reparse_cache(args.folder, workers=args.workers)
+    print(f"Re-parsed {reparsed} pages, updated {updated} statements, "
+          f"{identity_changed} left for re-ingest")
+
+def rebuild_command(args):
+    from pdf_processor import rebuild_database
+    rebuild_database(args.folder, workers=args.workers, extraction_mode=args.mode,
+                     resume=not args.restart)
+
+def merge_command(args):
+    from database_manager import create_database
+    from statement_merger import merge_individual, merge_all, year_range
+    db_path = create_database(args.folder)
+    start_date, end_date = year_range(args.year) if args.year else (args.start, args.end)
+    if args.individual:
+        summaries = [merge_individual(db_path, args.folder, args.individual, start_date, end_date)]
+    else:
+        summaries = merge_all(db_path, args.folder, start_date, end_date, workers=args.workers)
+    for summary in summaries:
+        if summary['path']:
+            print(f"{summary['name']}: {summary['statements']} statements -> {summary['path']}"
+                  f"{' (cached)' if summary['cached'] else ''}")
+    print(f"Merged statements for {sum(1 for summary in summaries if summary['path'])} individuals")
+
+def export_table_command(args):
+    from database_manager import create_database
+    from table_export import export_table
+    db_path = create_database(args.folder)
+    output = args.output or f"{args.table}.{args.format}"
+    export_table(db_path, args.table, output, args.format,
+                 individual_id=args.individual, year=args.year, company=args.company)
+    print(f"Exported {args.table} to {output}")
+
+def merge_names_command(args):
+    from database_manager import (create_database, find_duplicate_names, get_individuals, merge_individuals,
+                                  duplicate_file_paths)
+    db_path = create_database(args.folder)
+    groups = find_duplicate_names(db_path)
+    names = {individual[0]: individual[1] for individual in get_individuals(db_path)}
+    for group in groups:
+        print(f"{names[group[0]]} <- {', '.join(names[individual_id] for individual_id in group[1:])}")
+        if not args.dry_run:
+            _, duplicates = merge_individuals(db_path, group[0], group[1:])
+            for path in duplicate_file_paths(args.folder, duplicates):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    print(f"{len(groups)} names {'would be' if args.dry_run else 'were'} merged")
+
+def watch_command(args):
+    from folder_watcher import InboxWatcher
+    watcher = InboxWatcher(args.inbox, args.folder, workers=args.workers, poll_interval=args.interval,
+                           settle_time=args.settle, extraction_mode=args.mode)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+def serve_command(args):
+    from serve import run
+    run(bind=args.bind, workers=args.workers, threads=args.threads, timeout=args.timeout,
+        graceful_timeout=args.graceful_timeout)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paystub Manager command line tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    reparse_parser = subparsers.add_parser(
+        "reparse", help="Re-run the parsers over cached page text without reading the PDFs")
+    reparse_parser.add_argument("--folder", default=DEFAULT_FOLDER,
+                                help="Folder holding pdf_data.db and extraction_cache.db")
+    reparse_parser.add_argument("--workers", type=int, default=None,
+                                help="Parser processes (defaults to the CPU count)")
+    reparse_parser.set_defaults(func=reparse_command)
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild", help="Rebuild pdf_data.db from the single-page PDFs in the Split folder")
+    rebuild_parser.add_argument("--folder", default=DEFAULT_FOLDER,
+                                help="Split folder to scan; the rebuilt pdf_data.db is written there")
+    rebuild_parser.add_argument("--workers", type=int, default=None,
+                                help="Extraction processes (defaults to the CPU count)")
+    rebuild_parser.add_argument("--mode", choices=["text", "regions"], default="text",
+                                help="Field parsing mode (regions matches fields by position) for pages missing from the cache")
+    rebuild_parser.add_argument("--restart", action="store_true",
+                                help="Discard an interrupted rebuild instead of resuming it")
+    rebuild_parser.set_defaults(func=rebuild_command)
+
+    merge_parser = subparsers.add_parser(
+        "merge", help="Merge each individual's pay statements into one PDF per date range")
+    merge_parser.add_argument("--folder", default=DEFAULT_FOLDER,
+                              help="Folder holding pdf_data.db and the split PDFs")
+    merge_parser.add_argument("--year", help="Merge statements dated in this year")
+    merge_parser.add_argument("--start", help="First statement date, YYYY-MM-DD")
+    merge_parser.add_argument("--end", help="Last statement date, YYYY-MM-DD")
+    merge_parser.add_argument("--individual", type=int, default=None,
+                              help="Merge only this individual id instead of everyone")
+    merge_parser.add_argument("--workers", type=int, default=None,
+                              help="Merge processes (defaults to the CPU count)")
+    merge_parser.set_defaults(func=merge_command)
+
+    export_parser = subparsers.add_parser(
+        "export-table", help="Export a database table to CSV, Parquet or XLSX")
+    export_parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder holding pdf_data.db")
+    export_parser.add_argument("--table", choices=["individuals", "pay_statements", "pay_statement_lines"],
+                               default="pay_statements")
+    export_parser.add_argument("--format", choices=["csv", "parquet", "xlsx"], default="csv")
+    export_parser.add_argument("--output", help="Output file (defaults to <table>.<format>)")
+    export_parser.add_argument("--year", help="Only statements dated in this year")
+    export_parser.add_argument("--individual", type=int, default=None, help="Only this individual id")
+    export_parser.add_argument("--company", help="Only statements from this company")
+    export_parser.set_defaults(func=export_table_command)
+
+    merge_names_parser = subparsers.add_parser(
+        "merge-names", help="Merge individuals whose names differ only in case, spacing, punctuation or order")
+    merge_names_parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Folder holding pdf_data.db")
+    merge_names_parser.add_argument("--dry-run", action="store_true", help="List the merges without making them")
+    merge_names_parser.set_defaults(func=merge_names_command)
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Split every PDF that lands in an inbox folder")
+    watch_parser.add_argument("--inbox", required=True, help="Folder to watch for new PDFs")
+    watch_parser.add_argument("--folder", default=DEFAULT_FOLDER,
+                              help="Split folder holding pdf_data.db, where the statements are written")
+    watch_parser.add_argument("--workers", type=int, default=2, help="Ingest processes")
+    watch_parser.add_argument("--interval", type=float, default=1.0, help="Seconds between inbox scans")
+    watch_parser.add_argument("--settle", type=float, default=2.0,
+                              help="Seconds a file's size must stay unchanged before it is ingested")
+    watch_parser.add_argument("--mode", choices=["text", "regions"], default="text",
+                              help="Field parsing mode (regions matches fields by position)")
+    watch_parser.set_defaults(func=watch_command)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run the API under gunicorn with preforked workers")
+    serve_parser.add_argument("--bind", default="127.0.0.1:5000")
+    serve_parser.add_argument("--workers", type=int, default=None,
+                              help="Worker processes (defaults to 2 x CPUs + 1)")
+    serve_parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    serve_parser.add_argument("--timeout", type=int, default=300,
+                              help="Seconds before a silent worker is restarted; covers long ingests")
+    serve_parser.add_argument("--graceful-timeout", type=int, default=30,
+                              help="Seconds workers get to finish requests on shutdown")
+    serve_parser.set_defaults(func=serve_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
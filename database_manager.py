@@ -1,9 +1,71 @@
 import os
+import glob
+import time
 import sqlite3
 import datetime
+import threading
+try:
+    import fcntl
+except ImportError:
+    # Windows: recovery still runs once per process, just without the cross-process lock
+    fcntl = None
+from name_matching import NAME_KEY_VERSION, normalize_name, phonetic_key, name_trigrams, similarity
 
-def create_database(output_folder):
-    db_path = os.path.join(output_folder, 'pdf_data.db')
+# Suffix of the temporary files split_pdf writes before renaming them into place
+INGEST_TEMP_SUFFIX = '.ingest.tmp'
+
+# Output folders this process has already run recover_ingest on
+_recovered_folders = set()
+_recover_lock = threading.Lock()
+
+# Process-local cache of each database's data version, keyed by db_path and
+# validated against the database files' stat signature
+_data_versions = {}
+
+# Listed rather than ps.* because migrated databases order the columns differently
+PAY_STATEMENT_COLUMNS = ("ps.id, ps.individual_id, ps.date, ps.filename, ps.extraction_date, "
+                         "ps.amount_cents, ps.company, ps.page_hash")
+
+# Most index entries a similar-name lookup will examine per key
+CANDIDATE_LIMIT = 1000
+
+# Callbacks told about each committed change; see subscribe()
+_change_subscribers = []
+
+# Longest a reporting read may lag behind the live database, in seconds
+SNAPSHOT_MAX_AGE = 30
+_snapshot_lock = threading.Lock()
+
+def table_columns(c, table):
+    c.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in c.fetchall()}
+
+def add_missing_columns(c, table, columns):
+    """Add any of the (name, type) columns that an older database is missing"""
+    existing = table_columns(c, table)
+    for name, column_type in columns:
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+def migrate_to_cents(c, table, columns):
+    """Convert the REAL dollar columns of an older database to INTEGER cents.
+
+    columns are (old, new) name pairs. Each new column is filled from the
+    rounded old value, then the old column is dropped; SQLite before 3.35
+    cannot drop columns and simply keeps it unused.
+    """
+    existing = table_columns(c, table)
+    for old, new in columns:
+        if old in existing and new not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {new} INTEGER")
+            c.execute(f"UPDATE {table} SET {new} = CAST(ROUND({old} * 100) AS INTEGER) WHERE {old} IS NOT NULL")
+            try:
+                c.execute(f"ALTER TABLE {table} DROP COLUMN {old}")
+            except sqlite3.OperationalError:
+                pass
+
+def create_database(output_folder, filename='pdf_data.db'):
+    db_path = os.path.join(output_folder, filename)
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
     
@@ -15,50 +77,374 @@ def create_database(output_folder):
                   phone_number TEXT,
                   email TEXT)''')
     
-    # Create a table for pay statements with amount and company fields
+    # Names are matched on a normalized key; the phonetic key and trigrams find near misses
+    add_missing_columns(c, 'individuals', [('name_key', 'TEXT'), ('phonetic_key', 'TEXT')])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_individuals_name_key ON individuals(name_key)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_individuals_phonetic_key ON individuals(phonetic_key)")
+    c.execute('''CREATE TABLE IF NOT EXISTS individual_trigrams
+                 (trigram TEXT,
+                  individual_id INTEGER,
+                  PRIMARY KEY (trigram, individual_id)) WITHOUT ROWID''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_individual_trigrams_individual ON individual_trigrams(individual_id)")
+    # Keys made by an older normalize_name are rebuilt
+    c.execute("PRAGMA user_version")
+    if c.fetchone()[0] < NAME_KEY_VERSION:
+        c.execute("UPDATE individuals SET name_key = NULL WHERE name_key IS NOT NULL")
+        c.execute("DELETE FROM individual_trigrams")
+        c.execute(f"PRAGMA user_version = {NAME_KEY_VERSION}")
+    c.execute("SELECT id, name FROM individuals WHERE name_key IS NULL")
+    for individual_id, name in c.fetchall():
+        index_individual(c, individual_id, name)
+    
+    # Create a table for pay statements with amount and company fields.
+    # Money is stored as integer cents, so sums are exact
     c.execute('''CREATE TABLE IF NOT EXISTS pay_statements
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
                   individual_id INTEGER,
                   date TEXT,
                   filename TEXT,
                   extraction_date TEXT,
-                  amount REAL,
+                  amount_cents INTEGER,
                   company TEXT,
+                  page_hash TEXT,
                   FOREIGN KEY (individual_id) REFERENCES individuals(id),
                   UNIQUE(individual_id, date))''')
     
+    # Databases created by older versions lack the newer pay statement columns
+    # or hold amounts as REAL dollars
+    migrate_to_cents(c, 'pay_statements', [('amount', 'amount_cents')])
+    add_missing_columns(c, 'pay_statements', [('amount_cents', 'INTEGER'), ('company', 'TEXT'), ('page_hash', 'TEXT')])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pay_statements_page_hash ON pay_statements(page_hash)")
+    
+    # Create a table for the earnings, deduction and net pay lines of each statement
+    c.execute('''CREATE TABLE IF NOT EXISTS pay_statement_lines
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  pay_statement_id INTEGER,
+                  section TEXT,
+                  description TEXT,
+                  quantity TEXT,
+                  rate_cents INTEGER,
+                  current_cents INTEGER,
+                  ytd_cents INTEGER,
+                  FOREIGN KEY (pay_statement_id) REFERENCES pay_statements(id))''')
+    migrate_to_cents(c, 'pay_statement_lines', [('rate', 'rate_cents'), ('current_amount', 'current_cents'),
+                                                ('ytd_amount', 'ytd_cents')])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pay_statement_lines_statement ON pay_statement_lines(pay_statement_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_pay_statements_date ON pay_statements(date)")
+    
+    # Single-row counter bumped by every write; the generation token tells a
+    # rebuilt database apart from the one it replaced
+    c.execute('''CREATE TABLE IF NOT EXISTS data_version
+                 (id INTEGER PRIMARY KEY CHECK (id = 1),
+                  version INTEGER NOT NULL,
+                  generation TEXT NOT NULL)''')
+    c.execute("INSERT OR IGNORE INTO data_version (id, version, generation) VALUES (1, 0, lower(hex(randomblob(8))))")
+    
+    # Latest change of every individual and pay statement row, for clients
+    # that sync deltas. Triggers keep it in the writing transaction, so writes
+    # from any process are logged; each row keeps only its newest entry.
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'change_log'")
+    new_log = c.fetchone() is None
+    c.execute('''CREATE TABLE IF NOT EXISTS change_log
+                 (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                  table_name TEXT NOT NULL,
+                  row_id INTEGER NOT NULL,
+                  UNIQUE (table_name, row_id))''')
+    if new_log:
+        # Rows that predate the log count as changed, so syncing from 0 sees everything
+        c.execute("INSERT INTO change_log (table_name, row_id) SELECT 'individuals', id FROM individuals")
+        c.execute("INSERT INTO change_log (table_name, row_id) SELECT 'pay_statements', id FROM pay_statements")
+    # A plain INSERT after the DELETE, since an OR clause on the statement that
+    # fires a trigger (merge's UPDATE OR IGNORE) overrides the trigger's own
+    log_row = """DELETE FROM change_log WHERE table_name = '{0}' AND row_id = {1};
+                         INSERT INTO change_log (table_name, row_id) VALUES ('{0}', {1});"""
+    for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS log_individuals_{event.lower()} AFTER {event} ON individuals
+                     BEGIN
+                         {log_row.format('individuals', row + '.id')}
+                     END''')
+        # An individual's statement count and total change with their statements
+        c.execute(f'''CREATE TRIGGER IF NOT EXISTS log_pay_statements_{event.lower()} AFTER {event} ON pay_statements
+                     BEGIN
+                         {log_row.format('pay_statements', row + '.id')}
+                         {log_row.format('individuals', row + '.individual_id')}
+                     END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS log_pay_statements_moved AFTER UPDATE OF individual_id ON pay_statements
+                 BEGIN
+                     {log_row.format('individuals', 'OLD.individual_id')}
+                 END''')
+    
+    # Split pages committed to the database whose temporary file has not yet
+    # been renamed into place; cleared once the rename is durable
+    c.execute('''CREATE TABLE IF NOT EXISTS ingest_journal
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  temp_file TEXT,
+                  filename TEXT,
+                  created TEXT)''')
+    
+    # One row per input PDF, keyed by the hash of the whole file; next_page
+    # advances in the same transaction as each committed batch of pages
+    c.execute('''CREATE TABLE IF NOT EXISTS ingest_checkpoints
+                 (file_hash TEXT PRIMARY KEY,
+                  source TEXT,
+                  total_pages INTEGER,
+                  next_page INTEGER NOT NULL DEFAULT 0,
+                  status TEXT,
+                  error TEXT,
+                  started TEXT,
+                  updated TEXT,
+                  pid INTEGER)''')
+    add_missing_columns(c, 'ingest_checkpoints', [('pid', 'INTEGER')])
+    
     conn.commit()
     conn.close()
     return db_path
 
-def insert_into_database(db_path, name, date, filename, amount=None, company=None):
+def subscribe(callback):
+    """Call callback(db_path, table, inserted, updated, deleted) after each committed change.
+
+    The id lists are row ids of table. Only writes made through this module
+    in this process are reported, on the thread that made them; changes
+    from other processes show up in get_data_version.
+    """
+    _change_subscribers.append(callback)
+
+def unsubscribe(callback):
+    if callback in _change_subscribers:
+        _change_subscribers.remove(callback)
+
+def emit_change(db_path, table, inserted=(), updated=(), deleted=()):
+    if not (inserted or updated or deleted):
+        return
+    for callback in list(_change_subscribers):
+        try:
+            callback(db_path, table, list(inserted), list(updated), list(deleted))
+        except Exception as e:
+            print(f"Change subscriber failed: {e}")
+
+def bump_data_version(c):
+    """Mark the data as changed; call inside the write's transaction"""
+    c.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+def _stat_signature(db_path):
+    signature = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def get_changes(c, since=0, limit=None):
+    """Return (generation, last seq, {table: [row ids]}) for change log entries after since.
+
+    Each row appears once, at its latest change. Whether it still exists is
+    for the caller to check, so run this in the read transaction that
+    fetches the rows.
+    """
+    c.execute("SELECT generation FROM data_version WHERE id = 1")
+    generation = c.fetchone()[0]
+    query = "SELECT seq, table_name, row_id FROM change_log WHERE seq > ? ORDER BY seq"
+    params = [since]
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    c.execute(query, params)
+    
+    last_seq = since
+    changes = {}
+    for seq, table, row_id in c.fetchall():
+        changes.setdefault(table, []).append(row_id)
+        last_seq = seq
+    return generation, last_seq, changes
+
+def get_data_version(db_path):
+    """Return an opaque string that changes whenever the data changes.
+
+    While the database files are untouched the cached value is returned
+    without opening SQLite. Files modified within the last second are always
+    re-read, since a second commit inside one timestamp tick would otherwise
+    go unnoticed.
+    """
+    signature = _stat_signature(db_path)
+    cached = _data_versions.get(db_path)
+    recently_modified = any(entry and time.time_ns() - entry[0] < 1_000_000_000 for entry in signature)
+    if cached and cached[0] == signature and not recently_modified:
+        return cached[1]
+    
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
+    c.execute("SELECT generation, version FROM data_version WHERE id = 1")
+    generation, version = c.fetchone()
+    conn.close()
     
-    try:
-        # First, try to insert or get the individual
-        c.execute("INSERT OR IGNORE INTO individuals (name) VALUES (?)", (name,))
+    data_version = f"{generation}-{version}"
+    _data_versions[db_path] = (signature, data_version)
+    return data_version
+
+def index_individual(c, individual_id, name, name_key=None):
+    """Store an individual's name key, phonetic key and trigrams"""
+    name_key = name_key or normalize_name(name)
+    c.execute("UPDATE individuals SET name_key = ?, phonetic_key = ? WHERE id = ?",
+              (name_key, phonetic_key(name_key), individual_id))
+    c.executemany("INSERT OR IGNORE INTO individual_trigrams (trigram, individual_id) VALUES (?, ?)",
+                  [(trigram, individual_id) for trigram in name_trigrams(name_key)])
+
+def resolve_individual(c, name, name_key=None):
+    """Return the id of the individual a name belongs to, adding them if no one shares its key"""
+    name_key = name_key or normalize_name(name)
+    c.execute("SELECT id FROM individuals WHERE name_key = ? ORDER BY id LIMIT 1", (name_key,))
+    row = c.fetchone()
+    if row:
+        return row[0]
+    
+    c.execute("INSERT OR IGNORE INTO individuals (name) VALUES (?)", (name,))
+    if not c.rowcount:
+        # Added by another writer since the lookup
         c.execute("SELECT id FROM individuals WHERE name = ?", (name,))
-        individual_id = c.fetchone()[0]
+        return c.fetchone()[0]
+    individual_id = c.lastrowid
+    index_individual(c, individual_id, name, name_key)
+    bump_data_version(c)
+    
+    # Ingest only checks the phonetic key, a single index lookup
+    similar = similar_individuals(c, name_key, limit=1, exclude=individual_id, fuzzy=False, candidate_limit=50)
+    if similar:
+        print(f"New individual {name} looks like {similar[0][1]} (similarity {similar[0][2]:.2f})")
+    return individual_id
+
+def similar_individuals(c, name_key, limit=10, min_similarity=0.5, exclude=None, fuzzy=True,
+                        candidate_limit=CANDIDATE_LIMIT):
+    """Return (id, name, similarity) for the individuals whose names are closest to name_key.
+
+    Names sharing the phonetic key are an index lookup. With fuzzy, the
+    trigram index is probed as well; only the rarest trigrams are looked
+    up, since any name at min_similarity must share one of them and common
+    ones ("kim") would pull in a large part of the table. Candidates are
+    ranked by trigram similarity.
+    """
+    trigrams = name_trigrams(name_key)
+    c.execute("SELECT id, name, name_key FROM individuals WHERE phonetic_key = ? LIMIT ?",
+              (phonetic_key(name_key), candidate_limit))
+    candidates = c.fetchall()
+    
+    if fuzzy:
+        counts = []
+        for trigram in trigrams:
+            c.execute("SELECT COUNT(*) FROM (SELECT 1 FROM individual_trigrams WHERE trigram = ? LIMIT ?)",
+                      (trigram, candidate_limit))
+            counts.append((c.fetchone()[0], trigram))
+        counts.sort()
+        # A name at min_similarity shares at least this many of the query's trigrams
+        needed = max(1, int(len(trigrams) * min_similarity))
+        probe = [trigram for _, trigram in counts[:len(trigrams) - needed + 1]]
+        c.execute(f"""SELECT DISTINCT t.individual_id, i.name, i.name_key
+                      FROM individual_trigrams t JOIN individuals i ON i.id = t.individual_id
+                      WHERE t.trigram IN ({', '.join('?' * len(probe))})
+                      LIMIT ?""", probe + [candidate_limit])
+        candidates += c.fetchall()
+    
+    matches = {}
+    for individual_id, name, candidate_key in candidates:
+        if individual_id == exclude or individual_id in matches:
+            continue
+        score = similarity(trigrams, name_trigrams(candidate_key or ''))
+        if score >= min_similarity:
+            matches[individual_id] = (individual_id, name, score)
+    return sorted(matches.values(), key=lambda match: (-match[2], match[0]))[:limit]
+
+def find_similar_individuals(db_path, name, limit=10, min_similarity=0.5):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    matches = similar_individuals(c, normalize_name(name), limit, min_similarity)
+    conn.close()
+    return matches
+
+def load_statement_keys(c, names_and_dates, batch_size=500):
+    """Preload what a batch of inserts needs to know to spot duplicates.
+
+    Returns (individual_ids, existing): the ids of the batch's name keys that
+    already exist, and the (individual_id, date) pairs already taken within
+    the batch's date range. Two queries per batch_size names replace the
+    per-page lookups.
+    """
+    name_keys = sorted({normalize_name(name) for name, _ in names_and_dates})
+    dates = [date for _, date in names_and_dates]
+    individual_ids = {}
+    existing = set()
+    if not name_keys:
+        return individual_ids, existing
+    
+    for start in range(0, len(name_keys), batch_size):
+        chunk = name_keys[start:start + batch_size]
+        c.execute(f"""SELECT name_key, MIN(id) FROM individuals
+                      WHERE name_key IN ({', '.join('?' * len(chunk))}) GROUP BY name_key""", chunk)
+        individual_ids.update(c.fetchall())
+    
+    ids = list(individual_ids.values())
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        c.execute(f"""SELECT individual_id, date FROM pay_statements
+                      WHERE individual_id IN ({', '.join('?' * len(chunk))}) AND date BETWEEN ? AND ?""",
+                  chunk + [min(dates), max(dates)])
+        existing.update(c.fetchall())
+    return individual_ids, existing
+
+def insert_statement(c, name, date, filename, amount_cents=None, company=None, line_items=None, page_hash=None,
+                     keys=None):
+    """Insert one pay statement through an open cursor; returns False for duplicates.
+
+    keys is the (individual_ids, existing) pair from load_statement_keys;
+    with it, duplicates are found without querying and the pair is kept up
+    to date. The UNIQUE (individual_id, date) constraint still has the last word.
+    """
+    if keys is None:
+        individual_id = resolve_individual(c, name)
         
         # Check if a pay statement already exists for this individual and date
         c.execute("SELECT filename FROM pay_statements WHERE individual_id = ? AND date = ?", (individual_id, date))
-        existing_filename = c.fetchone()
-        
-        if existing_filename:
-            print(f"Pay statement already exists for {name} on {date}. Skipping.")
-            result = False
-        else:
-            # Insert the new pay statement with amount and company
-            extraction_date = datetime.date.today().strftime('%Y-%m-%d')
-            c.execute('''INSERT INTO pay_statements 
-                         (individual_id, date, filename, extraction_date, amount, company) 
-                         VALUES (?, ?, ?, ?, ?, ?)''',
-                      (individual_id, date, filename, extraction_date, amount, company))
-            
-            print(f"Inserted new pay statement for {name}: {filename}")
-            result = True
-        
+        duplicate = c.fetchone() is not None
+    else:
+        individual_ids, existing = keys
+        name_key = normalize_name(name)
+        individual_id = individual_ids.get(name_key)
+        if individual_id is None:
+            individual_id = resolve_individual(c, name, name_key)
+            individual_ids[name_key] = individual_id
+        duplicate = (individual_id, date) in existing
+    
+    if duplicate:
+        print(f"Pay statement already exists for {name} on {date}. Skipping.")
+        return False
+    
+    # Insert the new pay statement with amount and company
+    extraction_date = datetime.date.today().strftime('%Y-%m-%d')
+    try:
+        c.execute('''INSERT INTO pay_statements 
+                     (individual_id, date, filename, extraction_date, amount_cents, company, page_hash) 
+                     VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                  (individual_id, date, filename, extraction_date, amount_cents, company, page_hash))
+    except sqlite3.IntegrityError:
+        print(f"Pay statement already exists for {name} on {date}. Skipping.")
+        return False
+    if keys is not None:
+        keys[1].add((individual_id, date))
+    
+    if line_items:
+        insert_line_items(c, c.lastrowid, line_items)
+    bump_data_version(c)
+    
+    print(f"Inserted new pay statement for {name}: {filename}")
+    return True
+
+def insert_into_database(db_path, name, date, filename, amount_cents=None, company=None, line_items=None,
+                         page_hash=None):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    
+    try:
+        result = insert_statement(c, name, date, filename, amount_cents, company, line_items, page_hash)
         conn.commit()
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
@@ -68,6 +454,408 @@ def insert_into_database(db_path, name, date, filename, amount=None, company=Non
     
     return result
 
+def commit_ingest_batch(db_path, records, checkpoint=None):
+    """Insert a batch of split pages and their journal entries in one transaction.
+
+    records are (temp_file, name, date, filename, amount_cents, company, line_items,
+    page_hash) tuples. checkpoint, if given, is (file_hash, next_page) and is
+    advanced in the same transaction. Returns the journal ids to clear once
+    the files are in place.
+    """
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    
+    try:
+        # Taking the write lock first makes everything above these ids ours
+        c.execute("BEGIN IMMEDIATE")
+        c.execute("SELECT (SELECT IFNULL(MAX(id), 0) FROM individuals), (SELECT IFNULL(MAX(id), 0) FROM pay_statements)")
+        last_individual, last_statement = c.fetchone()
+        
+        created = datetime.datetime.now().isoformat(timespec='seconds')
+        journal_ids = []
+        keys = load_statement_keys(c, [(record[1], record[2]) for record in records])
+        replaced = []
+        for temp_file, name, date, filename, amount_cents, company, line_items, page_hash in records:
+            if not insert_statement(c, name, date, filename, amount_cents, company, line_items, page_hash, keys):
+                # The page's file still replaces the stored PDF of that name
+                c.execute("SELECT id FROM pay_statements WHERE date = ? AND filename = ?", (date, filename))
+                replaced.extend(row[0] for row in c.fetchall())
+            c.execute("INSERT INTO ingest_journal (temp_file, filename, created) VALUES (?, ?, ?)",
+                      (temp_file, filename, created))
+            journal_ids.append(c.lastrowid)
+        if replaced:
+            # Marks the rows changed, so ETags and synced copies of the PDF are refreshed
+            c.executemany("UPDATE pay_statements SET extraction_date = ? WHERE id = ?",
+                          [(created[:10], statement_id) for statement_id in replaced])
+            bump_data_version(c)
+        if checkpoint is not None:
+            c.execute("UPDATE ingest_checkpoints SET next_page = ?, updated = ? WHERE file_hash = ?",
+                      (checkpoint[1], created, checkpoint[0]))
+        c.execute("SELECT id FROM individuals WHERE id > ?", (last_individual,))
+        new_individuals = [row[0] for row in c.fetchall()]
+        c.execute("SELECT id FROM pay_statements WHERE id > ?", (last_statement,))
+        new_statements = [row[0] for row in c.fetchall()]
+        conn.commit()
+    finally:
+        conn.close()
+    emit_change(db_path, 'individuals', inserted=new_individuals)
+    emit_change(db_path, 'pay_statements', inserted=new_statements, updated=replaced)
+    return journal_ids
+
+def clear_ingest_journal(db_path, journal_ids):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.executemany("DELETE FROM ingest_journal WHERE id = ?", [(journal_id,) for journal_id in journal_ids])
+    conn.commit()
+    conn.close()
+
+def get_ingest_journal(db_path):
+    """Return (id, temp_file, filename) for every page left pending by an interrupted ingest"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("SELECT id, temp_file, filename FROM ingest_journal ORDER BY id")
+    entries = c.fetchall()
+    conn.close()
+    return entries
+
+def start_ingest_checkpoint(db_path, file_hash, source, total_pages):
+    """Mark an input file as running and return the page index to resume from.
+
+    A file that finished before starts again from page 0, where the page
+    hashes skip whatever is still in place.
+    """
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    
+    c.execute("SELECT next_page, status FROM ingest_checkpoints WHERE file_hash = ?", (file_hash,))
+    row = c.fetchone()
+    next_page = row[0] if row and row[1] != 'done' else 0
+    c.execute('''INSERT OR REPLACE INTO ingest_checkpoints
+                 (file_hash, source, total_pages, next_page, status, error, started, updated, pid)
+                 VALUES (?, ?, ?, ?, 'running', NULL, ?, ?, ?)''',
+              (file_hash, source, total_pages, next_page, now, now, os.getpid()))
+    conn.commit()
+    conn.close()
+    return min(next_page, total_pages)
+
+def finish_ingest_checkpoint(db_path, file_hash, status, error=None):
+    """Record how a run ended: 'done', 'cancelled' or 'failed'"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE ingest_checkpoints SET status = ?, error = ?, updated = ? WHERE file_hash = ?",
+                 (status, error, datetime.datetime.now().isoformat(timespec='seconds'), file_hash))
+    conn.commit()
+    conn.close()
+
+def get_ingest_checkpoints(db_path, file_hash=None, unfinished=False, updated_since=None):
+    """Return ingest checkpoints as dicts, most recently updated first.
+
+    updated_since is an ISO timestamp like the ones in the updated column.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+    
+    query = "SELECT * FROM ingest_checkpoints"
+    conditions = []
+    params = []
+    if file_hash is not None:
+        conditions.append("file_hash = ?")
+        params.append(file_hash)
+    if unfinished:
+        conditions.append("status != 'done'")
+    if updated_since is not None:
+        conditions.append("updated >= ?")
+        params.append(updated_since)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    c.execute(query + " ORDER BY updated DESC", params)
+    checkpoints = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return checkpoints
+
+def get_files_by_page_hash(db_path, page_hashes, batch_size=500):
+    """Map each page hash that already has a pay statement to its filename"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    files = {}
+    page_hashes = list(page_hashes)
+    for start in range(0, len(page_hashes), batch_size):
+        chunk = page_hashes[start:start + batch_size]
+        c.execute(f"SELECT page_hash, filename FROM pay_statements WHERE page_hash IN ({', '.join('?' * len(chunk))})",
+                  chunk)
+        files.update(c.fetchall())
+    conn.close()
+    return files
+
+def delete_statements_by_filename(db_path, filenames):
+    """Drop the rows, and their line items, of statements whose PDF never made it to disk"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    deleted = []
+    for filename in filenames:
+        c.execute("SELECT id FROM pay_statements WHERE filename = ?", (filename,))
+        deleted.extend(row[0] for row in c.fetchall())
+        c.execute("DELETE FROM pay_statement_lines WHERE pay_statement_id IN "
+                  "(SELECT id FROM pay_statements WHERE filename = ?)", (filename,))
+        c.execute("DELETE FROM pay_statements WHERE filename = ?", (filename,))
+    if filenames:
+        bump_data_version(c)
+    conn.commit()
+    conn.close()
+    emit_change(db_path, 'pay_statements', deleted=deleted)
+
+def fsync_directory(folder):
+    """Make renames in folder durable; a no-op where directories cannot be opened"""
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def pid_alive(pid):
+    if os.name == 'nt':
+        # os.kill would terminate the process; assume it is still running
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def temp_file_pid(temp_file):
+    """The pid write_temp_page put in a temp file's name, or None.
+
+    Names look like ".<filename>.<pid>.<unique token>.ingest.tmp".
+    """
+    parts = temp_file[:-len(INGEST_TEMP_SUFFIX)].rsplit('.', 2)
+    return int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else None
+
+def recover_ingest(output_folder):
+    """Finish or roll back ingests that were interrupted by a crash.
+
+    Journalled pages were fully written before their rows were committed, so
+    their temp files are renamed into place; rows whose file is gone are
+    dropped so a rerun re-creates them; unjournalled temp files belonged to an
+    uncommitted batch and are deleted. Runs once per process and output
+    folder, under a lock file, and leaves alone the temp files and journal
+    entries of checkpoints still running in a live process.
+    Returns (renamed, dropped, discarded).
+    """
+    folder_key = os.path.realpath(output_folder)
+    with _recover_lock:
+        if folder_key in _recovered_folders:
+            return 0, 0, 0
+        _recovered_folders.add(folder_key)
+    
+    db_path = create_database(output_folder)
+    with open(os.path.join(output_folder, '.ingest.lock'), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            return settle_ingest(output_folder, db_path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def settle_ingest(output_folder, db_path):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("SELECT DISTINCT pid FROM ingest_checkpoints WHERE status = 'running' AND pid IS NOT NULL")
+    # This process has not started any ingest in the folder yet, so a checkpoint
+    # carrying its pid was left by an earlier process that had the same pid
+    live_pids = {row[0] for row in c.fetchall() if row[0] != os.getpid() and pid_alive(row[0])}
+    # Runs still marked as running died with their process; they resume from next_page
+    c.execute(f"""UPDATE ingest_checkpoints SET status = 'interrupted'
+                  WHERE status = 'running' AND (pid IS NULL OR pid NOT IN ({', '.join('?' * len(live_pids))}))""",
+              list(live_pids))
+    conn.commit()
+    conn.close()
+    
+    journal = [entry for entry in get_ingest_journal(db_path) if temp_file_pid(entry[1]) not in live_pids]
+    renamed = 0
+    missing = []
+    for _, temp_file, filename in journal:
+        temp_path = os.path.join(output_folder, temp_file)
+        if os.path.exists(temp_path):
+            os.replace(temp_path, os.path.join(output_folder, filename))
+            renamed += 1
+        elif not os.path.exists(os.path.join(output_folder, filename)):
+            missing.append(filename)
+    fsync_directory(output_folder)
+    delete_statements_by_filename(db_path, missing)
+    clear_ingest_journal(db_path, [entry[0] for entry in journal])
+    
+    discarded = 0
+    for temp_path in glob.glob(os.path.join(glob.escape(output_folder), f".*{INGEST_TEMP_SUFFIX}")):
+        if temp_file_pid(os.path.basename(temp_path)) in live_pids:
+            continue
+        os.remove(temp_path)
+        discarded += 1
+    
+    if journal or discarded:
+        print(f"Recovered interrupted ingest: {renamed} files completed, {len(missing)} rows dropped, "
+              f"{discarded} partial files removed")
+    return renamed, len(missing), discarded
+
+def get_rebuild_progress(db_path):
+    """Return the Split filenames already loaded into a database being rebuilt"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("CREATE TABLE IF NOT EXISTS rebuild_progress (filename TEXT PRIMARY KEY)")
+    c.execute("SELECT filename FROM rebuild_progress")
+    done = {row[0] for row in c.fetchall()}
+    conn.commit()
+    conn.close()
+    return done
+
+def insert_rebuild_batch(db_path, records):
+    """Bulk-load statements into a database being rebuilt.
+
+    The statements and their rebuild_progress rows are committed together, so
+    an interrupted rebuild resumes exactly after the last committed batch.
+    Returns the number of statements inserted.
+    """
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    inserted = 0
+    
+    try:
+        keys = load_statement_keys(c, [(record['name'], record['date']) for record in records])
+        for record in records:
+            if insert_statement(c, record['name'], record['date'], record['filename'], record['amount_cents'],
+                                record['company'], record['line_items'], record['page_hash'], keys):
+                inserted += 1
+        c.executemany("INSERT OR IGNORE INTO rebuild_progress (filename) VALUES (?)",
+                      [(record['filename'],) for record in records])
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    return inserted
+
+def finish_rebuild(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE IF EXISTS rebuild_progress")
+    conn.commit()
+    conn.close()
+
+def insert_line_items(c, pay_statement_id, line_items):
+    c.executemany('''INSERT INTO pay_statement_lines
+                     (pay_statement_id, section, description, quantity, rate_cents, current_cents, ytd_cents)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                  [(pay_statement_id, item['section'], item['description'], item['quantity'],
+                    item['rate_cents'], item['current_cents'], item['ytd_cents']) for item in line_items])
+
+def update_statement_extraction(db_path, results):
+    """Apply re-parsed page results to the statements cut from those pages.
+
+    results is a list of (page_hash, parsed) pairs. Amount, company and line
+    items are refreshed in one transaction. A changed name key or date would move
+    the statement to another file and row, so those pages are only counted
+    and left for a fresh ingest. Returns (updated, identity_changed).
+    """
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    updated = 0
+    identity_changed = 0
+    
+    try:
+        for page_hash, parsed in results:
+            c.execute("""
+                SELECT ps.id, i.name, ps.date
+                FROM pay_statements ps
+                JOIN individuals i ON ps.individual_id = i.id
+                WHERE ps.page_hash = ?
+            """, (page_hash,))
+            for statement_id, name, date in c.fetchall():
+                # Only a different name key moves the statement, not case or spacing
+                if (normalize_name(name), date) != (normalize_name(parsed['name']), parsed['date']):
+                    identity_changed += 1
+                    continue
+                c.execute("UPDATE pay_statements SET amount_cents = ?, company = ? WHERE id = ?",
+                          (parsed['amount_cents'], parsed['company'], statement_id))
+                c.execute("DELETE FROM pay_statement_lines WHERE pay_statement_id = ?", (statement_id,))
+                insert_line_items(c, statement_id, parsed['line_items'])
+                updated += 1
+        if updated:
+            bump_data_version(c)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"An error occurred: {e}")
+        raise
+    finally:
+        conn.close()
+    
+    return updated, identity_changed
+
+def snapshot_path(db_path):
+    return os.path.splitext(db_path)[0] + '.snapshot.db'
+
+def refresh_snapshot(db_path):
+    """Copy db_path to its snapshot with SQLite's online backup API.
+
+    The copy is written to a temporary file and renamed over the old
+    snapshot, so queries already running on it finish undisturbed.
+    """
+    path = snapshot_path(db_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(temp_path)
+    try:
+        # A single step holds the live database's read lock only for the page copy
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.replace(temp_path, path)
+    return path
+
+def get_snapshot(db_path, max_age=SNAPSHOT_MAX_AGE):
+    """Return the path of a read-only copy of db_path for long reporting reads.
+
+    Scans on the copy never hold locks on the live database, so ingests
+    and edits do not wait behind them. The copy is refreshed once it is more
+    than max_age seconds old and the data has changed since; max_age=0
+    gives a copy that is current.
+    """
+    path = snapshot_path(db_path)
+    with _snapshot_lock:
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            age = None
+        if age is None or (age >= max_age and get_data_version(path) != get_data_version(db_path)):
+            refresh_snapshot(db_path)
+    return path
+
+def add_individual(db_path, name):
+    """Add an individual by name; returns False if they already exist"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("INSERT OR IGNORE INTO individuals (name) VALUES (?)", (name,))
+    added = c.rowcount > 0
+    individual_id = c.lastrowid
+    if added:
+        index_individual(c, individual_id, name)
+        bump_data_version(c)
+    conn.commit()
+    conn.close()
+    if added:
+        emit_change(db_path, 'individuals', inserted=[individual_id])
+    return added
+
 def update_individual_info(db_path, name, address=None, phone_number=None, email=None):
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
@@ -88,39 +876,325 @@ def update_individual_info(db_path, name, address=None, phone_number=None, email
         update_query = f"UPDATE individuals SET {', '.join(update_fields)} WHERE name = ?"
         update_values.append(name)
         c.execute(update_query, update_values)
+        bump_data_version(c)
         conn.commit()
         print(f"Updated information for {name}")
+        c.execute("SELECT id FROM individuals WHERE name = ?", (name,))
+        emit_change(db_path, 'individuals', updated=[row[0] for row in c.fetchall()])
     
     conn.close()
 
+def update_individuals(db_path, updates):
+    """Apply several individual updates in one transaction.
+
+    updates is a list of dicts with a name and any of address, phone_number
+    and email. Returns (updated names, names not found).
+    """
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    
+    updated = []
+    missing = []
+    for update in updates:
+        fields = [field for field in ('address', 'phone_number', 'email') if update.get(field) is not None]
+        if not fields:
+            continue
+        c.execute(f"UPDATE individuals SET {', '.join(f'{field} = ?' for field in fields)} WHERE name = ?",
+                  [update[field] for field in fields] + [update['name']])
+        (updated if c.rowcount else missing).append(update['name'])
+    
+    updated_ids = []
+    if updated:
+        bump_data_version(c)
+        for start in range(0, len(updated), 500):
+            chunk = updated[start:start + 500]
+            c.execute(f"SELECT id FROM individuals WHERE name IN ({', '.join('?' * len(chunk))})", chunk)
+            updated_ids.extend(row[0] for row in c.fetchall())
+    conn.commit()
+    conn.close()
+    emit_change(db_path, 'individuals', updated=updated_ids)
+    print(f"Updated information for {len(updated)} individuals")
+    return updated, missing
+
+def find_duplicate_names(db_path):
+    """Return lists of individual ids, lowest first, whose names share a name key"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("SELECT GROUP_CONCAT(id) FROM individuals GROUP BY name_key HAVING COUNT(*) > 1")
+    groups = [sorted(int(individual_id) for individual_id in row[0].split(',')) for row in c.fetchall()]
+    conn.close()
+    return groups
+
+def merge_individuals(db_path, target_id, source_ids):
+    """Fold source_ids into target_id in one transaction.
+
+    Pay statements are re-pointed in bulk; a source statement on a date the
+    target already has is a duplicate and is deleted. Contact details the
+    target lacks are taken from the sources, which are then removed.
+    Returns (moved, duplicates) where duplicates are the deleted statements'
+    (id, filename, kept_filename), kept_filename being the target's statement
+    on the same date.
+    """
+    source_ids = [source_id for source_id in set(source_ids) if source_id != target_id]
+    if not source_ids:
+        return 0, []
+    placeholders = ', '.join('?' * len(source_ids))
+    
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    try:
+        c.execute("SELECT COUNT(*) FROM individuals WHERE id = ?", (target_id,))
+        if not c.fetchone()[0]:
+            raise LookupError(f"No individual with id {target_id}")
+        
+        c.execute(f"SELECT id FROM pay_statements WHERE individual_id IN ({placeholders})", source_ids)
+        source_statements = {row[0] for row in c.fetchall()}
+        c.execute(f"UPDATE OR IGNORE pay_statements SET individual_id = ? WHERE individual_id IN ({placeholders})",
+                  [target_id] + source_ids)
+        moved = c.rowcount
+        
+        c.execute(f"""SELECT ps.id, ps.filename, kept.filename
+                      FROM pay_statements ps
+                      JOIN pay_statements kept ON kept.individual_id = ? AND kept.date = ps.date
+                      WHERE ps.individual_id IN ({placeholders})""", [target_id] + source_ids)
+        duplicates = c.fetchall()
+        c.execute(f"""DELETE FROM pay_statement_lines WHERE pay_statement_id IN
+                      (SELECT id FROM pay_statements WHERE individual_id IN ({placeholders}))""", source_ids)
+        c.execute(f"DELETE FROM pay_statements WHERE individual_id IN ({placeholders})", source_ids)
+        
+        for column in ('address', 'phone_number', 'email'):
+            c.execute(f"""UPDATE individuals SET {column} =
+                              (SELECT {column} FROM individuals
+                               WHERE id IN ({placeholders}) AND {column} IS NOT NULL AND {column} != ''
+                               ORDER BY id LIMIT 1)
+                          WHERE id = ? AND ({column} IS NULL OR {column} = '')
+                            AND EXISTS (SELECT 1 FROM individuals WHERE id IN ({placeholders})
+                                        AND {column} IS NOT NULL AND {column} != '')""",
+                      source_ids + [target_id] + source_ids)
+        
+        c.execute(f"DELETE FROM individual_trigrams WHERE individual_id IN ({placeholders})", source_ids)
+        c.execute(f"DELETE FROM individuals WHERE id IN ({placeholders})", source_ids)
+        bump_data_version(c)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    
+    duplicate_ids = [row[0] for row in duplicates]
+    emit_change(db_path, 'pay_statements', updated=sorted(source_statements - set(duplicate_ids)),
+                deleted=duplicate_ids)
+    emit_change(db_path, 'individuals', updated=[target_id], deleted=source_ids)
+    print(f"Merged {len(source_ids)} individuals into {target_id}: {moved} statements moved, "
+          f"{len(duplicates)} duplicates removed")
+    return moved, duplicates
+
+def duplicate_file_paths(folder, duplicates):
+    """Paths of the merged duplicates' PDFs that can be removed.
+
+    Names differing only in case give the same filename, which on a
+    case-insensitive file system is the kept statement's own PDF; those are skipped.
+    """
+    paths = []
+    for _, filename, kept_filename in duplicates:
+        path = os.path.join(folder, filename)
+        try:
+            if os.path.samefile(path, os.path.join(folder, kept_filename)):
+                continue
+        except OSError:
+            pass
+        paths.append(path)
+    return paths
+
 def get_individuals(db_path):
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
-    c.execute("SELECT * FROM individuals")
+    c.execute("SELECT id, name, address, phone_number, email FROM individuals")
     individuals = c.fetchall()
     conn.close()
     return individuals
 
+def get_individuals_by_id(db_path, ids):
+    """Return the (id, name, address, phone_number, email) rows of the given ids that still exist"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    rows = []
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        c.execute(f"SELECT id, name, address, phone_number, email FROM individuals "
+                  f"WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        rows.extend(c.fetchall())
+    conn.close()
+    return rows
+
+def get_pay_statements_by_id(db_path, ids):
+    """Return pay statement rows shaped like get_pay_statements for the given ids that still exist"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    rows = []
+    ids = list(ids)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        c.execute(f"""
+            SELECT {PAY_STATEMENT_COLUMNS}, i.name
+            FROM pay_statements ps
+            JOIN individuals i ON ps.individual_id = i.id
+            WHERE ps.id IN ({', '.join('?' * len(chunk))})
+        """, chunk)
+        rows.extend(c.fetchall())
+    conn.close()
+    return rows
+
 def get_pay_statements(db_path, individual_id=None):
     conn = sqlite3.connect(db_path)
     c = conn.cursor()
     
     if individual_id:
-        c.execute("""
-            SELECT ps.*, i.name 
+        c.execute(f"""
+            SELECT {PAY_STATEMENT_COLUMNS}, i.name
             FROM pay_statements ps
             JOIN individuals i ON ps.individual_id = i.id
             WHERE ps.individual_id = ?
             ORDER BY ps.date DESC
         """, (individual_id,))
     else:
-        c.execute("""
-            SELECT ps.*, i.name 
+        c.execute(f"""
+            SELECT {PAY_STATEMENT_COLUMNS}, i.name
             FROM pay_statements ps
             JOIN individuals i ON ps.individual_id = i.id
             ORDER BY ps.date DESC
         """)
-    
+
     pay_statements = c.fetchall()
     conn.close()
     return pay_statements
+
+
+def get_pay_statement_lines(db_path, pay_statement_id):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("""
+        SELECT section, description, quantity, rate_cents, current_cents, ytd_cents
+        FROM pay_statement_lines
+        WHERE pay_statement_id = ?
+        ORDER BY id
+    """, (pay_statement_id,))
+    lines = c.fetchall()
+    conn.close()
+    return lines
+
+def statement_filter(ids=None, individual_id=None, year=None, company=None, start_date=None, end_date=None):
+    """Build the WHERE clause and parameters selecting pay statements by id and/or filter"""
+    conditions = []
+    params = []
+    if ids:
+        conditions.append(f"ps.id IN ({', '.join('?' * len(ids))})")
+        params.extend(ids)
+    if individual_id:
+        conditions.append("ps.individual_id = ?")
+        params.append(individual_id)
+    if year:
+        conditions.append("ps.date BETWEEN ? AND ?")
+        params.extend([f"{year}-01-01", f"{year}-12-31"])
+    if company:
+        conditions.append("ps.company = ?")
+        params.append(company)
+    if start_date:
+        conditions.append("ps.date >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("ps.date <= ?")
+        params.append(end_date)
+    return ' AND '.join(conditions), params
+
+def find_pay_statements(db_path, ids=None, individual_id=None, year=None, company=None,
+                        start_date=None, end_date=None):
+    """Return (id, filename, name, date) for the matching pay statements, by name then date"""
+    where, params = statement_filter(ids, individual_id, year, company, start_date, end_date)
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(f"""
+        SELECT ps.id, ps.filename, i.name, ps.date
+        FROM pay_statements ps
+        JOIN individuals i ON ps.individual_id = i.id
+        {f'WHERE {where}' if where else ''}
+        ORDER BY i.name, ps.date
+    """, params)
+    statements = c.fetchall()
+    conn.close()
+    return statements
+
+def delete_pay_statements(db_path, ids=None, individual_id=None, year=None, company=None):
+    """Delete pay statements by id and/or filter, with their line items, in one transaction.
+
+    Returns the (id, filename) pairs that were deleted so the caller can
+    remove the PDFs.
+    """
+    where, params = statement_filter(ids, individual_id, year, company)
+    if not where:
+        raise ValueError("ids or at least one filter is required")
+    
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    
+    c.execute(f"SELECT ps.id, ps.filename FROM pay_statements ps WHERE {where}", params)
+    deleted = c.fetchall()
+    
+    if deleted:
+        deleted_ids = [(row[0],) for row in deleted]
+        c.executemany("DELETE FROM pay_statement_lines WHERE pay_statement_id = ?", deleted_ids)
+        c.executemany("DELETE FROM pay_statements WHERE id = ?", deleted_ids)
+        bump_data_version(c)
+    conn.commit()
+    conn.close()
+    emit_change(db_path, 'pay_statements', deleted=[row[0] for row in deleted])
+    return deleted
+
+def get_line_item_totals(db_path, year=None, individual_id=None):
+    """Sum the current cents of every line item, grouped by section and description"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    
+    conditions = []
+    params = []
+    if year:
+        conditions.append("ps.date BETWEEN ? AND ?")
+        params.extend([f"{year}-01-01", f"{year}-12-31"])
+    if individual_id:
+        conditions.append("ps.individual_id = ?")
+        params.append(individual_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    c.execute(f"""
+        SELECT l.section, l.description, COUNT(DISTINCT ps.id), SUM(l.current_cents)
+        FROM pay_statement_lines l
+        JOIN pay_statements ps ON l.pay_statement_id = ps.id
+        {where}
+        GROUP BY l.section, l.description
+        ORDER BY l.section, l.description
+    """, params)
+
+    totals = c.fetchall()
+    conn.close()
+    return totals
+
+def get_ytd_summary(db_path, individual_id, year):
+    """Return the YTD lines printed on an individual's last statement of the year"""
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute("""
+        SELECT ps.date, l.section, l.description, l.ytd_cents
+        FROM pay_statement_lines l
+        JOIN pay_statements ps ON l.pay_statement_id = ps.id
+        WHERE ps.id = (
+            SELECT id FROM pay_statements
+            WHERE individual_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date DESC LIMIT 1
+        )
+        ORDER BY l.id
+    """, (individual_id, f"{year}-01-01", f"{year}-12-31"))
+    summary = c.fetchall()
+    conn.close()
+    return summary
@@ -0,0 +1,632 @@
+"""
+Database viewer window, loaded on first use so that starting the app does
+not pay for it or for the export modules it pulls in.
+"""
+import os
+import shutil
+import sqlite3
+import threading
+from PyQt5.QtWidgets import (QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog,
+                             QMessageBox, QTableWidgetItem, QHeaderView, QLineEdit, QLabel,
+                             QInputDialog, QSplitter, QProgressDialog, QStyle, QFrame, QCheckBox)
+from PyQt5.QtCore import Qt, QUrl, QThread, pyqtSignal
+from PyQt5.QtGui import QDesktopServices, QPalette, QColor
+from database_manager import (get_individuals, get_pay_statements, add_individual, get_snapshot,
+                              get_individuals_by_id, get_pay_statements_by_id)
+from pdf_export import write_export
+from table_export import EXPORT_TABLES, export_table
+from gui_components import ThemeAwareWidget, SearchLineEdit, EnhancedTable, IndividualInfoDialog, change_notifier
+
+class DatabaseViewer(QWidget, ThemeAwareWidget):
+    def __init__(self, db_path, pdf_folder):
+        super().__init__()
+        self.db_path = db_path
+        self.pdf_folder = pdf_folder
+        self.current_individual_id = None
+        self.current_individual_name = None
+        # Id -> ID column item of each row, so a change event finds its row without a scan
+        self.individual_items = {}
+        self.statement_items = {}
+        # [individuals, statements, first date, last date] shown in the header
+        self.stats = None
+        self.initUI()
+        change_notifier().changed.connect(self.on_database_changed)
+        
+    def initUI(self):
+        layout = QVBoxLayout()
+        layout.setSpacing(10)
+        
+        # Header with title and stats
+        header_layout = QHBoxLayout()
+        title_label = QLabel("<h2>Paystub Database</h2>")
+        header_layout.addWidget(title_label)
+        
+        self.stats_label = QLabel()
+        header_layout.addWidget(self.stats_label, 1)
+        
+        # Add refresh button
+        refresh_btn = QPushButton()
+        refresh_btn.setIcon(self.style().standardIcon(QStyle.SP_BrowserReload))
+        refresh_btn.setToolTip("Refresh Data")
+        refresh_btn.clicked.connect(self.refresh_data)
+        header_layout.addWidget(refresh_btn)
+        
+        layout.addLayout(header_layout)
+        
+        # Main content
+        splitter = QSplitter(Qt.Vertical)
+        
+        # Individuals card
+        individuals_card = QFrame()
+        individuals_card.setFrameStyle(QFrame.StyledPanel)
+        individuals_card.setProperty("class", "card")
+        individuals_layout = QVBoxLayout(individuals_card)
+        
+        # Individuals header with controls
+        individuals_header = QHBoxLayout()
+        individuals_header.addWidget(QLabel("<b>Individuals</b>"))
+        
+        # Add individual button
+        add_individual_btn = QPushButton()
+        add_individual_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogNewFolder))
+        add_individual_btn.setToolTip("Add New Individual")
+        add_individual_btn.clicked.connect(self.add_individual)
+        individuals_header.addWidget(add_individual_btn)
+        
+        # Search
+        self.individuals_search = SearchLineEdit("Search individuals...")
+        self.individuals_search.textChanged.connect(lambda text: self.individuals_table.filter_rows(text))
+        individuals_header.addWidget(self.individuals_search)
+        
+        individuals_layout.addLayout(individuals_header)
+        
+        # Individuals table
+        self.individuals_table = EnhancedTable()
+        self.individuals_table.clicked.connect(self.on_individual_selected)
+        individuals_layout.addWidget(self.individuals_table)
+        
+        # Pay Statements card
+        statements_card = QFrame()
+        statements_card.setFrameStyle(QFrame.StyledPanel)
+        statements_card.setProperty("class", "card")
+        statements_layout = QVBoxLayout(statements_card)
+        
+        # Statements header with date filter
+        statements_header = QHBoxLayout()
+        self.pay_statements_label = QLabel("<b>Pay Statements</b>")
+        statements_header.addWidget(self.pay_statements_label)
+        
+        # Add filter by year
+        year_label = QLabel("Year:")
+        statements_header.addWidget(year_label)
+        
+        self.year_filter = QLineEdit()
+        self.year_filter.setMaximumWidth(80)
+        self.year_filter.setPlaceholderText("Year")
+        self.year_filter.textChanged.connect(self.apply_filters)
+        statements_header.addWidget(self.year_filter)
+        
+        # Search
+        self.statements_search = SearchLineEdit("Search statements...")
+        self.statements_search.textChanged.connect(self.apply_filters)
+        statements_header.addWidget(self.statements_search)
+        
+        statements_layout.addLayout(statements_header)
+        
+        # Pay statements table
+        self.pay_statements_table = EnhancedTable()
+        statements_layout.addWidget(self.pay_statements_table)
+        
+        # Action buttons for pay statements
+        statement_actions = QHBoxLayout()
+        
+        view_all_btn = QPushButton("View All")
+        view_all_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogContentsView))
+        view_all_btn.clicked.connect(self.view_all_statements)
+        statement_actions.addWidget(view_all_btn)
+        
+        export_btn = QPushButton("Export Selected")
+        export_btn.setIcon(self.style().standardIcon(QStyle.SP_DialogSaveButton))
+        export_btn.clicked.connect(self.export_selected)
+        statement_actions.addWidget(export_btn)
+        
+        export_table_btn = QPushButton("Export Table...")
+        export_table_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogDetailedView))
+        export_table_btn.setToolTip("Export a whole database table to CSV, Parquet or XLSX")
+        export_table_btn.clicked.connect(self.export_table)
+        statement_actions.addWidget(export_table_btn)
+        
+        statement_actions.addStretch()
+        statements_layout.addLayout(statement_actions)
+        
+        # Add sections to splitter
+        splitter.addWidget(individuals_card)
+        splitter.addWidget(statements_card)
+        splitter.setStretchFactor(0, 1)
+        splitter.setStretchFactor(1, 2)
+        
+        layout.addWidget(splitter, 1)
+        
+        # Bottom status bar
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        status_layout.addWidget(self.status_label)
+        layout.addLayout(status_layout)
+        
+        self.setLayout(layout)
+        
+        # Apply theme-aware styling
+        self.update_styling()
+        
+        # Load data
+        self.setWindowTitle('Paystub Database Viewer')
+        self.setGeometry(300, 300, 1000, 800)
+        self.refresh_data()
+    
+    def update_styling(self):
+        colors = self.get_theme_colors()
+        self.setStyleSheet(f"""
+            QWidget {{
+                background-color: {colors['window']};
+                color: {colors['windowText']};
+            }}
+            QLabel {{
+                color: {colors['windowText']};
+            }}
+            QPushButton {{
+                padding: 6px 12px;
+                background-color: {colors['button']};
+                color: {colors['buttonText']};
+                border: 1px solid {colors['mid']};
+                border-radius: 4px;
+            }}
+            QPushButton:hover {{
+                background-color: {colors['highlight']};
+                color: {colors['highlightedText']};
+            }}
+            QFrame {{
+                border: 1px solid {colors['mid']};
+                border-radius: 6px;
+                background-color: {colors['alternateBase']};
+            }}
+            QFrame[class="card"] {{
+                padding: 10px;
+            }}
+        """)
+    
+    def refresh_data(self):
+        self.update_stats()
+        self.load_individuals()
+        if self.current_individual_id:
+            self.load_pay_statements(self.current_individual_id, self.current_individual_name)
+    
+    def update_stats(self):
+        try:
+            # Listing reads go to the reporting snapshot, so browsing never holds
+            # locks an ingest running alongside would wait on; it is recopied at
+            # most every SNAPSHOT_MAX_AGE seconds
+            conn = sqlite3.connect(get_snapshot(self.db_path))
+            c = conn.cursor()
+            c.execute("SELECT COUNT(*) FROM individuals")
+            individuals_count = c.fetchone()[0]
+            
+            c.execute("SELECT COUNT(*) FROM pay_statements")
+            statements_count = c.fetchone()[0]
+            
+            c.execute("SELECT MIN(date), MAX(date) FROM pay_statements")
+            date_range = c.fetchone()
+            
+            conn.close()
+            
+            self.stats = [individuals_count, statements_count, date_range[0], date_range[1]]
+            self.show_stats()
+        except Exception as e:
+            self.stats = None
+            self.stats_label.setText(f"Error loading stats: {str(e)}")
+    
+    def show_stats(self):
+        individuals_count, statements_count, min_date, max_date = self.stats
+        self.stats_label.setText(f"{individuals_count} individuals | {statements_count} statements | "
+                                 f"Date range: {min_date or 'N/A'} to {max_date or 'N/A'}")
+    
+    def add_individual(self):
+        name, ok = QInputDialog.getText(self, "Add Individual", "Enter individual name:")
+        if ok and name:
+            try:
+                # The change event adds the row
+                add_individual(self.db_path, name)
+                self.set_status(f"Added new individual: {name}", "success")
+            except Exception as e:
+                self.set_status(f"Error adding individual: {str(e)}", "error")
+    
+    def set_status(self, message, status_type="info"):
+        palette = self.palette()
+        base_text = palette.color(QPalette.WindowText)
+        
+        colors = {
+            "success": QColor(0, 170, 0) if palette.base().color().lightness() > 128 else QColor(100, 255, 100),
+            "error": QColor(200, 0, 0) if palette.base().color().lightness() > 128 else QColor(255, 100, 100),
+            "info": QColor(0, 100, 200) if palette.base().color().lightness() > 128 else QColor(100, 200, 255),
+            "warning": QColor(180, 100, 0) if palette.base().color().lightness() > 128 else QColor(255, 180, 0)
+        }.get(status_type, base_text)
+        
+        self.status_label.setText(message)
+        self.status_label.setStyleSheet(f"color: {colors.name()}")
+
+    def load_individuals(self):
+        individuals = get_individuals(get_snapshot(self.db_path))
+        self.individuals_table.setSortingEnabled(False)
+        self.individuals_table.setColumnCount(6)
+        self.individuals_table.setHorizontalHeaderLabels(["ID", "Name", "Address", "Phone", "Email", "Actions"])
+        # Cleared first so no row keeps the action buttons of a previous load
+        self.individuals_table.setRowCount(0)
+        self.individuals_table.setRowCount(len(individuals))
+        self.individual_items = {}
+
+        for row, record in enumerate(individuals):
+            self.set_individual_row(row, record)
+        self.individuals_table.setSortingEnabled(True)
+
+        self.individuals_table.resizeColumnsToContents()
+        self.individuals_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.individuals_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.individuals_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
+    
+    def set_individual_row(self, row, record):
+        # With sorting on, setting the ID moves the row, so later cells follow its item
+        id_item = QTableWidgetItem(str(record[0]))
+        id_item.setTextAlignment(Qt.AlignCenter)
+        self.individuals_table.setItem(row, 0, id_item)
+        self.individual_items[record[0]] = id_item
+        for col, value in enumerate(record[1:], 1):
+            self.individuals_table.setItem(id_item.row(), col, QTableWidgetItem(str(value) if value is not None else ""))
+        if self.individuals_table.cellWidget(id_item.row(), 5):
+            # Updates keep the name, and placing a new cell widget relayouts every row
+            return
+
+        # Add action buttons
+        action_widget = QWidget()
+        action_layout = QHBoxLayout(action_widget)
+        action_layout.setContentsMargins(2, 2, 2, 2)
+        action_layout.setSpacing(4)
+        
+        edit_btn = QPushButton()
+        edit_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogInfoView))
+        edit_btn.setMaximumWidth(30)
+        edit_btn.setToolTip("Edit Details")
+        edit_btn.clicked.connect(lambda _, name=record[1]: self.edit_individual_info(name))
+        
+        action_layout.addWidget(edit_btn)
+        action_layout.addStretch()
+        
+        self.individuals_table.setCellWidget(id_item.row(), 5, action_widget)
+    
+    def edit_individual_info(self, name):
+        dialog = IndividualInfoDialog(self.db_path, name)
+        if dialog.exec_():
+            self.set_status(f"Updated information for {name}", "success")
+
+    def on_individual_selected(self, index):
+        row = index.row()
+        self.current_individual_id = int(self.individuals_table.item(row, 0).text())
+        self.current_individual_name = self.individuals_table.item(row, 1).text()
+        self.load_pay_statements(self.current_individual_id, self.current_individual_name)
+
+    def load_pay_statements(self, individual_id, name):
+        self.current_individual_id = individual_id
+        self.current_individual_name = name
+        self.pay_statements_label.setText(f"<b>Pay Statements for {name}</b>")
+        
+        # Clear the table
+        self.pay_statements_table.setRowCount(0)
+        
+        # Get pay statements
+        pay_statements = get_pay_statements(get_snapshot(self.db_path), individual_id)
+        
+        self.pay_statements_table.setColumnCount(6)
+        self.pay_statements_table.setHorizontalHeaderLabels([
+            "ID", "Date", "Filename", "Extraction Date", "Actions", "Select"
+        ])
+        self.pay_statements_table.setSortingEnabled(False)
+        self.pay_statements_table.setRowCount(len(pay_statements))
+        self.statement_items = {}
+
+        for row, record in enumerate(pay_statements):
+            self.set_statement_row(row, record)
+        self.pay_statements_table.setSortingEnabled(True)
+
+        self.pay_statements_table.resizeColumnsToContents()
+        self.pay_statements_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.pay_statements_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.pay_statements_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
+        self.pay_statements_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        
+        # Apply any existing filter
+        self.apply_filters()
+    
+    def set_statement_row(self, row, record):
+        # The ID column shows individual_id; the statement id rides along for change events
+        id_item = QTableWidgetItem(str(record[1]))
+        id_item.setTextAlignment(Qt.AlignCenter)
+        id_item.setData(Qt.UserRole, record[0])
+        self.pay_statements_table.setItem(row, 0, id_item)
+        self.statement_items[record[0]] = id_item
+        for col, value in enumerate(record[2:5], 1):  # date, filename, extraction_date
+            self.pay_statements_table.setItem(id_item.row(), col, QTableWidgetItem(str(value) if value is not None else ""))
+        if self.pay_statements_table.cellWidget(id_item.row(), 4):
+            # Updates keep the filename the buttons use
+            return
+        
+        # Add action buttons
+        action_widget = QWidget()
+        action_layout = QHBoxLayout(action_widget)
+        action_layout.setContentsMargins(2, 2, 2, 2)
+        action_layout.setSpacing(4)
+        
+        open_btn = QPushButton()
+        open_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
+        open_btn.setMaximumWidth(30)
+        open_btn.setToolTip("Open PDF")
+        open_btn.clicked.connect(lambda _, f=record[3]: self.open_pdf(f))
+        
+        action_layout.addWidget(open_btn)
+        action_layout.addStretch()
+        
+        self.pay_statements_table.setCellWidget(id_item.row(), 4, action_widget)
+        
+        # Add checkbox for selection
+        select_widget = QWidget()
+        select_layout = QHBoxLayout(select_widget)
+        select_layout.setContentsMargins(2, 2, 2, 2)
+        
+        checkbox = QCheckBox()
+        checkbox.setProperty("filename", record[3])  # Store filename for export
+        select_layout.addWidget(checkbox)
+        select_layout.setAlignment(Qt.AlignCenter)
+        
+        self.pay_statements_table.setCellWidget(id_item.row(), 5, select_widget)
+    
+    def on_database_changed(self, db_path, table, inserted, updated, deleted):
+        """Apply a change event to the affected rows and stats only"""
+        if db_path != self.db_path:
+            return
+        if table == 'individuals':
+            changed_rows = self.apply_row_changes(self.individuals_table, self.individual_items, self.set_individual_row,
+                                                  deleted, get_individuals_by_id(db_path, inserted + updated))
+            self.individuals_table.filter_rows(self.individuals_search.text(), rows=changed_rows)
+            if self.current_individual_id in deleted:
+                self.current_individual_id = None
+                self.pay_statements_table.setRowCount(0)
+                self.statement_items = {}
+            stats_column = 0
+        elif table == 'pay_statements':
+            rows = get_pay_statements_by_id(db_path, inserted + updated) if self.current_individual_id else []
+            # Statements moved to someone else leave the table like deleted ones
+            moved = [row[0] for row in rows if row[1] != self.current_individual_id]
+            changed_rows = self.apply_row_changes(self.pay_statements_table, self.statement_items, self.set_statement_row,
+                                                  deleted + moved, [row for row in rows if row[1] == self.current_individual_id])
+            self.filter_statement_rows(changed_rows)
+            stats_column = 1
+        else:
+            return
+        
+        if self.stats is not None:
+            self.stats[stats_column] += len(inserted) - len(deleted)
+            if table == 'pay_statements' and (inserted or deleted):
+                # MIN and MAX are answered from the date index
+                conn = sqlite3.connect(db_path)
+                self.stats[2:] = conn.execute("SELECT MIN(date), MAX(date) FROM pay_statements").fetchone()
+                conn.close()
+            self.show_stats()
+    
+    def apply_row_changes(self, table, items, set_row, removed_ids, records):
+        """Remove, update and append rows by id; returns the rows that now hold the records"""
+        for record_id in removed_ids:
+            item = items.pop(record_id, None)
+            if item is not None:
+                table.removeRow(item.row())
+        for record in records:
+            item = items.get(record[0])
+            if item is not None:
+                set_row(item.row(), record)
+            else:
+                table.insertRow(table.rowCount())
+                set_row(table.rowCount() - 1, record)
+        return [items[record[0]].row() for record in records]
+    
+    def apply_filters(self):
+        self.filter_statement_rows(range(self.pay_statements_table.rowCount()))
+    
+    def filter_statement_rows(self, rows):
+        search_text = self.statements_search.text().lower()
+        year_filter = self.year_filter.text()
+        
+        for row in rows:
+            show_row = True
+            
+            # Check search text
+            if search_text:
+                row_text = ""
+                for col in range(4):  # Check columns 0-3
+                    item = self.pay_statements_table.item(row, col)
+                    if item:
+                        row_text += item.text().lower() + " "
+                
+                if search_text not in row_text:
+                    show_row = False
+            
+            # Check year filter
+            if year_filter and show_row:
+                date_item = self.pay_statements_table.item(row, 1)  # Date column
+                if date_item and year_filter not in date_item.text():
+                    show_row = False
+            
+            self.pay_statements_table.setRowHidden(row, not show_row)
+
+    def open_pdf(self, filename):
+        pdf_path = os.path.join(self.pdf_folder, filename)
+        if os.path.exists(pdf_path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(pdf_path))
+            self.set_status(f"Opened {filename}", "info")
+        else:
+            QMessageBox.warning(self, "Error", f"PDF file not found: {pdf_path}")
+            self.set_status(f"File not found: {pdf_path}", "error")
+    
+    def view_all_statements(self):
+        if not self.current_individual_id:
+            QMessageBox.information(self, "Info", "Please select an individual first")
+            return
+            
+        # Reset filters
+        self.statements_search.clear()
+        self.year_filter.clear()
+        self.apply_filters()
+        
+        self.set_status(f"Showing all statements for {self.current_individual_name}", "info")
+    
+    def export_selected(self):
+        selected_files = []
+        
+        for row in range(self.pay_statements_table.rowCount()):
+            if not self.pay_statements_table.isRowHidden(row):
+                select_widget = self.pay_statements_table.cellWidget(row, 5)
+                if select_widget:
+                    checkbox = select_widget.findChild(QCheckBox)
+                    if checkbox and checkbox.isChecked():
+                        filename = checkbox.property("filename")
+                        selected_files.append(filename)
+        
+        if not selected_files:
+            QMessageBox.information(self, "Export", "No files selected for export")
+            return
+        
+        formats = {"ZIP archive": "zip", "Merged PDF": "pdf", "Separate files": "files"}
+        choice, ok = QInputDialog.getItem(self, "Export", "Export selected statements as:", list(formats), 0, False)
+        if not ok:
+            return
+        export_format = formats[choice]
+        
+        if export_format == "files":
+            target = QFileDialog.getExistingDirectory(self, "Select Export Directory")
+        else:
+            target, _ = QFileDialog.getSaveFileName(self, "Export Statements", f"paystubs.{export_format}",
+                                                    f"{choice} (*.{export_format})")
+        if not target:
+            return
+        
+        paths = [os.path.join(self.pdf_folder, filename) for filename in selected_files]
+        paths = [path for path in paths if os.path.exists(path)]
+        
+        progress = QProgressDialog("Exporting statements...", "Cancel", 0, len(paths), self)
+        progress.setWindowTitle("Export")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+        
+        # The export runs on a worker thread so the window keeps repainting
+        self.export_worker = ExportWorker(paths, target, export_format)
+        self.export_worker.progress.connect(lambda done, total: progress.setValue(done))
+        self.export_worker.finished_export.connect(
+            lambda count, error: self.on_export_finished(progress, count, len(selected_files), target, error))
+        progress.canceled.connect(self.export_worker.cancel)
+        self.export_worker.start()
+    
+    def on_export_finished(self, progress, count, total, target, error):
+        progress.reset()
+        self.export_worker = None
+        
+        if error:
+            self.set_status(f"Export failed: {error}", "error")
+            QMessageBox.warning(self, "Export Failed", error)
+        elif count > 0:
+            self.set_status(f"Exported {count} files to {target}", "success")
+            QMessageBox.information(self, "Export Complete", f"Successfully exported {count} of {total} files")
+        else:
+            self.set_status("No files were exported", "warning")
+
+    def export_table(self):
+        table, ok = QInputDialog.getItem(self, "Export Table", "Table:", list(EXPORT_TABLES), 1, False)
+        if not ok:
+            return
+        
+        formats = {"CSV (*.csv)": "csv", "Parquet (*.parquet)": "parquet", "Excel (*.xlsx)": "xlsx"}
+        filepath, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Table", f"{table}.csv", ";;".join(formats))
+        if not filepath:
+            return
+        table_format = formats.get(selected_filter, "csv")
+        
+        progress = QProgressDialog(f"Exporting {table}...", None, 0, 0, self)
+        progress.setWindowTitle("Export Table")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.show()
+        
+        year = self.year_filter.text().strip()
+        self.table_export_worker = TableExportWorker(self.db_path, table, filepath, table_format,
+                                                     year=year if len(year) == 4 else None)
+        self.table_export_worker.finished_export.connect(
+            lambda error: self.on_table_export_finished(progress, filepath, error))
+        self.table_export_worker.start()
+    
+    def on_table_export_finished(self, progress, filepath, error):
+        progress.reset()
+        self.table_export_worker = None
+        if error:
+            self.set_status(f"Export failed: {error}", "error")
+            QMessageBox.warning(self, "Export Failed", error)
+        else:
+            self.set_status(f"Exported table to {filepath}", "success")
+
+class TableExportWorker(QThread):
+    """Export a database table straight from SQLite off the UI thread"""
+    finished_export = pyqtSignal(str)  # error message, empty on success
+    
+    def __init__(self, db_path, table, filepath, table_format, **filters):
+        super().__init__()
+        self.db_path = db_path
+        self.table = table
+        self.filepath = filepath
+        self.table_format = table_format
+        self.filters = filters
+    
+    def run(self):
+        try:
+            export_table(get_snapshot(self.db_path), self.table, self.filepath, self.table_format,
+                         **self.filters)
+            self.finished_export.emit("")
+        except Exception as e:
+            self.finished_export.emit(str(e))
+
+class ExportWorker(QThread):
+    """Write a ZIP, merged PDF or plain copy of pay statements off the UI thread"""
+    progress = pyqtSignal(int, int)
+    finished_export = pyqtSignal(int, str)  # files exported, error message
+    
+    def __init__(self, paths, target, export_format):
+        super().__init__()
+        self.paths = paths
+        self.target = target
+        self.export_format = export_format
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def run(self):
+        try:
+            if self.export_format == "files":
+                count = 0
+                for path in self.paths:
+                    if self.cancel_event.is_set():
+                        break
+                    shutil.copy2(path, os.path.join(self.target, os.path.basename(path)))
+                    count += 1
+                    self.progress.emit(count, len(self.paths))
+            else:
+                completed = write_export(self.paths, self.target, self.export_format,
+                                         progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+                count = len(self.paths) if completed else 0
+            self.finished_export.emit(count, "")
+        except Exception as e:
+            self.finished_export.emit(0, str(e))
@@ -0,0 +1,116 @@
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import datetime
+
+CACHE_FILENAME = 'extraction_cache.db'
+
+def create_cache(output_folder):
+    """Create the page cache next to pdf_data.db and return its path.
+
+    The cache lives in its own file so it survives the loss of pdf_data.db
+    and can be used to rebuild it.
+    """
+    cache_path = os.path.join(output_folder, CACHE_FILENAME)
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+
+    # Raw text and positioned runs are stored zlib-compressed per page hash;
+    # parsed results are tagged with the parser version that produced them
+    c.execute('''CREATE TABLE IF NOT EXISTS page_cache
+                 (page_hash TEXT PRIMARY KEY,
+                  raw_text BLOB,
+                  runs BLOB,
+                  parsed TEXT,
+                  parser_version INTEGER,
+                  extraction_mode TEXT,
+                  cached_date TEXT)''')
+
+    conn.commit()
+    conn.close()
+    return cache_path
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def page_hash(page):
+    """Hash a page by its decoded content streams"""
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        # A page's /Contents is either a single stream or an array of streams
+        streams = contents if isinstance(contents, list) else [contents]
+        for stream in streams:
+            digest.update(stream.get_object().get_data())
+    return digest.hexdigest()
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'))
+
+def decompress_text(blob):
+    return zlib.decompress(blob).decode('utf-8')
+
+def get_cached_page(cache_path, page_hash):
+    """Return (text, runs, parsed, parser_version, extraction_mode) or None"""
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+    c.execute("""SELECT raw_text, runs, parsed, parser_version, extraction_mode
+                 FROM page_cache WHERE page_hash = ?""", (page_hash,))
+    row = c.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+    raw_text, runs, parsed, parser_version, extraction_mode = row
+    return (decompress_text(raw_text),
+            [tuple(run) for run in json.loads(decompress_text(runs))],
+            json.loads(parsed) if parsed else None,
+            parser_version,
+            extraction_mode)
+
+def store_page(cache_path, page_hash, text, runs, parsed, parser_version, extraction_mode):
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+    c.execute('''INSERT OR REPLACE INTO page_cache
+                 (page_hash, raw_text, runs, parsed, parser_version, extraction_mode, cached_date)
+                 VALUES (?, ?, ?, ?, ?, ?, ?)''',
+              (page_hash, compress_text(text), compress_text(json.dumps(runs)), json.dumps(parsed),
+               parser_version, extraction_mode, datetime.date.today().strftime('%Y-%m-%d')))
+    conn.commit()
+    conn.close()
+
+def get_stale_page_hashes(cache_path, parser_version):
+    """List the pages whose parsed result came from a different parser version"""
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+    c.execute("""SELECT page_hash FROM page_cache
+                 WHERE parser_version IS NULL OR parser_version != ?""", (parser_version,))
+    hashes = [row[0] for row in c.fetchall()]
+    conn.close()
+    return hashes
+
+def load_pages(cache_path, page_hashes):
+    """Return (page_hash, text, runs, extraction_mode) for each cached page in page_hashes"""
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+    c.execute(f"""SELECT page_hash, raw_text, runs, extraction_mode FROM page_cache
+                  WHERE page_hash IN ({', '.join('?' * len(page_hashes))})""", list(page_hashes))
+    pages = [(row[0], decompress_text(row[1]), [tuple(run) for run in json.loads(decompress_text(row[2]))], row[3])
+             for row in c.fetchall()]
+    conn.close()
+    return pages
+
+def store_parsed(cache_path, results, parser_version):
+    """Save re-parsed results, given as (page_hash, parsed) pairs"""
+    conn = sqlite3.connect(cache_path)
+    c = conn.cursor()
+    c.executemany("UPDATE page_cache SET parsed = ?, parser_version = ? WHERE page_hash = ?",
+                  [(json.dumps(parsed), parser_version, page_hash) for page_hash, parsed in results])
+    conn.commit()
+    conn.close()
@@ -0,0 +1,168 @@
+"""
+Watch an inbox folder and ingest PDFs dropped into it.
+
+The inbox is polled rather than watched with OS notifications, so a burst
+of hundreds of files arriving together is picked up by a single scan.
+A file is only ingested once its size and modification time have stayed
+the same for settle_time seconds, so half-copied files are left alone.
+Ingestion runs on a bounded process pool; files that split cleanly move
+to inbox/processed and files that fail move to inbox/failed with an
+.error.txt next to them.
+"""
+import os
+import time
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from database_manager import recover_ingest, subscribe, unsubscribe, emit_change
+
+PROCESSED_FOLDER = 'processed'
+FAILED_FOLDER = 'failed'
+
+class IngestFailed(Exception):
+    """A failed ingest, with the change events of the batches committed before it failed"""
+    def __init__(self, message, changes):
+        super().__init__(message, changes)
+        self.changes = changes
+
+    def __str__(self):
+        return self.args[0]
+
+def ingest_file(path, output_folder, extraction_mode):
+    """Split path in a worker process and return the change events it caused.
+
+    Nothing listens for the events in the worker, so the watcher re-emits
+    them in its own process.
+    """
+    # Imported in the worker so the watcher itself does not load PyPDF2
+    from pdf_processor import split_pdf
+    changes = []
+    record = lambda *change: changes.append(change)
+    subscribe(record)
+    try:
+        split_pdf(path, output_folder, extraction_mode)
+    except Exception as e:
+        raise IngestFailed(str(e) or type(e).__name__, changes) from e
+    finally:
+        unsubscribe(record)
+    return changes
+
+def move_unique(path, folder):
+    """Move path into folder, adding a counter if a file of that name is already there"""
+    os.makedirs(folder, exist_ok=True)
+    base, ext = os.path.splitext(os.path.basename(path))
+    target = os.path.join(folder, base + ext)
+    counter = 1
+    while os.path.exists(target):
+        target = os.path.join(folder, f"{base} ({counter}){ext}")
+        counter += 1
+    os.replace(path, target)
+    return target
+
+class InboxWatcher:
+    def __init__(self, inbox, output_folder, workers=2, poll_interval=1.0, settle_time=2.0,
+                 extraction_mode="text", on_event=None):
+        """on_event(kind, path, message) is called with kind 'processed' or 'failed'
+        from the watcher thread"""
+        self.inbox = inbox
+        self.output_folder = output_folder
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.extraction_mode = extraction_mode
+        self.on_event = on_event
+        self.processed_folder = os.path.join(inbox, PROCESSED_FOLDER)
+        self.failed_folder = os.path.join(inbox, FAILED_FOLDER)
+        # path -> (size, mtime_ns, time the signature was first seen)
+        self.candidates = {}
+        self.in_flight = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def scan(self):
+        """Return the inbox PDFs whose size and mtime have settled, oldest first"""
+        now = time.monotonic()
+        seen = set()
+        ready = []
+        with os.scandir(self.inbox) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith('.pdf') or entry.path in self.in_flight:
+                    continue
+                seen.add(entry.path)
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime_ns)
+                previous = self.candidates.get(entry.path)
+                if previous is None or previous[:2] != signature:
+                    self.candidates[entry.path] = signature + (now,)
+                elif stat.st_size > 0 and now - previous[2] >= self.settle_time:
+                    ready.append((stat.st_mtime_ns, entry.path))
+
+        # Forget files that were removed before they settled
+        for path in set(self.candidates) - seen:
+            del self.candidates[path]
+        return [path for _, path in sorted(ready)]
+
+    def collect(self):
+        """Move finished files to processed or failed"""
+        for path, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[path]
+            self.candidates.pop(path, None)
+            error = future.exception()
+            for change in future.result() if error is None else getattr(error, 'changes', []):
+                emit_change(*change)
+            try:
+                if error is None:
+                    target = move_unique(path, self.processed_folder)
+                    print(f"Ingested {os.path.basename(path)}")
+                    self.notify('processed', target, '')
+                else:
+                    target = move_unique(path, self.failed_folder)
+                    message = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+                    with open(f"{target}.error.txt", 'w') as f:
+                        f.write(message)
+                    print(f"Failed to ingest {os.path.basename(path)}: {error}")
+                    self.notify('failed', target, str(error))
+            except OSError as e:
+                print(f"Could not move {path}: {e}")
+
+    def notify(self, kind, path, message):
+        if self.on_event:
+            self.on_event(kind, path, message)
+
+    def run(self):
+        """Poll the inbox until stop() is called"""
+        for folder in (self.inbox, self.processed_folder, self.failed_folder):
+            os.makedirs(folder, exist_ok=True)
+        os.makedirs(self.output_folder, exist_ok=True)
+        recover_ingest(self.output_folder)
+        print(f"Watching {self.inbox} with {self.workers} workers")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            while not self.stop_event.is_set():
+                self.collect()
+                # Keep at most one queued file per worker so the backlog stays in the inbox
+                for path in self.scan()[:max(0, self.workers * 2 - len(self.in_flight))]:
+                    self.in_flight[path] = executor.submit(ingest_file, path, self.output_folder,
+                                                           self.extraction_mode)
+                self.stop_event.wait(self.poll_interval)
+            # Let files already handed to the pool finish and be filed
+            for future in list(self.in_flight.values()):
+                future.exception()
+            self.collect()
+
+    def start(self):
+        """Run the watcher on a background thread"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='inbox-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self, wait=True):
+        self.stop_event.set()
+        if wait and self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -1,18 +1,35 @@
 import os
 import sqlite3
-import datetime  # Add this import to fix the NameError
-import json
 from PyQt5.QtWidgets import (QWidget, QPushButton, QVBoxLayout, QHBoxLayout, QFileDialog, 
-                             QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView,
-                             QLineEdit, QLabel, QDialog, QInputDialog, QSplitter, QAbstractItemView,
-                             QToolBar, QMainWindow, QStatusBar, QProgressDialog, QStyle, QFrame,
-                             QApplication, QCheckBox, QMenu, QSizePolicy)  # Added QSizePolicy
+                             QMessageBox, QTableWidget, QLineEdit, QLabel, QDialog, QInputDialog,
+                             QAbstractItemView, QToolBar, QMainWindow, QStatusBar, QStyle, QFrame,
+                             QApplication, QMenu, QSizePolicy)
 from PyQt5.QtCore import Qt, QSize, QTimer, QSettings
-from PyQt5.QtGui import QDesktopServices, QPalette, QColor, QIcon, QKeySequence
-from PyQt5.QtCore import QUrl, pyqtSignal
-from pdf_processor import split_pdf
-from database_manager import (create_database, insert_into_database, update_individual_info,
-                              get_individuals, get_pay_statements)
+from PyQt5.QtGui import QPalette, QColor, QKeySequence
+from PyQt5.QtCore import QObject, pyqtSignal
+from database_manager import (create_database, update_individual_info, recover_ingest, get_ingest_checkpoints,
+                              subscribe)
+
+class ChangeNotifier(QObject):
+    """Re-emits database_manager change events as a Qt signal.
+
+    Writes can happen on worker threads; the queued connection Qt makes
+    for cross-thread signals delivers them to slots on the UI thread.
+    """
+    # db_path, table, inserted ids, updated ids, deleted ids
+    changed = pyqtSignal(str, str, list, list, list)
+
+    def __init__(self):
+        super().__init__()
+        subscribe(self.changed.emit)
+
+_change_notifier = None
+
+def change_notifier():
+    global _change_notifier
+    if _change_notifier is None:
+        _change_notifier = ChangeNotifier()
+    return _change_notifier
 
 class ThemeAwareWidget:
     """Mixin class to provide system theme awareness"""
@@ -272,19 +289,20 @@ class EnhancedTable(QTableWidget, ThemeAwareWidget):
             }}
         """)
 
-    def filter_rows(self, text, column_indices=None):
+    def filter_rows(self, text, column_indices=None, rows=None):
         """Filter table rows based on search text in specified columns.
-        If column_indices is None, search all columns.
+        If column_indices is None, search all columns; if rows is None, check all rows.
         """
+        rows = range(self.rowCount()) if rows is None else rows
         if not text:
             # Show all rows if search text is empty
-            for row in range(self.rowCount()):
+            for row in rows:
                 self.setRowHidden(row, False)
             return
             
         search_terms = text.lower().split()
         
-        for row in range(self.rowCount()):
+        for row in rows:
             row_text = ""
             
             # Which columns to search
@@ -400,422 +418,6 @@ class EnhancedTable(QTableWidget, ThemeAwareWidget):
             return
         super().keyPressEvent(event)
 
-class DatabaseViewer(QWidget, ThemeAwareWidget):
-    def __init__(self, db_path, pdf_folder):
-        super().__init__()
-        self.db_path = db_path
-        self.pdf_folder = pdf_folder
-        self.current_individual_id = None
-        self.current_individual_name = None
-        self.initUI()
-        
-    def initUI(self):
-        layout = QVBoxLayout()
-        layout.setSpacing(10)
-        
-        # Header with title and stats
-        header_layout = QHBoxLayout()
-        title_label = QLabel("<h2>Paystub Database</h2>")
-        header_layout.addWidget(title_label)
-        
-        self.stats_label = QLabel()
-        header_layout.addWidget(self.stats_label, 1)
-        
-        # Add refresh button
-        refresh_btn = QPushButton()
-        refresh_btn.setIcon(self.style().standardIcon(QStyle.SP_BrowserReload))
-        refresh_btn.setToolTip("Refresh Data")
-        refresh_btn.clicked.connect(self.refresh_data)
-        header_layout.addWidget(refresh_btn)
-        
-        layout.addLayout(header_layout)
-        
-        # Main content
-        splitter = QSplitter(Qt.Vertical)
-        
-        # Individuals card
-        individuals_card = QFrame()
-        individuals_card.setFrameStyle(QFrame.StyledPanel)
-        individuals_card.setProperty("class", "card")
-        individuals_layout = QVBoxLayout(individuals_card)
-        
-        # Individuals header with controls
-        individuals_header = QHBoxLayout()
-        individuals_header.addWidget(QLabel("<b>Individuals</b>"))
-        
-        # Add individual button
-        add_individual_btn = QPushButton()
-        add_individual_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogNewFolder))
-        add_individual_btn.setToolTip("Add New Individual")
-        add_individual_btn.clicked.connect(self.add_individual)
-        individuals_header.addWidget(add_individual_btn)
-        
-        # Search
-        self.individuals_search = SearchLineEdit("Search individuals...")
-        self.individuals_search.textChanged.connect(lambda text: self.individuals_table.filter_rows(text))
-        individuals_header.addWidget(self.individuals_search)
-        
-        individuals_layout.addLayout(individuals_header)
-        
-        # Individuals table
-        self.individuals_table = EnhancedTable()
-        individuals_layout.addWidget(self.individuals_table)
-        
-        # Pay Statements card
-        statements_card = QFrame()
-        statements_card.setFrameStyle(QFrame.StyledPanel)
-        statements_card.setProperty("class", "card")
-        statements_layout = QVBoxLayout(statements_card)
-        
-        # Statements header with date filter
-        statements_header = QHBoxLayout()
-        self.pay_statements_label = QLabel("<b>Pay Statements</b>")
-        statements_header.addWidget(self.pay_statements_label)
-        
-        # Add filter by year
-        year_label = QLabel("Year:")
-        statements_header.addWidget(year_label)
-        
-        self.year_filter = QLineEdit()
-        self.year_filter.setMaximumWidth(80)
-        self.year_filter.setPlaceholderText("Year")
-        self.year_filter.textChanged.connect(self.apply_filters)
-        statements_header.addWidget(self.year_filter)
-        
-        # Search
-        self.statements_search = SearchLineEdit("Search statements...")
-        self.statements_search.textChanged.connect(self.apply_filters)
-        statements_header.addWidget(self.statements_search)
-        
-        statements_layout.addLayout(statements_header)
-        
-        # Pay statements table
-        self.pay_statements_table = EnhancedTable()
-        statements_layout.addWidget(self.pay_statements_table)
-        
-        # Action buttons for pay statements
-        statement_actions = QHBoxLayout()
-        
-        view_all_btn = QPushButton("View All")
-        view_all_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogContentsView))
-        view_all_btn.clicked.connect(self.view_all_statements)
-        statement_actions.addWidget(view_all_btn)
-        
-        export_btn = QPushButton("Export Selected")
-        export_btn.setIcon(self.style().standardIcon(QStyle.SP_DialogSaveButton))
-        export_btn.clicked.connect(self.export_selected)
-        statement_actions.addWidget(export_btn)
-        
-        statement_actions.addStretch()
-        statements_layout.addLayout(statement_actions)
-        
-        # Add sections to splitter
-        splitter.addWidget(individuals_card)
-        splitter.addWidget(statements_card)
-        splitter.setStretchFactor(0, 1)
-        splitter.setStretchFactor(1, 2)
-        
-        layout.addWidget(splitter, 1)
-        
-        # Bottom status bar
-        status_layout = QHBoxLayout()
-        self.status_label = QLabel("")
-        status_layout.addWidget(self.status_label)
-        layout.addLayout(status_layout)
-        
-        self.setLayout(layout)
-        
-        # Apply theme-aware styling
-        self.update_styling()
-        
-        # Load data
-        self.setWindowTitle('Paystub Database Viewer')
-        self.setGeometry(300, 300, 1000, 800)
-        self.refresh_data()
-    
-    def update_styling(self):
-        colors = self.get_theme_colors()
-        self.setStyleSheet(f"""
-            QWidget {{
-                background-color: {colors['window']};
-                color: {colors['windowText']};
-            }}
-            QLabel {{
-                color: {colors['windowText']};
-            }}
-            QPushButton {{
-                padding: 6px 12px;
-                background-color: {colors['button']};
-                color: {colors['buttonText']};
-                border: 1px solid {colors['mid']};
-                border-radius: 4px;
-            }}
-            QPushButton:hover {{
-                background-color: {colors['highlight']};
-                color: {colors['highlightedText']};
-            }}
-            QFrame {{
-                border: 1px solid {colors['mid']};
-                border-radius: 6px;
-                background-color: {colors['alternateBase']};
-            }}
-            QFrame[class="card"] {{
-                padding: 10px;
-            }}
-        """)
-    
-    def refresh_data(self):
-        self.update_stats()
-        self.load_individuals()
-        if self.current_individual_id:
-            self.load_pay_statements(self.current_individual_id, self.current_individual_name)
-    
-    def update_stats(self):
-        try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM individuals")
-            individuals_count = c.fetchone()[0]
-            
-            c.execute("SELECT COUNT(*) FROM pay_statements")
-            statements_count = c.fetchone()[0]
-            
-            c.execute("SELECT MIN(date), MAX(date) FROM pay_statements")
-            date_range = c.fetchone()
-            min_date = date_range[0] if date_range[0] else "N/A"
-            max_date = date_range[1] if date_range[1] else "N/A"
-            
-            conn.close()
-            
-            self.stats_label.setText(f"{individuals_count} individuals | {statements_count} statements | Date range: {min_date} to {max_date}")
-        except Exception as e:
-            self.stats_label.setText(f"Error loading stats: {str(e)}")
-    
-    def add_individual(self):
-        name, ok = QInputDialog.getText(self, "Add Individual", "Enter individual name:")
-        if ok and name:
-            try:
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute("INSERT OR IGNORE INTO individuals (name) VALUES (?)", (name,))
-                conn.commit()
-                conn.close()
-                self.refresh_data()
-                self.set_status(f"Added new individual: {name}", "success")
-            except Exception as e:
-                self.set_status(f"Error adding individual: {str(e)}", "error")
-    
-    def set_status(self, message, status_type="info"):
-        palette = self.palette()
-        base_text = palette.color(QPalette.WindowText)
-        
-        colors = {
-            "success": QColor(0, 170, 0) if palette.base().color().lightness() > 128 else QColor(100, 255, 100),
-            "error": QColor(200, 0, 0) if palette.base().color().lightness() > 128 else QColor(255, 100, 100),
-            "info": QColor(0, 100, 200) if palette.base().color().lightness() > 128 else QColor(100, 200, 255),
-            "warning": QColor(180, 100, 0) if palette.base().color().lightness() > 128 else QColor(255, 180, 0)
-        }.get(status_type, base_text)
-        
-        self.status_label.setText(message)
-        self.status_label.setStyleSheet(f"color: {colors.name()}")
-
-    def load_individuals(self):
-        individuals = get_individuals(self.db_path)
-        self.individuals_table.setColumnCount(6)
-        self.individuals_table.setHorizontalHeaderLabels(["ID", "Name", "Address", "Phone", "Email", "Actions"])
-        self.individuals_table.setRowCount(len(individuals))
-
-        for row, record in enumerate(individuals):
-            for col, value in enumerate(record):
-                item = QTableWidgetItem(str(value) if value is not None else "")
-                if col == 0:  # ID column
-                    item.setTextAlignment(Qt.AlignCenter)
-                self.individuals_table.setItem(row, col, item)
-
-            # Add action buttons
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(2, 2, 2, 2)
-            action_layout.setSpacing(4)
-            
-            edit_btn = QPushButton()
-            edit_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogInfoView))
-            edit_btn.setMaximumWidth(30)
-            edit_btn.setToolTip("Edit Details")
-            edit_btn.clicked.connect(lambda _, name=record[1]: self.edit_individual_info(name))
-            
-            action_layout.addWidget(edit_btn)
-            action_layout.addStretch()
-            
-            self.individuals_table.setCellWidget(row, 5, action_widget)
-
-        self.individuals_table.resizeColumnsToContents()
-        self.individuals_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.individuals_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.individuals_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
-        self.individuals_table.clicked.connect(self.on_individual_selected)
-    
-    def edit_individual_info(self, name):
-        dialog = IndividualInfoDialog(self.db_path, name)
-        if dialog.exec_():
-            self.refresh_data()
-            self.set_status(f"Updated information for {name}", "success")
-
-    def on_individual_selected(self, index):
-        row = index.row()
-        self.current_individual_id = int(self.individuals_table.item(row, 0).text())
-        self.current_individual_name = self.individuals_table.item(row, 1).text()
-        self.load_pay_statements(self.current_individual_id, self.current_individual_name)
-
-    def load_pay_statements(self, individual_id, name):
-        self.current_individual_id = individual_id
-        self.current_individual_name = name
-        self.pay_statements_label.setText(f"<b>Pay Statements for {name}</b>")
-        
-        # Clear the table
-        self.pay_statements_table.setRowCount(0)
-        
-        # Get pay statements
-        pay_statements = get_pay_statements(self.db_path, individual_id)
-        
-        self.pay_statements_table.setColumnCount(6)
-        self.pay_statements_table.setHorizontalHeaderLabels([
-            "ID", "Date", "Filename", "Extraction Date", "Actions", "Select"
-        ])
-        self.pay_statements_table.setRowCount(len(pay_statements))
-
-        for row, record in enumerate(pay_statements):
-            for col, value in enumerate(record[1:5]):  # Skip individual_id (0), add columns 1-4
-                item = QTableWidgetItem(str(value) if value is not None else "")
-                if col == 0:  # ID column
-                    item.setTextAlignment(Qt.AlignCenter)
-                self.pay_statements_table.setItem(row, col, item)
-            
-            # Add action buttons
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(2, 2, 2, 2)
-            action_layout.setSpacing(4)
-            
-            open_btn = QPushButton()
-            open_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
-            open_btn.setMaximumWidth(30)
-            open_btn.setToolTip("Open PDF")
-            open_btn.clicked.connect(lambda _, f=record[3]: self.open_pdf(f))
-            
-            action_layout.addWidget(open_btn)
-            action_layout.addStretch()
-            
-            self.pay_statements_table.setCellWidget(row, 4, action_widget)
-            
-            # Add checkbox for selection
-            select_widget = QWidget()
-            select_layout = QHBoxLayout(select_widget)
-            select_layout.setContentsMargins(2, 2, 2, 2)
-            
-            checkbox = QCheckBox()
-            checkbox.setProperty("filename", record[3])  # Store filename for export
-            select_layout.addWidget(checkbox)
-            select_layout.setAlignment(Qt.AlignCenter)
-            
-            self.pay_statements_table.setCellWidget(row, 5, select_widget)
-
-        self.pay_statements_table.resizeColumnsToContents()
-        self.pay_statements_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.pay_statements_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.pay_statements_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
-        self.pay_statements_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
-        
-        # Apply any existing filter
-        self.apply_filters()
-    
-    def apply_filters(self):
-        search_text = self.statements_search.text().lower()
-        year_filter = self.year_filter.text()
-        
-        for row in range(self.pay_statements_table.rowCount()):
-            show_row = True
-            
-            # Check search text
-            if search_text:
-                row_text = ""
-                for col in range(4):  # Check columns 0-3
-                    item = self.pay_statements_table.item(row, col)
-                    if item:
-                        row_text += item.text().lower() + " "
-                
-                if search_text not in row_text:
-                    show_row = False
-            
-            # Check year filter
-            if year_filter and show_row:
-                date_item = self.pay_statements_table.item(row, 1)  # Date column
-                if date_item and year_filter not in date_item.text():
-                    show_row = False
-            
-            self.pay_statements_table.setRowHidden(row, not show_row)
-
-    def open_pdf(self, filename):
-        pdf_path = os.path.join(self.pdf_folder, filename)
-        if os.path.exists(pdf_path):
-            QDesktopServices.openUrl(QUrl.fromLocalFile(pdf_path))
-            self.set_status(f"Opened {filename}", "info")
-        else:
-            QMessageBox.warning(self, "Error", f"PDF file not found: {pdf_path}")
-            self.set_status(f"File not found: {pdf_path}", "error")
-    
-    def view_all_statements(self):
-        if not self.current_individual_id:
-            QMessageBox.information(self, "Info", "Please select an individual first")
-            return
-            
-        # Reset filters
-        self.statements_search.clear()
-        self.year_filter.clear()
-        self.apply_filters()
-        
-        self.set_status(f"Showing all statements for {self.current_individual_name}", "info")
-    
-    def export_selected(self):
-        selected_files = []
-        
-        for row in range(self.pay_statements_table.rowCount()):
-            if not self.pay_statements_table.isRowHidden(row):
-                select_widget = self.pay_statements_table.cellWidget(row, 5)
-                if select_widget:
-                    checkbox = select_widget.findChild(QCheckBox)
-                    if checkbox and checkbox.isChecked():
-                        filename = checkbox.property("filename")
-                        selected_files.append(filename)
-        
-        if not selected_files:
-            QMessageBox.information(self, "Export", "No files selected for export")
-            return
-            
-        export_folder = QFileDialog.getExistingDirectory(self, "Select Export Directory")
-        if not export_folder:
-            return
-            
-        success_count = 0
-        for filename in selected_files:
-            try:
-                source_path = os.path.join(self.pdf_folder, filename)
-                target_path = os.path.join(export_folder, filename)
-                
-                if os.path.exists(source_path):
-                    import shutil
-                    shutil.copy2(source_path, target_path)
-                    success_count += 1
-            except Exception as e:
-                print(f"Error exporting {filename}: {str(e)}")
-        
-        if success_count > 0:
-            self.set_status(f"Exported {success_count} files to {export_folder}", "success")
-        else:
-            self.set_status("No files were exported", "warning")
-        
-        QMessageBox.information(self, "Export Complete", f"Successfully exported {success_count} of {len(selected_files)} files")
-
 class IndividualInfoDialog(QDialog, ThemeAwareWidget):
     def __init__(self, db_path, name):
         super().__init__()
@@ -973,13 +575,58 @@ class IndividualInfoDialog(QDialog, ThemeAwareWidget):
         self.accept()
 
 class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
+    # Emitted once each: when the window first paints, and after the
+    # database checks that follow it
+    first_painted = pyqtSignal()
+    startup_complete = pyqtSignal()
+    # Carries inbox watcher results (kind, path, message) onto the UI thread
+    inbox_event = pyqtSignal(str, str, str)
+    
     def __init__(self):
         super().__init__()
         ThemeAwareWidget.__init__(self)
         self.db_path = None
         self.pdf_folder = None
+        self.inbox_watcher = None
+        self.ingest_queue = None
+        self.inbox_event.connect(self.on_inbox_event)
+        # (individuals, statements) shown in the stats line, kept current by change events
+        self.counts = None
+        change_notifier().changed.connect(self.on_database_changed)
+        self.first_paint_done = False
         self.initUI()
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.first_painted.emit()
+            # Open the database only once the window is on screen
+            QTimer.singleShot(0, self.finish_startup)
+    
+    def finish_startup(self):
         self.initialize_database()
+        self.update_stats()
+        self.startup_complete.emit()
+        self.offer_resume()
+    
+    def offer_resume(self):
+        """Ask to resume imports that were cancelled or cut short, if their PDFs are still there"""
+        if not self.db_path:
+            return
+        unfinished = [checkpoint for checkpoint in get_ingest_checkpoints(self.db_path, unfinished=True)
+                      if checkpoint['source'] and os.path.exists(checkpoint['source'])]
+        if not unfinished:
+            return
+        
+        details = "\n".join(f"{os.path.basename(checkpoint['source'])}: page {checkpoint['next_page']} "
+                            f"of {checkpoint['total_pages']}" for checkpoint in unfinished[:10])
+        reply = QMessageBox.question(self, "Resume Imports",
+                                     f"{len(unfinished)} PDF imports did not finish:\n\n{details}\n\n"
+                                     "Resume them from where they stopped?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if reply == QMessageBox.Yes:
+            self.queue_pdfs([checkpoint['source'] for checkpoint in unfinished])
         
     def updateStyle(self):
         colors = self.get_theme_colors()
@@ -1143,6 +790,13 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         update_action.setToolTip("Update individual information")
         update_action.triggered.connect(self.update_individual_info)
         
+        toolbar.addSeparator()
+        
+        self.watch_action = toolbar.addAction(self.style().standardIcon(QStyle.SP_DirOpenIcon), "Watch Inbox")
+        self.watch_action.setToolTip("Automatically split PDFs dropped into an inbox folder")
+        self.watch_action.setCheckable(True)
+        self.watch_action.toggled.connect(self.toggle_inbox_watcher)
+        
         # Add spacer to push theme toggle to the right
         spacer = QWidget()
         spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -1274,7 +928,7 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         drop_icon.setPixmap(self.style().standardPixmap(QStyle.SP_DirOpenIcon).scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
         drop_icon.setAlignment(Qt.AlignCenter)
         
-        drop_label = QLabel("Drag and drop PDF file here")
+        drop_label = QLabel("Drag and drop PDF files or folders here")
         drop_label.setStyleSheet("font-size: 14px;")
         drop_label.setAlignment(Qt.AlignCenter)
         
@@ -1282,6 +936,7 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         drop_layout.addWidget(drop_label)
         
         main_layout.addWidget(drop_frame)
+        self.main_layout = main_layout
         
         # Stats section
         self.stats_label = QLabel("No data available")
@@ -1293,9 +948,6 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         self.setGeometry(300, 300, 800, 600)
         self.show()
         
-        # Update stats after initialization
-        QTimer.singleShot(500, self.update_stats)
-        
     def update_stats(self):
         if self.db_path and os.path.exists(self.db_path):
             try:
@@ -1307,21 +959,99 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
                 statements_count = c.fetchone()[0]
                 conn.close()
                 
-                self.stats_label.setText(f"Current Database: {individuals_count} individuals with {statements_count} pay statements")
+                self.counts = [individuals_count, statements_count]
+                self.show_counts()
             except:
+                self.counts = None
                 self.stats_label.setText("Error retrieving database statistics")
         else:
+            self.counts = None
             self.stats_label.setText("No database available")
     
+    def show_counts(self):
+        self.stats_label.setText(f"Current Database: {self.counts[0]} individuals with {self.counts[1]} pay statements")
+    
+    def on_database_changed(self, db_path, table, inserted, updated, deleted):
+        """Adjust the stats line in place instead of recounting both tables"""
+        if self.counts is None or db_path != self.db_path:
+            return
+        column = {'individuals': 0, 'pay_statements': 1}.get(table)
+        if column is not None:
+            self.counts[column] += len(inserted) - len(deleted)
+            self.show_counts()
+    
+    def toggle_inbox_watcher(self, enabled):
+        if not enabled:
+            if self.inbox_watcher:
+                # Files already handed to workers finish in the background
+                self.inbox_watcher.stop(wait=False)
+                self.inbox_watcher = None
+            self.update_status("Inbox watching stopped", "info")
+            return
+        
+        settings = QSettings("Paystub", "PaystubManager")
+        inbox = QFileDialog.getExistingDirectory(self, "Select Inbox Folder", settings.value("inbox_folder", ""))
+        if not inbox or not self.pdf_folder:
+            self.watch_action.setChecked(False)
+            return
+        settings.setValue("inbox_folder", inbox)
+        
+        from folder_watcher import InboxWatcher
+        self.inbox_watcher = InboxWatcher(inbox, self.pdf_folder,
+                                          on_event=lambda kind, path, message: self.inbox_event.emit(kind, path, message))
+        self.inbox_watcher.start()
+        self.update_status(f"Watching {inbox} for new PDFs", "info")
+    
+    def on_inbox_event(self, kind, path, message):
+        name = os.path.basename(path)
+        if kind == "processed":
+            self.update_status(f"Processed {name} from inbox", "success")
+        else:
+            self.update_status(f"Failed to process {name}: {message}", "error")
+    
+    def closeEvent(self, event):
+        if self.inbox_watcher:
+            self.inbox_watcher.stop()
+        if self.ingest_queue:
+            self.ingest_queue.shutdown()
+        super().closeEvent(event)
+    
     def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls() and event.mimeData().urls()[0].toLocalFile().endswith('.pdf'):
+        paths = [url.toLocalFile() for url in event.mimeData().urls()] if event.mimeData().hasUrls() else []
+        if any(path.lower().endswith('.pdf') or os.path.isdir(path) for path in paths):
             event.accept()
         else:
             event.ignore()
 
     def dropEvent(self, event):
-        file_path = event.mimeData().urls()[0].toLocalFile()
-        self.process_pdf(file_path)
+        self.queue_pdfs([url.toLocalFile() for url in event.mimeData().urls()])
+    
+    def queue_pdfs(self, paths):
+        """Queue PDFs, and the PDFs inside any folders, for background processing"""
+        from ingest_queue import IngestQueuePanel, find_pdfs
+        pdfs = find_pdfs(paths)
+        if not pdfs:
+            self.update_status("No PDF files found", "warning")
+            return
+        if not self.pdf_folder:
+            self.initialize_database()
+        
+        if self.ingest_queue is None:
+            self.ingest_queue = IngestQueuePanel(self.pdf_folder)
+            self.ingest_queue.file_finished.connect(self.on_file_finished)
+            # Sits between the drop zone and the stats line
+            self.main_layout.insertWidget(self.main_layout.indexOf(self.stats_label), self.ingest_queue, 1)
+        self.ingest_queue.enqueue(pdfs)
+        self.update_status(f"Queued {len(pdfs)} PDF files", "info")
+    
+    def on_file_finished(self, path, status):
+        name = os.path.basename(path)
+        if status == "Done":
+            self.update_status(f"Processed {name}", "success")
+        elif status == "Cancelled":
+            self.update_status(f"Cancelled {name}", "warning")
+        else:
+            self.update_status(f"{name}: {status}", "error")
 
     def initialize_database(self):
         current_dir = os.getcwd()
@@ -1329,34 +1059,20 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         if not os.path.exists(self.pdf_folder):
             os.makedirs(self.pdf_folder)
         
-        self.db_path = os.path.join(self.pdf_folder, "pdf_data.db")
+        db_exists = os.path.exists(os.path.join(self.pdf_folder, "pdf_data.db"))
         
-        if not os.path.exists(self.db_path):
-            try:
-                conn = sqlite3.connect(self.db_path)
-                c = conn.cursor()
-                c.execute('''CREATE TABLE IF NOT EXISTS individuals
-                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                              name TEXT UNIQUE,
-                              address TEXT,
-                              phone_number TEXT,
-                              email TEXT)''')
-                c.execute('''CREATE TABLE IF NOT EXISTS pay_statements
-                             (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                              individual_id INTEGER,
-                              date TEXT,
-                              filename TEXT,
-                              extraction_date TEXT,
-                              FOREIGN KEY (individual_id) REFERENCES individuals(id),
-                              UNIQUE(individual_id, date))''')
-                conn.commit()
-                conn.close()
+        # create_database also brings databases from older versions up to date
+        try:
+            self.db_path = create_database(self.pdf_folder)
+            # Nothing is ingesting yet, so pages left by a crash can be settled
+            recover_ingest(self.pdf_folder)
+            if db_exists:
+                self.update_status("Database loaded successfully", "success")
+            else:
                 self.update_status("Database created successfully", "success")
-            except sqlite3.Error as e:
-                self.update_status(f"Database creation failed: {str(e)}", "error")
-                self.db_path = None
-        else:
-            self.update_status("Database loaded successfully", "success")
+        except sqlite3.Error as e:
+            self.update_status(f"Database creation failed: {str(e)}", "error")
+            self.db_path = None
 
     def update_status(self, message, status_type="info"):
         palette = self.palette()
@@ -1374,100 +1090,16 @@ class PDFSplitterApp(QMainWindow, ThemeAwareWidget):
         self.status_label.setStyleSheet(f"color: {colors.name()}")
 
     def select_pdf(self):
-        input_path, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF Files (*.pdf)")
-        if input_path:
-            self.process_pdf(input_path)
-
-    def process_pdf(self, input_path):
-        # More detailed progress dialog
-        progress = QProgressDialog("Preparing to process PDF...", "Cancel", 0, 100, self)
-        progress.setWindowTitle("Processing PDF")
-        progress.setWindowModality(Qt.WindowModal)
-        progress.setAutoClose(True)
-        progress.setCancelButton(None)  # Disable cancel button
-        progress.setMinimumDuration(0)
-        progress.setValue(0)
-        progress.show()
-        
-        # Define processing stages and their weight
-        stages = [
-            ("Reading PDF file", 20),
-            ("Extracting text and metadata", 30),
-            ("Processing individual paystubs", 30),
-            ("Updating database", 20)
-        ]
-        
-        stage_index = 0
-        current_stage = stages[stage_index]
-        progress.setLabelText(f"Stage {stage_index+1}/{len(stages)}: {current_stage[0]}...")
-        
-        def update_progress():
-            nonlocal stage_index, current_stage
-            
-            # Calculate overall progress based on current stage and its weight
-            current_value = progress.value()
-            
-            if current_value >= (stage_index + 1) * 25:
-                # Move to next stage if available
-                stage_index = min(stage_index + 1, len(stages) - 1)
-                current_stage = stages[stage_index]
-                progress.setLabelText(f"Stage {stage_index+1}/{len(stages)}: {current_stage[0]}...")
-            
-            progress.setValue(min(current_value + 1, 99))  # Keep at 99% until complete
-        
-        timer = QTimer(self)
-        timer.timeout.connect(update_progress)
-        timer.start(100)
-        
-        try:
-            QApplication.processEvents()
-            start_time = datetime.datetime.now()
-            
-            # Process the PDF
-            self.db_path = split_pdf(input_path, self.pdf_folder)
-            
-            # Calculate processing time
-            end_time = datetime.datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
-            
-            # Stop the timer and complete the progress
-            timer.stop()
-            progress.setValue(100)
-            progress.setLabelText("Processing complete!")
-            
-            # Update status with processing info
-            self.update_status(f"PDF processed successfully in {processing_time:.1f} seconds", "success")
-            
-            # Refresh stats
-            self.update_stats()
-            
-            # Show success message
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM pay_statements WHERE extraction_date = ?", 
-                      (datetime.date.today().strftime('%Y-%m-%d'),))
-            new_statements = c.fetchone()[0]
-            conn.close()
-            
-            QMessageBox.information(self, "Success", 
-                                   f"PDF processing complete!\n\n"
-                                   f"• Processed in {processing_time:.1f} seconds\n"
-                                   f"• {new_statements} paystubs extracted\n\n"
-                                   "You can now view them in the database viewer.")
-            
-        except Exception as e:
-            timer.stop()
-            progress.cancel()
-            self.update_status(f"Error processing PDF: {str(e)}", "error")
-            QMessageBox.warning(self, "Error", f"Failed to process PDF: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+        input_paths, _ = QFileDialog.getOpenFileNames(self, "Select PDFs", "", "PDF Files (*.pdf)")
+        if input_paths:
+            self.queue_pdfs(input_paths)
 
     def view_database(self):
         if not self.db_path or not os.path.exists(self.db_path):
             QMessageBox.warning(self, "Warning", "No valid database found. Please split a PDF first.")
             return
 
+        from database_viewer import DatabaseViewer
         self.db_viewer = DatabaseViewer(self.db_path, self.pdf_folder)
         self.db_viewer.show()
 
@@ -0,0 +1,254 @@
+"""
+Queue panel that splits many PDFs concurrently in worker processes.
+
+Each file gets its own row with status, page progress and throughput, and
+its own cancel button. Progress and the database change events of the
+workers come back through a manager queue that a timer drains on the UI
+thread, so no Qt object is touched from another thread.
+"""
+import os
+import time
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PyQt5.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import QTimer, pyqtSignal
+from gui_components import ThemeAwareWidget
+from database_manager import subscribe, unsubscribe, emit_change
+
+POLL_INTERVAL_MS = 200
+
+def default_workers():
+    # Leave a core for the UI and SQLite
+    return max(1, (os.cpu_count() or 2) - 1)
+
+def run_ingest(job_id, path, output_folder, extraction_mode, cancel_event, progress_queue):
+    """Worker process entry point; returns True if the file was cancelled part way"""
+    from pdf_processor import split_pdf
+    # Change events fire in this worker; the panel re-emits them in the GUI process
+    forward = lambda *change: progress_queue.put(('change',) + change)
+    subscribe(forward)
+    try:
+        # Lets the panel time the file from when a worker actually picks it up
+        progress_queue.put(('progress', job_id, 0, 0))
+        split_pdf(path, output_folder, extraction_mode,
+                  progress_callback=lambda done, total: progress_queue.put(('progress', job_id, done, total)),
+                  cancel_event=cancel_event)
+    finally:
+        unsubscribe(forward)
+    return cancel_event.is_set()
+
+def find_pdfs(paths):
+    """Expand dropped files and folders into the PDFs they contain"""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                pdfs.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith('.pdf'))
+        elif path.lower().endswith('.pdf'):
+            pdfs.append(path)
+    return pdfs
+
+class IngestJob:
+    def __init__(self, job_id, path, row):
+        self.job_id = job_id
+        self.path = path
+        self.row = row
+        self.future = None
+        self.cancel_event = None
+        self.status = "Queued"
+        self.pages_done = 0
+        self.pages_total = 0
+        # Page the worker resumed from, so throughput only counts this run's pages
+        self.resumed_from = None
+        self.started = None
+        self.finished = None
+
+class IngestQueuePanel(QFrame, ThemeAwareWidget):
+    # Emitted on the UI thread as (path, status) when a file stops running
+    file_finished = pyqtSignal(str, str)
+
+    COLUMNS = ["File", "Status", "Pages", "Pages/s", ""]
+
+    def __init__(self, output_folder, extraction_mode="text", max_workers=None, parent=None):
+        super().__init__(parent)
+        ThemeAwareWidget.__init__(self)
+        self.output_folder = output_folder
+        self.extraction_mode = extraction_mode
+        self.max_workers = max_workers or default_workers()
+        self.jobs = {}
+        self.next_job_id = 0
+        self.executor = None
+        self.manager = None
+        self.progress_queue = None
+        self.first_start = None
+
+        self.setObjectName("card")
+        self.setProperty("class", "card")
+        self.initUI()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+
+    def initUI(self):
+        layout = QVBoxLayout(self)
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel("<b>Processing Queue</b>"))
+        self.summary_label = QLabel()
+        header.addWidget(self.summary_label, 1)
+
+        clear_btn = QPushButton("Clear Finished")
+        clear_btn.clicked.connect(self.clear_finished)
+        header.addWidget(clear_btn)
+        layout.addLayout(header)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, len(self.COLUMNS)):
+            self.table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeToContents)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        layout.addWidget(self.table)
+
+    def start_workers(self):
+        # The manager's process and the pool are only started once files arrive
+        self.manager = multiprocessing.Manager()
+        self.progress_queue = self.manager.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def enqueue(self, paths):
+        if self.executor is None:
+            self.start_workers()
+
+        for path in paths:
+            job = IngestJob(self.next_job_id, path, None)
+            self.next_job_id += 1
+            job.cancel_event = self.manager.Event()
+            job.future = self.executor.submit(run_ingest, job.job_id, path, self.output_folder,
+                                              self.extraction_mode, job.cancel_event, self.progress_queue)
+            self.jobs[job.job_id] = job
+            self.add_row(job)
+
+        if not self.timer.isActive():
+            self.timer.start(POLL_INTERVAL_MS)
+        self.update_summary()
+
+    def add_row(self, job):
+        job.row = self.table.rowCount()
+        self.table.insertRow(job.row)
+        self.table.setItem(job.row, 0, QTableWidgetItem(os.path.basename(job.path)))
+        self.table.item(job.row, 0).setToolTip(job.path)
+        if not job.finished:
+            cancel_btn = QPushButton("Cancel")
+            cancel_btn.clicked.connect(lambda _, job_id=job.job_id: self.cancel(job_id))
+            self.table.setCellWidget(job.row, 4, cancel_btn)
+        self.update_row(job)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return
+        # A queued file never starts; a running one stops before its next page
+        if job.future.cancel():
+            self.finish(job, "Cancelled")
+        else:
+            job.cancel_event.set()
+            job.status = "Cancelling"
+            self.update_row(job)
+
+    def poll(self):
+        while True:
+            try:
+                message = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == 'change':
+                emit_change(*message[1:])
+                continue
+            _, job_id, done, total = message
+            job = self.jobs.get(job_id)
+            if job and not job.finished:
+                if job.started is None:
+                    job.started = time.monotonic()
+                    self.first_start = self.first_start or job.started
+                if total and job.resumed_from is None:
+                    job.resumed_from = done
+                job.pages_done, job.pages_total = done, total
+                if job.status == "Queued":
+                    job.status = "Processing"
+                self.update_row(job)
+
+        for job in self.jobs.values():
+            if job.finished or not job.future.done():
+                continue
+            if job.future.cancelled():
+                self.finish(job, "Cancelled")
+            elif job.future.exception() is not None:
+                self.finish(job, f"Failed: {job.future.exception()}")
+            else:
+                self.finish(job, "Cancelled" if job.future.result() else "Done")
+
+        self.update_summary()
+        if all(job.finished for job in self.jobs.values()):
+            self.timer.stop()
+
+    def finish(self, job, status):
+        job.status = status
+        job.finished = time.monotonic()
+        self.update_row(job)
+        self.table.removeCellWidget(job.row, 4)
+        self.file_finished.emit(job.path, status)
+
+    def update_row(self, job):
+        self.table.setItem(job.row, 1, QTableWidgetItem(job.status))
+        self.table.item(job.row, 1).setToolTip(job.status)
+        pages = f"{job.pages_done}/{job.pages_total}" if job.pages_total else ""
+        self.table.setItem(job.row, 2, QTableWidgetItem(pages))
+        if job.resumed_from:
+            self.table.item(job.row, 2).setToolTip(f"Resumed at page {job.resumed_from + 1}")
+        rate = ""
+        if job.started and self.pages_this_run(job):
+            elapsed = (job.finished or time.monotonic()) - job.started
+            rate = f"{self.pages_this_run(job) / elapsed:.1f}" if elapsed > 0 else ""
+        self.table.setItem(job.row, 3, QTableWidgetItem(rate))
+
+    def pages_this_run(self, job):
+        return job.pages_done - (job.resumed_from or 0)
+
+    def update_summary(self):
+        finished = sum(1 for job in self.jobs.values() if job.finished)
+        running = sum(1 for job in self.jobs.values() if job.status in ("Processing", "Cancelling"))
+        pages = sum(self.pages_this_run(job) for job in self.jobs.values())
+        text = f"{finished} of {len(self.jobs)} files finished, {running} running on {self.max_workers} workers"
+        if self.first_start and pages:
+            text += f" · {pages / max(time.monotonic() - self.first_start, 0.001):.1f} pages/s"
+        self.summary_label.setText(text)
+
+    def clear_finished(self):
+        for job_id, job in list(self.jobs.items()):
+            if job.finished:
+                del self.jobs[job_id]
+        # Rows are rebuilt so each job's row index stays valid
+        self.table.setRowCount(0)
+        remaining = list(self.jobs.values())
+        for job in remaining:
+            self.add_row(job)
+        if not remaining:
+            self.first_start = None
+        self.update_summary()
+
+    def shutdown(self):
+        """Stop running files and discard queued ones"""
+        self.timer.stop()
+        for job in self.jobs.values():
+            if not job.finished:
+                job.future.cancel()
+                job.cancel_event.set()
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.manager.shutdown()
+            self.executor = None
@@ -0,0 +1,63 @@
+"""
+Load-test a running backend to compare serve configurations.
+
+    python loadtest.py --url http://127.0.0.1:5000 --concurrency 50 --duration 30
+"""
+import time
+import argparse
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PATHS = ['/api/individuals', '/api/pay-statements']
+
+def client(base_url, paths, deadline):
+    """Request paths round-robin until deadline; returns (latencies, errors)"""
+    latencies = []
+    errors = 0
+    i = 0
+    while time.perf_counter() < deadline:
+        url = base_url + paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors += 1
+    return latencies, errors
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the paystub API")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15, help="Seconds to run")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="Endpoint to hit; repeat for several (default: the list endpoints)")
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    deadline = time.perf_counter() + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda _: client(args.url, paths, deadline), range(args.concurrency)))
+
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+    if not latencies:
+        print(f"No successful requests ({errors} errors)")
+        return
+
+    print(f"{len(latencies)} requests, {errors} errors in {args.duration:.0f}s "
+          f"with {args.concurrency} clients: {len(latencies) / args.duration:.1f} req/s")
+    print(f"latency ms  mean {statistics.mean(latencies) * 1000:.1f}  "
+          f"p50 {percentile(latencies, 0.50) * 1000:.1f}  "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f}  "
+          f"max {latencies[-1] * 1000:.1f}")
+
+if __name__ == '__main__':
+    main()
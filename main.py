@@ -1,22 +1,69 @@
+import time
+START_TIME = time.perf_counter()
+
+import os
+import re
 import sys
+import subprocess
 from PyQt5.QtWidgets import QApplication
 from gui_components import PDFSplitterApp, ThemeAwareWidget
 
+PROFILE_FLAG = '--startup-profile'
+PROBE_FLAG = '--startup-probe'
+
 class SecureRestorableStateApp(QApplication):
     def __init__(self, argv):
         super().__init__(argv)
-    
+
     def event(self, event):
         if event.type() == 215:  # NSApplicationDelegate.applicationSupportsSecureRestorableState:
             return True
         return super().event(event)
 
-if __name__ == '__main__':
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def report_startup_profile(top=15):
+    """Start the app under -X importtime and report import costs and time to first paint"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__), PROBE_FLAG],
+                            capture_output=True, text=True)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        # Only modules imported directly by a top-level import; nested ones are in their cumulative time
+        if match and len(match.group(3)) == 1:
+            imports.append((int(match.group(2)), match.group(4)))
+    imports.sort(reverse=True)
+
+    print(f"Top-level imports: {sum(cumulative for cumulative, _ in imports) / 1000:.1f} ms")
+    for cumulative, module in imports[:top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+    print(result.stdout.strip())
+
+def main():
+    if PROFILE_FLAG in sys.argv:
+        report_startup_profile()
+        return
+
     app = SecureRestorableStateApp(sys.argv)
-    
+
     # Load saved theme preferences before creating widgets
     ThemeAwareWidget.load_saved_theme()
-    
+
     ex = PDFSplitterApp()
+    if PROBE_FLAG in sys.argv:
+        def report_first_paint():
+            print(f"Time to first paint: {(time.perf_counter() - START_TIME) * 1000:.1f} ms")
+
+        def report_ready():
+            print(f"Time to database ready: {(time.perf_counter() - START_TIME) * 1000:.1f} ms")
+            app.quit()
+
+        ex.first_painted.connect(report_first_paint)
+        ex.startup_complete.connect(report_ready)
+
     ex.show()  # Explicitly show the main window
     sys.exit(app.exec_())
+
+if __name__ == '__main__':
+    main()
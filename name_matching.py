@@ -0,0 +1,44 @@
+"""
+Normalized keys and trigrams for matching individuals' names.
+
+Extracted names vary in case, spacing and punctuation ("Sang Yun Kim",
+"SANG YUN KIM ", "Sang-Yun Kim"). All of those share one name key, so ingest
+files them under the same individual. Word order is kept, because "Lee Kim"
+and "Kim Lee" can be different people. Names that are close but not equal
+("SangYun Kim", "Sang Yoon Kim") share a phonetic key, which is cheap to look
+up during ingest, and most of their trigrams, which rank merge candidates;
+reordered names only share trigrams and are left for a person to merge.
+"""
+import re
+import unicodedata
+
+# Stored in PRAGMA user_version; bump whenever normalize_name changes so
+# create_database re-keys existing individuals
+NAME_KEY_VERSION = 2
+
+NON_WORD = re.compile(r"[^\w\s'-]+")
+SILENT_LETTERS = re.compile(r'[aeiouyhw]')
+REPEATS = re.compile(r'(.)\1+')
+
+def normalize_name(name):
+    """Case-fold a name and strip its accents and punctuation, keeping the word order"""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).casefold()
+    words = NON_WORD.sub(' ', name).replace('-', ' ').replace("'", '').split()
+    return ' '.join(words)
+
+def phonetic_key(name_key):
+    """Consonant skeleton of a name key: spaces, vowels and repeated letters dropped after the first letter"""
+    compact = name_key.replace(' ', '')
+    return compact[:1] + REPEATS.sub(r'\1', SILENT_LETTERS.sub('', compact[1:]))
+
+def name_trigrams(name_key):
+    """The set of three-character runs of a name key, padded so short names still have some"""
+    compact = f"$${name_key.replace(' ', '')}$"
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,111 @@
+"""
+Streaming export of pay statement PDFs as a ZIP archive or a single merged PDF.
+
+Both exporters are generators of byte chunks, so the result can be sent to
+an HTTP client or written to a file as it is produced. The ZIP is never
+staged; the merged PDF can only be serialized once every page is added, so
+its bytes go through a temporary file that spills to disk when large.
+"""
+import os
+import zipfile
+import tempfile
+from PyPDF2 import PdfReader, PdfWriter
+
+CHUNK_SIZE = 64 * 1024
+# Merged PDFs larger than this are spooled to disk rather than memory
+SPOOL_SIZE = 8 * 1024 * 1024
+
+EXPORT_FORMATS = {
+    'zip': ('application/zip', 'zip'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+
+class ChunkBuffer:
+    """Write-only file object that hands its contents back in chunks.
+
+    It has no seek(), so zipfile writes streaming entries with data
+    descriptors instead of rewinding to patch local headers.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        for start in range(0, len(data), CHUNK_SIZE):
+            yield data[start:start + CHUNK_SIZE]
+
+def stream_zip(paths, progress_callback=None):
+    """Yield a ZIP archive of paths chunk by chunk.
+
+    PDFs are already compressed, so entries are stored rather than deflated.
+    progress_callback(done, total) is called after each file.
+    """
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as archive:
+        for index, path in enumerate(paths):
+            with open(path, 'rb') as source, archive.open(os.path.basename(path), 'w') as entry:
+                while True:
+                    data = source.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    entry.write(data)
+                    yield from buffer.drain()
+            yield from buffer.drain()
+            if progress_callback:
+                progress_callback(index + 1, len(paths))
+    yield from buffer.drain()
+
+def stream_merged_pdf(paths, progress_callback=None):
+    """Yield one PDF containing every page of paths, in order, chunk by chunk.
+
+    progress_callback(done, total) is called after each file is appended.
+    """
+    writer = PdfWriter()
+    for index, path in enumerate(paths):
+        for page in PdfReader(path).pages:
+            writer.add_page(page)
+        if progress_callback:
+            progress_callback(index + 1, len(paths))
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        writer.write(spool)
+        # Lets the pages and their readers be freed while the bytes stream out
+        writer = None
+        spool.seek(0)
+        while True:
+            data = spool.read(CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+
+def stream_export(paths, export_format='zip', progress_callback=None):
+    if export_format == 'zip':
+        return stream_zip(paths, progress_callback)
+    if export_format == 'pdf':
+        return stream_merged_pdf(paths, progress_callback)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+def write_export(paths, target_path, export_format='zip', progress_callback=None, cancel_event=None):
+    """Write an export to target_path; returns False if cancel_event was set part way"""
+    with open(target_path, 'wb') as target:
+        for chunk in stream_export(paths, export_format, progress_callback):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            target.write(chunk)
+        else:
+            return True
+    os.remove(target_path)
+    return False
@@ -1,8 +1,67 @@
 import re
 import datetime
 import os
+import glob
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader, PdfWriter
-from database_manager import create_database, insert_into_database
+from database_manager import (create_database, update_statement_extraction, get_rebuild_progress,
+                              insert_rebuild_batch, finish_rebuild, commit_ingest_batch,
+                              clear_ingest_journal, get_files_by_page_hash, fsync_directory,
+                              start_ingest_checkpoint, finish_ingest_checkpoint, INGEST_TEMP_SUFFIX)
+from extraction_cache import (create_cache, file_hash, page_hash, get_cached_page, store_page,
+                              get_stale_page_hashes, load_pages, store_parsed)
+
+# Split pages are committed to the database, renamed into place and
+# checkpointed this many at a time
+INGEST_BATCH_SIZE = 50
+
+# Bump whenever extract_info, the field regions or the line item rules change,
+# so that cached pages get re-parsed by the reparse command
+PARSER_VERSION = 2
+
+# Bounding boxes (x0, y0, x1, y1) in PDF user space, origin at the bottom-left
+# of a US Letter page, for the fields of the standard paystub layout. The name
+# and company boxes take the first run that falls inside them; the amount box
+# is a band because the Net Pay row moves down as earnings lines are added.
+FIELD_REGIONS = {
+    'company': (30, 730, 320, 755),
+    'name': (60, 620, 320, 632),
+    'date': (150, 520, 600, 540),
+    'amount': (15, 200, 300, 480),
+}
+
+# A line item is a description followed by its figures: hours as H:MM and
+# money as 1,234.56. Runs sometimes glue several items together, so items are
+# found with finditer rather than by splitting on lines.
+LINE_ITEM_PATTERN = re.compile(
+    r'([A-Za-z][A-Za-z .\-/&()]*?)\s+((?:-?\d[\d,]*(?::\d{2}|\.\d{2})\s*)+)')
+# A multi-word label with no figures glued onto the next label, as in
+# "Federal Income TaxVacPay-Paid Out"; single words like "VacPay" are left alone.
+GLUED_LABEL_PATTERN = re.compile(r'^[^ ]* .*?[a-z](?=[A-Z])')
+
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%y', '%d-%m-%y', '%m/%d/%y', '%m-%d-%y', '%B %d, %Y', '%d %B %Y', '%Y-%m-%d')
+
+def parse_cents(value):
+    """Integer cents of a money string such as "1,234.56" or "-12.30", parsed without a float"""
+    dollars, cents = value.replace(',', '').split('.')
+    total = abs(int(dollars)) * 100 + int(cents)
+    return -total if dollars.startswith('-') else total
+
+def format_cents(cents):
+    if cents is None:
+        return "None"
+    return f"{'-' if cents < 0 else ''}${abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+def parse_date(date_str):
+    """Return date_str in YYYY-MM-DD form, or None if no known format matches"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
 
 def extract_info(text):
     print("Full extracted text:")
@@ -23,21 +82,12 @@ def extract_info(text):
         date_str = date_match.group(1).strip()
         print(f"Extracted date string: '{date_str}'")
         
-        try:
-            for fmt in ('%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%m-%d-%Y', '%d/%m/%y', '%d-%m-%y', '%m/%d/%y', '%m-%d-%y', '%B %d, %Y', '%d %B %Y', '%Y-%m-%d'):
-                try:
-                    date_obj = datetime.datetime.strptime(date_str, fmt)
-                    date = date_obj.strftime('%Y-%m-%d')  # Standardize date format
-                    print(f"Parsed date: {date}")
-                    break
-                except ValueError:
-                    continue
-            else:
-                date = "Unknown_Date"
-                print(f"Could not parse date, using: {date}")
-        except Exception as e:
+        date = parse_date(date_str)
+        if date:
+            print(f"Parsed date: {date}")
+        else:
             date = "Unknown_Date"
-            print(f"Error parsing date: {e}")
+            print(f"Could not parse date, using: {date}")
     else:
         date = "Unknown_Date"
         print("No date found in the text")
@@ -45,9 +95,8 @@ def extract_info(text):
     # Extract amount
     amount_match = re.search(r'Net Pay:?\s*\$?([\d,]+\.\d{2})', text, re.IGNORECASE)
     if amount_match:
-        amount_str = amount_match.group(1).replace(',', '')
-        amount = float(amount_str)
-        print(f"Extracted amount: ${amount}")
+        amount = parse_cents(amount_match.group(1))
+        print(f"Extracted amount: {format_cents(amount)}")
     else:
         amount = None
         print("No amount found in the text")
@@ -61,36 +110,366 @@ def extract_info(text):
         company = "Unknown Company"
         print("No company found in the text")
     
-    print(f"Final result - Name: {name}, Date: {date}, Amount: ${amount}, Company: {company}")
+    print(f"Final result - Name: {name}, Date: {date}, Amount: {format_cents(amount)}, Company: {company}")
     return name, date, amount, company
 
-def split_pdf(input_path, output_folder):
+def extract_text_runs(page):
+    """Return the page's flat text and its text runs as (x, y, text) tuples.
+
+    Positions come from PyPDF2's visitor callback and are mapped into PDF user
+    space, so they can be compared against FIELD_REGIONS.
+    """
+    runs = []
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if not text.strip():
+            return
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        runs.append((x, y, text.strip()))
+
+    text = page.extract_text(visitor_text=visitor)
+    return text, runs
+
+def extract_regions(runs, regions=FIELD_REGIONS):
+    """Collect the runs whose origin falls inside each region, in content order.
+
+    This filters runs from the full-page extraction; it does not make
+    extraction any cheaper.
+    """
+    fields = {field: [] for field in regions}
+    for x, y, text in runs:
+        for field, (x0, y0, x1, y1) in regions.items():
+            if x0 <= x <= x1 and y0 <= y <= y1:
+                fields[field].append(text)
+    return fields
+
+def extract_info_from_regions(fields):
+    """Build the (name, date, amount, company) tuple from region text.
+
+    Each region holds only its own field, so the patterns here are anchored to
+    the field itself rather than guessing at boundaries in the full page text.
+    """
+    name = fields['name'][0] if fields.get('name') else "Unknown"
+    company = fields['company'][0] if fields.get('company') else "Unknown Company"
+
+    date = None
+    date_match = re.search(r'Cheque Date:?\s*(\S+)', " ".join(fields.get('date', [])), re.IGNORECASE)
+    if date_match:
+        date = parse_date(date_match.group(1))
+    date = date or "Unknown_Date"
+
+    amount_match = re.search(r'Net Pay:?\s*\$?([\d,]+\.\d{2})', " ".join(fields.get('amount', [])), re.IGNORECASE)
+    amount = parse_cents(amount_match.group(1)) if amount_match else None
+
+    print(f"Region result - Name: {name}, Date: {date}, Amount: {format_cents(amount)}, Company: {company}")
+    return name, date, amount, company
+
+def extract_page_info(text, runs, mode="text"):
+    """Extract (name, date, amount in cents, company) from a page's text and runs.
+
+    mode="text" runs extract_info over the flattened page text. mode="regions"
+    picks the fields out of the runs that fall in FIELD_REGIONS and only falls
+    back to the text patterns when the page does not match the configured
+    layout. Both modes work from the same whole-page extraction, which the
+    line items need anyway, so the modes differ in accuracy, not speed.
+    """
+    if mode == "regions":
+        info = extract_info_from_regions(extract_regions(runs))
+        if info[0] != "Unknown" and info[1] != "Unknown_Date":
+            return info
+        print("Page does not match the configured field regions, falling back to text extraction")
+    return extract_info(text)
+
+def extract_line_items(runs):
+    """Parse every earnings, deduction and net pay line from the page's runs.
+
+    Returns a list of dicts with section, description, quantity, rate_cents,
+    current_cents and ytd_cents. Withholdings are printed as negative figures, which is what sorts
+    a line into "deductions". YTD always includes the current figure, so a
+    line carrying a single amount only has a YTD value.
+    """
+    items = []
+    for match in LINE_ITEM_PATTERN.finditer("\n".join(text for _, _, text in runs)):
+        description = GLUED_LABEL_PATTERN.sub('', match.group(1).strip())
+        figures = match.group(2).split()
+
+        quantity = None
+        if ':' in figures[0]:
+            quantity = figures.pop(0)
+        if not figures:
+            continue
+        amounts = [parse_cents(figure) for figure in figures]
+
+        rate = current = None
+        if len(amounts) >= 3:
+            rate, current, ytd = amounts[-3:]
+        elif len(amounts) == 2:
+            current, ytd = amounts
+        else:
+            ytd = amounts[0]
+
+        if description.lower() == "net pay":
+            section = "net_pay"
+        elif ytd < 0:
+            section = "deductions"
+        else:
+            section = "earnings"
+
+        items.append({
+            'section': section,
+            'description': description,
+            'quantity': quantity,
+            'rate_cents': rate,
+            'current_cents': current,
+            'ytd_cents': ytd,
+        })
+    return items
+
+def parse_page(text, runs, mode="text"):
+    """Run every parser over a page's text and runs and return the results as a dict"""
+    name, date, amount, company = extract_page_info(text, runs, mode)
+    return {
+        'name': name,
+        'date': date,
+        'amount_cents': amount,
+        'company': company,
+        'line_items': extract_line_items(runs),
+    }
+
+def extract_page(page, cache_path, mode="text", key=None):
+    """Return (page_hash, parsed) for a page, reusing the extraction cache.
+
+    Pages already parsed by this PARSER_VERSION in the same mode skip both text
+    extraction and parsing; pages cached by an older parser are re-parsed from
+    the cached text without re-reading the PDF content. key is the page's
+    hash if the caller already has it.
+    """
+    key = key or page_hash(page)
+    cached = get_cached_page(cache_path, key)
+    if cached:
+        text, runs, parsed, parser_version, cached_mode = cached
+        if parsed and parser_version == PARSER_VERSION and cached_mode == mode:
+            print(f"Using cached extraction for page {key[:12]}")
+            return key, parsed
+    else:
+        text, runs = extract_text_runs(page)
+    
+    parsed = parse_page(text, runs, mode)
+    store_page(cache_path, key, text, runs, parsed, PARSER_VERSION, mode)
+    return key, parsed
+
+def _reparse_page(entry):
+    page_hash, text, runs, mode = entry
+    return page_hash, parse_page(text, runs, mode or "text")
+
+def reparse_cache(output_folder, workers=None, batch_size=500):
+    """Re-run the parsers over every cached page left by an older PARSER_VERSION.
+
+    Works purely from the cached text, in parallel, and refreshes the
+    statements cut from those pages. Returns (reparsed, updated, identity_changed).
+    """
+    cache_path = create_cache(output_folder)
+    db_path = create_database(output_folder)
+    stale = get_stale_page_hashes(cache_path, PARSER_VERSION)
+    print(f"Re-parsing {len(stale)} cached pages with parser version {PARSER_VERSION}")
+    
+    updated = identity_changed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(stale), batch_size):
+            pages = load_pages(cache_path, stale[start:start + batch_size])
+            results = list(executor.map(_reparse_page, pages, chunksize=16))
+            store_parsed(cache_path, results, PARSER_VERSION)
+            batch_updated, batch_changed = update_statement_extraction(db_path, results)
+            updated += batch_updated
+            identity_changed += batch_changed
+            print(f"Re-parsed {min(start + batch_size, len(stale))}/{len(stale)} pages")
+    
+    if identity_changed:
+        print(f"{identity_changed} statements now parse to a different name or date; re-ingest them to move them")
+    return len(stale), updated, identity_changed
+
+def _rebuild_extract(entry):
+    pdf_path, cache_path, mode = entry
+    page = PdfReader(pdf_path).pages[0]
+    key = page_hash(page)
+    cached = get_cached_page(cache_path, key)
+    if cached:
+        text, runs, parsed, parser_version, cached_mode = cached
+        if parsed and parser_version == PARSER_VERSION and cached_mode == mode:
+            return os.path.basename(pdf_path), key, parsed, None
+    else:
+        text, runs = extract_text_runs(page)
+    # New extractions are handed back so the parent process, the only cache writer, can store them
+    return os.path.basename(pdf_path), key, parse_page(text, runs, mode), (text, runs)
+
+def rebuild_database(split_folder, workers=None, extraction_mode="text", resume=True, batch_size=200):
+    """Rebuild pdf_data.db from the single-page PDFs in split_folder.
+
+    Files are read in a process pool, using the extraction cache where
+    possible, and bulk-loaded into pdf_data.rebuild.db, which replaces
+    pdf_data.db once every file is in. The rebuild database records which
+    files it holds, so an interrupted run resumes where it left off.
+    Returns the number of statements loaded.
+    """
+    cache_path = create_cache(split_folder)
+    rebuild_path = os.path.join(split_folder, 'pdf_data.rebuild.db')
+    if not resume and os.path.exists(rebuild_path):
+        os.remove(rebuild_path)
+    create_database(split_folder, 'pdf_data.rebuild.db')
+    
+    done = get_rebuild_progress(rebuild_path)
+    pending = [path for path in sorted(glob.glob(os.path.join(split_folder, '*.pdf')))
+               if os.path.basename(path) not in done]
+    total = len(done) + len(pending)
+    print(f"Rebuilding from {total} files ({len(done)} already loaded, {len(pending)} to go)")
+    
+    start = time.perf_counter()
+    processed = inserted = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        entries = [(path, cache_path, extraction_mode) for path in pending]
+        batch = []
+        for filename, key, parsed, extracted in executor.map(_rebuild_extract, entries, chunksize=8):
+            if extracted:
+                store_page(cache_path, key, extracted[0], extracted[1], parsed, PARSER_VERSION, extraction_mode)
+            batch.append(dict(parsed, filename=filename, page_hash=key))
+            
+            if len(batch) >= batch_size:
+                inserted += insert_rebuild_batch(rebuild_path, batch)
+                processed += len(batch)
+                batch = []
+                elapsed = time.perf_counter() - start
+                print(f"Loaded {len(done) + processed}/{total} files ({processed / elapsed:.1f} files/s)")
+        
+        if batch:
+            inserted += insert_rebuild_batch(rebuild_path, batch)
+            processed += len(batch)
+    
+    elapsed = time.perf_counter() - start
+    finish_rebuild(rebuild_path)
+    
+    db_path = os.path.join(split_folder, 'pdf_data.db')
+    if os.path.exists(db_path):
+        os.replace(db_path, db_path + '.bak')
+        print(f"Previous database kept as {db_path}.bak")
+    os.replace(rebuild_path, db_path)
+    
+    rate = processed / elapsed if elapsed else 0
+    print(f"Rebuild complete: {inserted} statements from {processed} files in {elapsed:.1f}s ({rate:.1f} files/s)")
+    return inserted
+
+def write_temp_page(page, output_folder, filename):
+    """Write a single-page PDF next to its final name and fsync it; returns the temp file name.
+
+    The name is unique per page, so pages that resolve to the same filename
+    never share a temp file.
+    """
+    writer = PdfWriter()
+    writer.add_page(page)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{filename}.{os.getpid()}.", suffix=INGEST_TEMP_SUFFIX,
+                                     dir=output_folder)
+    with os.fdopen(fd, "wb") as output_file:
+        writer.write(output_file)
+        output_file.flush()
+        os.fsync(output_file.fileno())
+    return os.path.basename(temp_path)
+
+def commit_pages(db_path, output_folder, batch, checkpoint=None):
+    """Second phase of an ingest: commit rows, journal and checkpoint together, then rename the files into place"""
+    if not batch and checkpoint is None:
+        return
+    # Pages of one batch with the same filename would be renamed onto each
+    # other; only the last is kept, as a later batch would replace it too
+    last = {record[3]: record for record in batch}
+    for record in batch:
+        if last[record[3]] is not record:
+            os.remove(os.path.join(output_folder, record[0]))
+            print(f"Replaced by a later page in this file: {record[3]}")
+    batch = list(last.values())
+    journal_ids = commit_ingest_batch(db_path, batch, checkpoint)
+    if not batch:
+        return
+    for temp_file, name, date, filename, *_ in batch:
+        os.replace(os.path.join(output_folder, temp_file), os.path.join(output_folder, filename))
+        print(f"Created/Updated: {filename}")
+    fsync_directory(output_folder)
+    clear_ingest_journal(db_path, journal_ids)
+
+def split_pdf(input_path, output_folder, extraction_mode="text", progress_callback=None, cancel_event=None,
+              batch_size=INGEST_BATCH_SIZE, input_hash=None):
+    """Split input_path into one PDF and database row per page.
+
+    Each page is written to an fsync'd temp file; every batch_size pages the
+    rows are committed together with a journal of the pending files and the
+    file's checkpoint, and the files are then renamed into place. A rerun of
+    an unfinished file, found by its hash, resumes at the checkpointed page;
+    pages that already have a statement and a file are skipped.
+
+    progress_callback(done, total) is called once with the resume point and
+    then after each page. Setting cancel_event stops before the next page;
+    pages already split are kept. Returns the path of the database.
+    """
     reader = PdfReader(input_path)
     
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
     db_path = create_database(output_folder)
+    cache_path = create_cache(output_folder)
     
-    for i, page in enumerate(reader.pages):
-        writer = PdfWriter()
-        writer.add_page(page)
-        
-        text = page.extract_text()
-        name, date, amount, company = extract_info(text)
-        
-        filename = f"{name} {date}.pdf"
-        filepath = os.path.join(output_folder, filename)
-        
-        # Always write the file, overwriting if it exists
-        with open(filepath, "wb") as output_file:
-            writer.write(output_file)
-        print(f"Created/Updated: {filename}")
+    total = len(reader.pages)
+    input_hash = input_hash or file_hash(input_path)
+    start = start_ingest_checkpoint(db_path, input_hash, os.path.abspath(input_path), total)
+    if start:
+        print(f"Resuming {os.path.basename(input_path)} at page {start + 1} of {total}")
+    if progress_callback:
+        progress_callback(start, total)
+    
+    keys = {i: page_hash(reader.pages[i]) for i in range(start, total)}
+    existing = get_files_by_page_hash(db_path, keys.values())
+    
+    batch = []
+    next_page = checkpointed = start
+    status = 'done'
+    try:
+        for i in range(start, total):
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"Cancelled {os.path.basename(input_path)} after {i} of {total} pages")
+                status = 'cancelled'
+                break
+            
+            page = reader.pages[i]
+            key = keys[i]
+            if key in existing and os.path.exists(os.path.join(output_folder, existing[key])):
+                print(f"Already split: {existing[key]}")
+            else:
+                key, parsed = extract_page(page, cache_path, extraction_mode, key)
+                filename = f"{parsed['name']} {parsed['date']}.pdf"
+                temp_file = write_temp_page(page, output_folder, filename)
+                batch.append((temp_file, parsed['name'], parsed['date'], filename, parsed['amount_cents'],
+                              parsed['company'], parsed['line_items'], key))
+            next_page = i + 1
+            
+            if next_page - checkpointed >= batch_size:
+                pending, batch = batch, []
+                commit_pages(db_path, output_folder, pending, (input_hash, next_page))
+                checkpointed = next_page
+            
+            if progress_callback:
+                progress_callback(next_page, total)
         
-        inserted = insert_into_database(db_path, name, date, filename, amount, company)
-        if inserted:
-            print(f"Added to database: {filename}")
-        else:
-            print(f"Skipped adding to database (duplicate): {filename}")
+        pending, batch = batch, []
+        commit_pages(db_path, output_folder, pending, (input_hash, next_page))
+    except BaseException as e:
+        # Pages not yet handed to commit_pages are discarded; their rows never
+        # existed. A batch that failed inside commit_pages is settled by recover_ingest
+        for temp_file, *_ in batch:
+            try:
+                os.remove(os.path.join(output_folder, temp_file))
+            except FileNotFoundError:
+                pass
+        finish_ingest_checkpoint(db_path, input_hash, 'failed', str(e) or type(e).__name__)
+        raise
     
+    finish_ingest_checkpoint(db_path, input_hash, status)
     return db_path
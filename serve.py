@@ -0,0 +1,56 @@
+"""
+Production runner for backend.app under gunicorn's preforking server
+"""
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+
+def default_workers():
+    return multiprocessing.cpu_count() * 2 + 1
+
+def warm_worker(server, worker):
+    """Check the schema and prime the hot queries before the worker takes requests"""
+    import api_service
+    api_service.warm_up()
+    server.log.info(f"Worker {worker.pid} warmed up")
+
+class PaystubServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from backend import app
+        return app
+
+def run(bind="127.0.0.1:5000", workers=None, threads=4, timeout=300, graceful_timeout=30,
+        keepalive=5, max_requests=1000):
+    """Serve backend.app with preforked workers.
+
+    The app is loaded once in the master before forking, so its modules and
+    any read-only state are shared copy-on-write by every worker. timeout is
+    generous because /api/process-pdf splits whole documents in-request;
+    graceful_timeout lets in-flight ingests finish on shutdown. Workers are
+    recycled after max_requests (with jitter) to bound memory growth. Each
+    /api/events client holds a thread, so one thread per worker is kept
+    free of them.
+    """
+    import api_service
+    api_service.MAX_EVENT_STREAMS = threads - 1
+    options = {
+        'bind': bind,
+        'workers': workers or default_workers(),
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'keepalive': keepalive,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'preload_app': True,
+        'post_fork': warm_worker,
+    }
+    PaystubServer(options).run()
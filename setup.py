@@ -3,12 +3,20 @@ Setup script for building macOS app using py2app
 """
 from setuptools import setup
 import glob
+from bundle_graph import bundle_modules
 
 APP = ['main.py']
 DATA_FILES = [('Split', glob.glob('Split/*'))]
+
+# Bundle only what the import graph from main.py reaches; run
+# `python bundle_graph.py` to see it and bundle_report.py to measure the result
+INCLUDES, EXCLUDES = bundle_modules(APP[0])
+
 OPTIONS = {
     'argv_emulation': True,
-    'packages': ['PyQt6'],
+    'includes': INCLUDES,
+    'excludes': EXCLUDES,
+    'optimize': 1,
     'plist': {
         'CFBundleName': 'Paystub',
         'CFBundleDisplayName': 'Paystub',
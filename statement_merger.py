@@ -0,0 +1,132 @@
+"""
+Merge an individual's split pay statements into one PDF per date range.
+
+Merged files are written to a Merged folder next to the split PDFs and
+named after a key of their inputs' paths, sizes and modification times, so a request whose statements have not
+changed is served from the existing file.
+"""
+import os
+import glob
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NullObject, StreamObject
+from database_manager import find_pay_statements, get_individuals
+
+MERGED_FOLDER = 'Merged'
+
+def inputs_key(paths):
+    """Hash the ordered inputs' paths, sizes and mtimes, so any added, removed or rewritten stub gives a new key.
+
+    Stat signatures keep a cached request from reading every input PDF.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+def share_duplicate_streams(writer):
+    """Point every reference to an identical stream at a single copy.
+
+    Split PDFs cut from one payroll run each carry their own copy of the
+    same fonts and images; PdfWriter clones them per page, so without this
+    a merged file holds one copy per statement.
+    """
+    canonical = {}
+    replacements = {}
+    for index, obj in enumerate(writer._objects):
+        if isinstance(obj, StreamObject):
+            key = obj.hash_value()
+            if key in canonical:
+                replacements[index + 1] = canonical[key]
+            else:
+                canonical[key] = index + 1
+    if not replacements:
+        return 0
+
+    def relink(container):
+        items = container.items() if isinstance(container, DictionaryObject) else enumerate(container)
+        for key, value in list(items):
+            if isinstance(value, IndirectObject) and value.idnum in replacements:
+                container[key] = IndirectObject(replacements[value.idnum], 0, writer)
+            elif isinstance(value, (DictionaryObject, ArrayObject)):
+                relink(value)
+
+    for obj in writer._objects:
+        if isinstance(obj, (DictionaryObject, ArrayObject)):
+            relink(obj)
+    # Object numbers must stay dense, so duplicates become empty placeholders
+    for idnum in replacements:
+        writer._objects[idnum - 1] = NullObject()
+    return len(replacements)
+
+def merge_pdfs(paths, target_path):
+    """Write every page of paths, in order, to target_path in one pass"""
+    writer = PdfWriter()
+    for path in paths:
+        for page in PdfReader(path).pages:
+            writer.add_page(page)
+    share_duplicate_streams(writer)
+
+    # A temp file of its own, so concurrent merges of one target never share it
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(target_path), prefix=f".{os.path.basename(target_path)}.",
+                                     suffix='.tmp', delete=False) as f:
+        temp_path = f.name
+        try:
+            writer.write(f)
+        except BaseException:
+            f.close()
+            os.remove(temp_path)
+            raise
+    os.replace(temp_path, target_path)
+
+def merge_individual(db_path, pdf_folder, individual_id, start_date=None, end_date=None):
+    """Merge one individual's statements between start_date and end_date.
+
+    Returns a summary dict with the merged path, or None for the path when
+    the individual has no statements in the range.
+    """
+    statements = find_pay_statements(db_path, individual_id=individual_id,
+                                     start_date=start_date, end_date=end_date)
+    paths = [os.path.join(pdf_folder, row[1]) for row in statements]
+    paths = [path for path in paths if os.path.exists(path)]
+    summary = {'individual_id': individual_id, 'name': statements[0][2] if statements else None,
+               'statements': len(paths), 'path': None, 'cached': False}
+    if not paths:
+        return summary
+
+    merged_folder = os.path.join(pdf_folder, MERGED_FOLDER)
+    os.makedirs(merged_folder, exist_ok=True)
+    prefix = f"{summary['name']} {start_date or 'start'} to {end_date or 'end'}"
+    target_path = os.path.join(merged_folder, f"{prefix} {inputs_key(paths)}.pdf")
+    summary['path'] = target_path
+
+    if os.path.exists(target_path):
+        summary['cached'] = True
+        return summary
+
+    merge_pdfs(paths, target_path)
+    # Drop merges of the same range built from an older set of statements
+    for old_path in glob.glob(os.path.join(merged_folder, f"{glob.escape(prefix)} *.pdf")):
+        if old_path != target_path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                # Removed by a concurrent merge of the same range
+                pass
+    print(f"Merged {len(paths)} statements for {summary['name']} into {os.path.basename(target_path)}")
+    return summary
+
+def _merge_individual(job):
+    return merge_individual(*job)
+
+def merge_all(db_path, pdf_folder, start_date=None, end_date=None, workers=None):
+    """Merge the statements of every individual in parallel; returns one summary per individual"""
+    jobs = [(db_path, pdf_folder, individual[0], start_date, end_date) for individual in get_individuals(db_path)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [summary for summary in executor.map(_merge_individual, jobs) if summary['path']]
+
+def year_range(year):
+    return f"{year}-01-01", f"{year}-12-31"
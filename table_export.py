@@ -0,0 +1,157 @@
+"""
+Export database tables to CSV, Parquet or XLSX straight from SQLite.
+
+Rows are fetched in fixed-size batches and written as they arrive, so
+memory use does not grow with the size of the table. Parquet needs
+pyarrow and XLSX needs openpyxl; CSV has no extra dependencies.
+"""
+import io
+import csv
+import sqlite3
+from database_manager import statement_filter
+
+BATCH_SIZE = 10000
+
+# table: (query, takes statement filters, tables declaring the columns, first match wins)
+EXPORT_TABLES = {
+    'individuals': ("""
+        SELECT id, name, address, phone_number, email FROM individuals
+        ORDER BY id
+    """, False, ('individuals',)),
+    'pay_statements': ("""
+        SELECT ps.id, i.name, ps.date, ps.amount_cents, ps.company, ps.filename, ps.extraction_date
+        FROM pay_statements ps
+        JOIN individuals i ON ps.individual_id = i.id
+        {where}
+        ORDER BY ps.date, i.name
+    """, True, ('pay_statements', 'individuals')),
+    'pay_statement_lines': ("""
+        SELECT l.pay_statement_id, i.name, ps.date, l.section, l.description,
+               l.quantity, l.rate_cents, l.current_cents, l.ytd_cents
+        FROM pay_statement_lines l
+        JOIN pay_statements ps ON l.pay_statement_id = ps.id
+        JOIN individuals i ON ps.individual_id = i.id
+        {where}
+        ORDER BY ps.date, i.name, l.id
+    """, True, ('pay_statement_lines', 'pay_statements', 'individuals')),
+}
+
+TABLE_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def query_batches(db_path, table, individual_id=None, year=None, company=None, batch_size=BATCH_SIZE):
+    """Return (columns, batches) where batches yields lists of up to batch_size rows"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"table must be one of {', '.join(EXPORT_TABLES)}")
+    query, filterable, _ = EXPORT_TABLES[table]
+    where, params = statement_filter(individual_id=individual_id, year=year, company=company) if filterable else ('', [])
+
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute(query.format(where=f"WHERE {where}" if where else ""), params)
+    columns = [description[0] for description in c.description]
+
+    def batches():
+        try:
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    return columns, batches()
+
+def declared_types(db_path, table, columns):
+    """The declared SQLite type of each exported column, '' where none is declared"""
+    conn = sqlite3.connect(db_path)
+    types = {}
+    for source in reversed(EXPORT_TABLES[table][2]):
+        types.update((row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({source})"))
+    conn.close()
+    return [types.get(column, '') for column in columns]
+
+def arrow_type(pa, declared):
+    """pyarrow type for a declared SQLite type, following SQLite's affinity rules"""
+    declared = declared.upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('CHAR', 'CLOB', 'TEXT')):
+        return pa.string()
+    if 'BLOB' in declared:
+        return pa.binary()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    return pa.string()
+
+def stream_csv(columns, batches):
+    """Yield CSV text encoded as UTF-8, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def write_csv(columns, batches, target):
+    for chunk in stream_csv(columns, batches):
+        target.write(chunk)
+
+def write_parquet(columns, batches, target, types):
+    """Write each batch as its own row group.
+
+    The schema comes from the columns' declared types, so a column that is
+    all NULL in the first batch is not typed as null.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = pa.schema([(column, arrow_type(pa, declared)) for column, declared in zip(columns, types)])
+    with pq.ParquetWriter(target, schema) as writer:
+        for rows in batches:
+            writer.write_table(pa.Table.from_pydict(
+                {column: list(values) for column, values in zip(columns, zip(*rows))}, schema=schema))
+
+def write_xlsx(columns, batches, target):
+    """Write with openpyxl's write-only mode, which streams rows to disk as they are appended"""
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("XLSX export needs openpyxl: pip install openpyxl")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for rows in batches:
+        for row in rows:
+            sheet.append(row)
+    workbook.save(target)
+
+TABLE_WRITERS = {
+    'csv': write_csv,
+    'parquet': write_parquet,
+    'xlsx': write_xlsx,
+}
+
+def export_table(db_path, table, target, table_format='csv', **filters):
+    """Write a table export to target, a path or a binary file object"""
+    if table_format not in TABLE_WRITERS:
+        raise ValueError(f"format must be one of {', '.join(TABLE_WRITERS)}")
+    columns, batches = query_batches(db_path, table, **filters)
+    if table_format == 'csv' and isinstance(target, str):
+        with open(target, 'wb') as f:
+            write_csv(columns, batches, f)
+    elif table_format == 'parquet':
+        write_parquet(columns, batches, target, declared_types(db_path, table, columns))
+    else:
+        TABLE_WRITERS[table_format](columns, batches, target)
@@ -0,0 +1,69 @@
+import io
+import os
+import csv
+import glob
+import shutil
+import threading
+import zipfile
+import pytest
+import api_service
+import backend
+from pdf_processor import rebuild_database
+
+SPLIT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Split')
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    for pdf in sorted(glob.glob(os.path.join(SPLIT_FOLDER, '*.pdf')))[:3]:
+        shutil.copy(pdf, tmp_path)
+    rebuild_database(str(tmp_path), workers=1)
+    monkeypatch.setattr(api_service, 'OUTPUT_FOLDER', str(tmp_path))
+    monkeypatch.setattr(api_service, 'DB_PATH', os.path.join(str(tmp_path), 'pdf_data.db'))
+    # Drop the read connection a previous test left open on its own database
+    monkeypatch.setattr(api_service, '_local', threading.local())
+    return backend.app.test_client()
+
+def test_list_answers_304_until_the_data_changes(client):
+    response = client.get('/api/pay-statements')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    statements = response.get_json()
+    assert len(statements) == 3
+    assert all(statement['fileData'] for statement in statements)
+
+    assert client.get('/api/pay-statements', headers={'If-None-Match': etag}).status_code == 304
+
+    assert client.delete(f"/api/pay-statements/{statements[0]['id']}").status_code == 200
+    response = client.get('/api/pay-statements', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+def test_zip_export_is_streamed(client):
+    response = client.get('/api/export?format=zip', buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'Content-Length' not in response.headers
+    body = b''.join(response.response)
+    response.close()
+    assert len(zipfile.ZipFile(io.BytesIO(body)).namelist()) == 3
+
+def test_csv_table_export_is_streamed(client):
+    response = client.get('/api/export/table?table=pay_statements&format=csv', buffered=False)
+    assert response.status_code == 200
+    assert response.is_streamed
+    body = b''.join(response.response).decode('utf-8')
+    response.close()
+    assert len(list(csv.reader(io.StringIO(body)))) == 4
+
+def test_sync_returns_deletions_since_a_version(client):
+    first = client.get('/api/sync').get_json()
+    assert first['reset']
+    assert len(first['payStatements']['upserted']) == 3
+
+    deleted_id = first['payStatements']['upserted'][0]['id']
+    client.delete(f"/api/pay-statements/{deleted_id}")
+    delta = client.get(f"/api/sync?since={first['version']}").get_json()
+    assert not delta['reset']
+    assert delta['payStatements'] == {'upserted': [], 'deleted': [deleted_id]}
+    assert client.get('/api/sync?since=nonsense').status_code == 400
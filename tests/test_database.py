@@ -0,0 +1,88 @@
+import os
+import sqlite3
+from database_manager import (NAME_KEY_VERSION, create_database, insert_into_database, resolve_individual,
+                              get_changes, delete_pay_statements, table_columns)
+
+def connect(folder):
+    return sqlite3.connect(os.path.join(folder, 'pdf_data.db'))
+
+def test_dollar_amounts_migrate_to_cents(tmp_path):
+    # The schema written before amounts were stored as cents
+    conn = connect(tmp_path)
+    conn.executescript('''
+        CREATE TABLE individuals (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE,
+                                  address TEXT, phone_number TEXT, email TEXT);
+        CREATE TABLE pay_statements (id INTEGER PRIMARY KEY AUTOINCREMENT, individual_id INTEGER, date TEXT,
+                                     filename TEXT, extraction_date TEXT, amount REAL, company TEXT,
+                                     UNIQUE(individual_id, date));
+        CREATE TABLE pay_statement_lines (id INTEGER PRIMARY KEY AUTOINCREMENT, pay_statement_id INTEGER,
+                                          section TEXT, description TEXT, quantity TEXT, rate REAL,
+                                          current_amount REAL, ytd_amount REAL);
+        INSERT INTO individuals (name) VALUES ('Haekyung Shin');
+        INSERT INTO pay_statements (individual_id, date, filename, amount)
+            VALUES (1, '2024-01-05', 'a.pdf', 1234.56), (1, '2024-01-19', 'b.pdf', 0.1 + 0.2),
+                   (1, '2024-02-02', 'c.pdf', NULL);
+        INSERT INTO pay_statement_lines (pay_statement_id, section, description, rate, current_amount, ytd_amount)
+            VALUES (1, 'earnings', 'Regular', 17.3, 1384.0, 2768.01),
+                   (1, 'deductions', 'CPP', NULL, -71.35, -142.7);
+    ''')
+    conn.commit()
+    conn.close()
+
+    create_database(str(tmp_path))
+    # A second open finds nothing left to migrate
+    create_database(str(tmp_path))
+
+    conn = connect(tmp_path)
+    c = conn.cursor()
+    assert c.execute("SELECT amount_cents FROM pay_statements ORDER BY id").fetchall() == [(123456,), (30,), (None,)]
+    assert c.execute("SELECT rate_cents, current_cents, ytd_cents FROM pay_statement_lines ORDER BY id").fetchall() == \
+        [(1730, 138400, 276801), (None, -7135, -14270)]
+    if sqlite3.sqlite_version_info >= (3, 35):
+        assert 'amount' not in table_columns(c, 'pay_statements')
+        assert not {'rate', 'current_amount', 'ytd_amount'} & set(table_columns(c, 'pay_statement_lines'))
+    conn.close()
+
+def test_name_keys_from_an_older_version_are_rebuilt(tmp_path):
+    create_database(str(tmp_path))
+    conn = connect(tmp_path)
+    conn.execute("INSERT INTO individuals (name, name_key) VALUES ('Émile O''Brien-Smith', 'stale key')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    create_database(str(tmp_path))
+
+    conn = connect(tmp_path)
+    c = conn.cursor()
+    assert c.execute("PRAGMA user_version").fetchone()[0] == NAME_KEY_VERSION
+    assert c.execute("SELECT name_key FROM individuals").fetchall() == [('emile obrien smith',)]
+    # Case, accents and punctuation are ignored but word order is not
+    assert resolve_individual(c, 'EMILE OBRIEN SMITH') == 1
+    assert resolve_individual(c, 'Emile  OBrien-Smith.') == 1
+    assert resolve_individual(c, 'Smith Emile OBrien') != 1
+    conn.close()
+
+def test_change_log_returns_each_row_once_at_its_latest_change(tmp_path):
+    db_path = create_database(str(tmp_path))
+    insert_into_database(db_path, 'Haekyung Shin', '2024-01-05', 'a.pdf', 100000)
+    insert_into_database(db_path, 'Haekyung Shin', '2024-01-19', 'b.pdf', 100000)
+
+    conn = sqlite3.connect(db_path)
+    generation, seq, changes = get_changes(conn.cursor())
+    conn.close()
+    assert changes == {'pay_statements': [1, 2], 'individuals': [1]}
+
+    insert_into_database(db_path, 'Laura Kim', '2024-01-05', 'c.pdf', 90000)
+    delete_pay_statements(db_path, ids=[1])
+
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    same_generation, last_seq, changes = get_changes(c, seq)
+    assert same_generation == generation
+    assert last_seq > seq
+    assert sorted(changes['pay_statements']) == [1, 3]
+    assert sorted(changes['individuals']) == [1, 2]
+    # Nothing changed since the last sync
+    assert get_changes(c, last_seq)[1:] == (last_seq, {})
+    conn.close()
@@ -0,0 +1,138 @@
+import os
+import glob
+import sqlite3
+import pytest
+from PyPDF2 import PdfReader, PdfWriter
+import database_manager
+import pdf_processor
+from database_manager import INGEST_TEMP_SUFFIX, recover_ingest
+from pdf_processor import split_pdf
+
+SPLIT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Split')
+
+class Crash(Exception):
+    pass
+
+def make_pdf(path, stubs, blank_pages=0):
+    """Write a combined PDF of blank pages followed by the named Split stubs"""
+    writer = PdfWriter()
+    for _ in range(blank_pages):
+        writer.add_blank_page(612, 792)
+    for stub in stubs:
+        writer.add_page(PdfReader(os.path.join(SPLIT_FOLDER, stub)).pages[0])
+    writer.write(str(path))
+    return str(path)
+
+def query(folder, sql):
+    conn = sqlite3.connect(os.path.join(folder, 'pdf_data.db'))
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    return rows
+
+def temp_files(folder):
+    return glob.glob(os.path.join(folder, f".*{INGEST_TEMP_SUFFIX}"))
+
+@pytest.fixture
+def stubs():
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(SPLIT_FOLDER, '*.pdf')))[:4]
+
+def test_pages_with_the_same_filename_in_one_batch(tmp_path, stubs):
+    output = str(tmp_path / 'out')
+    split_pdf(make_pdf(tmp_path / 'in.pdf', stubs[:1], blank_pages=2), output)
+
+    assert sorted(row[0] for row in query(output, "SELECT filename FROM pay_statements")) == \
+        sorted([stubs[0], 'Unknown Unknown_Date.pdf'])
+    assert os.path.exists(os.path.join(output, stubs[0]))
+    assert os.path.exists(os.path.join(output, 'Unknown Unknown_Date.pdf'))
+    assert not temp_files(output)
+    assert query(output, "SELECT status FROM ingest_checkpoints") == [('done',)]
+
+def test_resume_after_crash_between_commit_and_renames(tmp_path, stubs, monkeypatch):
+    output = str(tmp_path / 'out')
+    source = make_pdf(tmp_path / 'in.pdf', stubs)
+    commit_ingest_batch = pdf_processor.commit_ingest_batch
+    commits = []
+
+    def crash_after_second_commit(*args, **kwargs):
+        journal_ids = commit_ingest_batch(*args, **kwargs)
+        commits.append(journal_ids)
+        if len(commits) == 2:
+            raise Crash()
+        return journal_ids
+
+    monkeypatch.setattr(pdf_processor, 'commit_ingest_batch', crash_after_second_commit)
+    with pytest.raises(Crash):
+        split_pdf(source, output, batch_size=2)
+    monkeypatch.undo()
+
+    # The second batch's rows are committed but its files are still temp files
+    assert len(query(output, "SELECT id FROM pay_statements")) == 4
+    assert len(temp_files(output)) == 2
+    assert not os.path.exists(os.path.join(output, stubs[3]))
+
+    # A new process settles the journal on start, then the rerun finishes the file
+    monkeypatch.setattr(database_manager, '_recovered_folders', set())
+    assert recover_ingest(output) == (2, 0, 0)
+    split_pdf(source, output, batch_size=2)
+
+    for stub in stubs:
+        assert os.path.exists(os.path.join(output, stub))
+    assert not temp_files(output)
+    assert len(query(output, "SELECT id FROM pay_statements")) == 4
+    assert query(output, "SELECT COUNT(*) FROM ingest_journal") == [(0,)]
+    assert query(output, "SELECT status, next_page FROM ingest_checkpoints") == [('done', 4)]
+
+def test_rerun_resumes_at_the_checkpoint_after_a_failure(tmp_path, stubs, monkeypatch):
+    output = str(tmp_path / 'out')
+    source = make_pdf(tmp_path / 'in.pdf', stubs)
+    extract_page = pdf_processor.extract_page
+    extracted = []
+
+    def fail_on_third_page(page, cache_path, mode, key):
+        if len(extracted) == 2:
+            raise Crash()
+        extracted.append(key)
+        return extract_page(page, cache_path, mode, key)
+
+    monkeypatch.setattr(pdf_processor, 'extract_page', fail_on_third_page)
+    with pytest.raises(Crash):
+        split_pdf(source, output, batch_size=2)
+    monkeypatch.undo()
+
+    assert query(output, "SELECT status, next_page FROM ingest_checkpoints") == [('failed', 2)]
+    assert not temp_files(output)
+
+    def record_page(page, cache_path, mode, key):
+        extracted.append(key)
+        return extract_page(page, cache_path, mode, key)
+
+    monkeypatch.setattr(pdf_processor, 'extract_page', record_page)
+    progress = []
+    split_pdf(source, output, batch_size=2, progress_callback=lambda done, total: progress.append(done))
+
+    # Only the pages after the checkpoint are extracted again
+    assert len(extracted) == len(set(extracted)) == 4
+    assert progress[0] == 2
+    assert len(query(output, "SELECT id FROM pay_statements")) == 4
+    assert query(output, "SELECT status, next_page FROM ingest_checkpoints") == [('done', 4)]
+
+def test_recovery_removes_partial_files_of_dead_processes_only(tmp_path, stubs, monkeypatch):
+    output = str(tmp_path / 'out')
+    split_pdf(make_pdf(tmp_path / 'in.pdf', stubs[:1]), output)
+    dead = os.path.join(output, f".a.pdf.999999999.x1{INGEST_TEMP_SUFFIX}")
+    live = os.path.join(output, f".b.pdf.{os.getppid()}.x2{INGEST_TEMP_SUFFIX}")
+    for path in (dead, live):
+        open(path, 'wb').close()
+    conn = sqlite3.connect(os.path.join(output, 'pdf_data.db'))
+    conn.execute("INSERT INTO ingest_checkpoints (file_hash, status, pid) VALUES ('other', 'running', ?)",
+                 (os.getppid(),))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database_manager, '_recovered_folders', set())
+    assert recover_ingest(output) == (0, 0, 1)
+    assert temp_files(output) == [live]
+    # The live process's checkpoint is left running
+    assert ('running',) in query(output, "SELECT status FROM ingest_checkpoints WHERE file_hash = 'other'")
+    # Recovery runs once per process and folder
+    assert recover_ingest(output) == (0, 0, 0)
@@ -0,0 +1,25 @@
+import os
+import glob
+import shutil
+import sqlite3
+from pdf_processor import rebuild_database
+
+SPLIT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Split')
+
+def count_statements(folder):
+    conn = sqlite3.connect(os.path.join(folder, 'pdf_data.db'))
+    count = conn.execute("SELECT COUNT(*) FROM pay_statements").fetchone()[0]
+    conn.close()
+    return count
+
+def test_rebuild_loads_every_split_pdf(tmp_path):
+    pdfs = glob.glob(os.path.join(SPLIT_FOLDER, '*.pdf'))
+    for pdf in pdfs:
+        shutil.copy(pdf, tmp_path)
+
+    assert rebuild_database(str(tmp_path), workers=2) == len(pdfs)
+    assert count_statements(tmp_path) == len(pdfs)
+
+    # The second run reads every page from the extraction cache
+    assert rebuild_database(str(tmp_path), workers=2, resume=False) == len(pdfs)
+    assert count_statements(tmp_path) == len(pdfs)